@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 
@@ -16,11 +17,12 @@ def criar_token(dados: dict) -> str:
         dados (dict): Dados a serem incluídos no payload do token.
 
     Returns:
-        str: Token JWT assinado, contendo os dados e uma data de expiração.
+        str: Token JWT assinado, contendo os dados, uma data de expiração e um
+            identificador único (`jti`) usado para revogação.
     """
     to_encode = dados.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=EXPIRES_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
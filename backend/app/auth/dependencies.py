@@ -1,6 +1,15 @@
+import os
+
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.auth.auth import verificar_token
+from app.auth.revogacao import lista_revogacao
+from app.database import get_db
+from app.services.principal import usuarioService
+
+# Perfil com acesso às operações administrativas (ex.: backups)
+PERFIL_ADMIN = os.getenv("PERFIL_ADMIN", "admin")
 
 # Define o esquema de autenticação OAuth2, usando o endpoint /login para obter tokens
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
@@ -10,7 +19,8 @@ async def obter_usuario_atual(token: str = Depends(oauth2_scheme)):
     Recupera o usuário atual com base no token JWT fornecido no cabeçalho Authorization.
 
     Este método depende do OAuth2PasswordBearer para extrair o token do cabeçalho Authorization.
-    Em seguida, utiliza a função `verificar_token` para decodificar e validar o JWT.
+    Em seguida, utiliza a função `verificar_token` para decodificar e validar o JWT
+    e recusa tokens cujo `jti` conste na lista de revogação.
 
     Args:
         token (str): Token JWT extraído automaticamente pelo FastAPI via OAuth2.
@@ -19,10 +29,33 @@ async def obter_usuario_atual(token: str = Depends(oauth2_scheme)):
         dict: Payload do token JWT se válido, contendo as informações do usuário.
 
     Raises:
-        HTTPException: Retorna 401 (Unauthorized) se o token for inválido ou ausente.
+        HTTPException: Retorna 401 (Unauthorized) se o token for inválido, revogado ou ausente.
     """
     print(token)
     payload = verificar_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Token inválido")
+    jti = payload.get("jti")
+    if jti and await lista_revogacao.esta_revogado(jti):
+        raise HTTPException(status_code=401, detail="Token revogado")
     return payload  # Opcional: você pode buscar o usuário no banco com o ID dentro do payload
+
+
+async def exigir_admin(usuario_logado=Depends(obter_usuario_atual),
+                       db: AsyncSession = Depends(get_db)):
+    """
+    Restringe a rota a usuários com o perfil PERFIL_ADMIN.
+
+    O perfil é lido do cadastro (pelo cache de usuários), não do token:
+    uma troca de perfil vale na próxima requisição.
+
+    Returns:
+        dict: Payload do token do administrador.
+
+    Raises:
+        HTTPException: 403 (Forbidden) se o usuário não for administrador.
+    """
+    usuario = await usuarioService.buscar_por_login(db, usuario_logado.get("sub"))
+    if usuario is None or not usuario.ativo or usuario.perfil != PERFIL_ADMIN:
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores")
+    return usuario_logado
@@ -0,0 +1,163 @@
+# app/auth/limitador.py
+
+import os
+import time
+from collections import OrderedDict
+
+# Quantidade de workers servindo a aplicação (definida pelo run.py em modo prod).
+# Cada worker guarda o próprio estado, então a cota de cada balde é dividida
+# entre eles: como o Uvicorn distribui as conexões entre os workers, a soma
+# das cotas locais se aproxima do limite global configurado. O estado não vai
+# para o banco de propósito: uma rajada de tentativas não deve disputar o
+# lock de escrita do SQLite com as escritas da aplicação.
+WORKERS = max(1, int(os.getenv("APP_WORKERS", "1")))
+
+# Limites por IP de origem: rajada e reposição (fichas por segundo)
+IP_CAPACIDADE = float(os.getenv("LOGIN_IP_CAPACIDADE", "20"))
+IP_REPOSICAO = float(os.getenv("LOGIN_IP_REPOSICAO", "1"))
+
+# Limites por login: rajada e reposição (fichas por segundo)
+LOGIN_CAPACIDADE = float(os.getenv("LOGIN_CAPACIDADE", "5"))
+LOGIN_REPOSICAO = float(os.getenv("LOGIN_REPOSICAO", "0.1"))
+
+# Falhas consecutivas toleradas antes do backoff exponencial, por IP e por login
+IP_FALHAS_LIVRES = 10
+LOGIN_FALHAS_LIVRES = 3
+
+# Limites do backoff exponencial (segundos)
+BACKOFF_BASE = 1.0
+BACKOFF_MAXIMO = 15 * 60.0
+
+# Chaves mantidas em memória e tempo de ociosidade até o descarte (segundos)
+MAX_CHAVES = 100_000
+OCIOSIDADE = 30 * 60.0
+
+
+class _Balde:
+    __slots__ = ("fichas", "atualizado_em", "falhas", "bloqueado_ate")
+
+    def __init__(self, fichas: float, agora: float):
+        self.fichas = fichas
+        self.atualizado_em = agora
+        self.falhas = 0
+        self.bloqueado_ate = 0.0
+
+
+class LimitadorTentativas:
+    """
+    Token bucket em memória com backoff exponencial por falhas consecutivas.
+
+    Os baldes ficam em um OrderedDict em ordem de último acesso, o que permite
+    descartar as chaves ociosas (ou as mais antigas, acima de `max_chaves`)
+    olhando apenas o início da fila.
+    """
+
+    def __init__(
+        self,
+        capacidade: float,
+        reposicao: float,
+        falhas_livres: int,
+        max_chaves: int = MAX_CHAVES,
+        ociosidade: float = OCIOSIDADE,
+    ):
+        self.capacidade = max(1.0, capacidade / WORKERS)
+        self.reposicao = reposicao / WORKERS
+        self.falhas_livres = falhas_livres
+        self.max_chaves = max_chaves
+        self.ociosidade = ociosidade
+        self._baldes: OrderedDict[str, _Balde] = OrderedDict()
+
+    def _obter(self, chave: str, agora: float) -> _Balde:
+        balde = self._baldes.get(chave)
+        if balde is None:
+            balde = _Balde(self.capacidade, agora)
+            self._baldes[chave] = balde
+        else:
+            decorrido = agora - balde.atualizado_em
+            balde.fichas = min(self.capacidade, balde.fichas + decorrido * self.reposicao)
+            balde.atualizado_em = agora
+            self._baldes.move_to_end(chave)
+        self._evictar(agora)
+        return balde
+
+    def _evictar(self, agora: float) -> None:
+        while self._baldes:
+            chave, balde = next(iter(self._baldes.items()))
+            ocioso = agora - balde.atualizado_em > self.ociosidade and balde.bloqueado_ate <= agora
+            if not ocioso and len(self._baldes) <= self.max_chaves:
+                break
+            del self._baldes[chave]
+
+    def espera(self, chave: str, agora: float | None = None) -> float:
+        """
+        Retorna quantos segundos a chave ainda precisa aguardar (0 se liberada),
+        sem consumir fichas.
+        """
+        agora = time.monotonic() if agora is None else agora
+        balde = self._obter(chave, agora)
+        if balde.bloqueado_ate > agora:
+            return balde.bloqueado_ate - agora
+        if balde.fichas < 1:
+            return (1 - balde.fichas) / self.reposicao if self.reposicao else self.ociosidade
+        return 0.0
+
+    def consumir(self, chave: str, agora: float | None = None) -> None:
+        """Consome uma ficha do balde da chave."""
+        agora = time.monotonic() if agora is None else agora
+        balde = self._obter(chave, agora)
+        balde.fichas = max(0.0, balde.fichas - 1)
+
+    def registrar_falha(self, chave: str, agora: float | None = None) -> None:
+        """Conta uma falha e, passadas as falhas livres, bloqueia a chave por tempo exponencial."""
+        agora = time.monotonic() if agora is None else agora
+        balde = self._obter(chave, agora)
+        balde.falhas += 1
+        excedentes = balde.falhas - self.falhas_livres
+        if excedentes > 0:
+            atraso = min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** (excedentes - 1))
+            balde.bloqueado_ate = agora + atraso
+
+    def registrar_sucesso(self, chave: str) -> None:
+        """Zera as falhas e o bloqueio da chave."""
+        balde = self._baldes.get(chave)
+        if balde is not None:
+            balde.falhas = 0
+            balde.bloqueado_ate = 0.0
+
+
+limitador_ip = LimitadorTentativas(IP_CAPACIDADE, IP_REPOSICAO, IP_FALHAS_LIVRES)
+limitador_login = LimitadorTentativas(LOGIN_CAPACIDADE, LOGIN_REPOSICAO, LOGIN_FALHAS_LIVRES)
+
+
+def verificar_tentativa(ip: str, login: str) -> float:
+    """
+    Verifica se uma tentativa de login pode prosseguir para a validação da senha.
+
+    Args:
+        ip (str): Endereço IP de origem da requisição.
+        login (str): Login informado na tentativa.
+
+    Returns:
+        float: Segundos até a próxima tentativa permitida, ou 0 se liberada.
+            Quando liberada, uma ficha é consumida de cada balde.
+    """
+    agora = time.monotonic()
+    chave_login = login.lower()
+    espera = max(limitador_ip.espera(ip, agora), limitador_login.espera(chave_login, agora))
+    if espera:
+        return espera
+    limitador_ip.consumir(ip, agora)
+    limitador_login.consumir(chave_login, agora)
+    return 0.0
+
+
+def registrar_falha(ip: str, login: str) -> None:
+    """Registra uma tentativa de login malsucedida para o IP e para o login."""
+    agora = time.monotonic()
+    limitador_ip.registrar_falha(ip, agora)
+    limitador_login.registrar_falha(login.lower(), agora)
+
+
+def registrar_sucesso(login: str) -> None:
+    """Libera o login após uma autenticação bem-sucedida."""
+    limitador_login.registrar_sucesso(login.lower())
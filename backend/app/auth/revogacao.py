@@ -0,0 +1,98 @@
+# app/auth/revogacao.py
+
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+
+from app.database import SessionPadrao
+from app.repositories.principal import tokenRevogadoRepository
+from app.utils.bloom import FiltroBloom
+from app.utils.fastLog import log
+
+# Intervalo (segundos) para buscar revogações feitas por outros workers
+SINCRONIZACAO_SEGUNDOS = float(os.getenv("REVOGACAO_SINCRONIZACAO", "2"))
+# Intervalo (segundos) entre compactações: remove expirados e reconstrói o filtro
+COMPACTACAO_SEGUNDOS = float(os.getenv("REVOGACAO_COMPACTACAO", "600"))
+# Capacidade mínima do filtro de Bloom
+CAPACIDADE_MINIMA = 10_000
+
+
+class ListaRevogacao:
+    """
+    Lista de tokens revogados com um filtro de Bloom em memória na frente da
+    tabela `token_revogado`.
+
+    Token não revogado (o caso comum) custa só a consulta ao filtro; o banco
+    é consultado apenas quando o filtro responde "talvez". Cada worker mantém
+    o próprio filtro e o sincroniza pela tabela, lendo apenas os ids novos.
+
+    A tabela fica sempre no banco padrão: um `jti` é único entre todos os
+    tenants, então uma lista só atende a todos.
+    """
+
+    def __init__(self):
+        self._filtro = FiltroBloom(CAPACIDADE_MINIMA)
+        self._ultimo_id = 0
+        self._ultima_compactacao = time.monotonic()
+
+    async def esta_revogado(self, jti: str) -> bool:
+        """Retorna True se o token identificado por `jti` foi revogado."""
+        if jti not in self._filtro:
+            return False
+        async with SessionPadrao() as db:
+            return await tokenRevogadoRepository.token_revogado(db, jti)
+
+    async def revogar(self, jti: str, exp: int) -> None:
+        """
+        Revoga o token até a sua expiração.
+
+        Args:
+            jti (str): Identificador único do token (claim `jti`).
+            exp (int): Expiração do token em timestamp UNIX (claim `exp`).
+        """
+        expira_em = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+        async with SessionPadrao() as db:
+            await tokenRevogadoRepository.revogar_token(db, jti, expira_em)
+        self._filtro.adicionar(jti)
+
+    async def sincronizar(self) -> None:
+        """Adiciona ao filtro as revogações gravadas desde a última sincronização."""
+        async with SessionPadrao() as db:
+            novos = await tokenRevogadoRepository.listar_revogados_desde(db, self._ultimo_id)
+        for id_, jti in novos:
+            self._filtro.adicionar(jti)
+            self._ultimo_id = id_
+        if self._filtro.saturado:
+            await self.compactar()
+
+    async def compactar(self) -> None:
+        """Remove as revogações expiradas e reconstrói o filtro com as restantes."""
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)
+        async with SessionPadrao() as db:
+            removidos = await tokenRevogadoRepository.remover_expirados(db, agora)
+            vigentes = await tokenRevogadoRepository.listar_revogados_desde(db, 0)
+
+        filtro = FiltroBloom(max(CAPACIDADE_MINIMA, 2 * len(vigentes)))
+        for id_, jti in vigentes:
+            filtro.adicionar(jti)
+            self._ultimo_id = max(self._ultimo_id, id_)
+        self._filtro = filtro
+        self._ultima_compactacao = time.monotonic()
+        if removidos:
+            log.info(f"{removidos} revogações expiradas removidas", module="Revogacao")
+
+    async def manter_sincronizada(self) -> None:
+        """Tarefa de fundo: sincroniza periodicamente e compacta quando devido."""
+        while True:
+            await asyncio.sleep(SINCRONIZACAO_SEGUNDOS)
+            try:
+                if time.monotonic() - self._ultima_compactacao >= COMPACTACAO_SEGUNDOS:
+                    await self.compactar()
+                else:
+                    await self.sincronizar()
+            except Exception as exc:
+                log.error(f"Falha ao sincronizar revogações: {exc}", module="Revogacao")
+
+
+lista_revogacao = ListaRevogacao()
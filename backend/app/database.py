@@ -1,14 +1,34 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import os
+import re
+import glob
+import time
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
-# URL para SQLite async
+from app.exceptions.tempo_consulta import TempoConsultaExcedidoException
+from app.migracoes import aplicar_migracoes, preencher_dados
+from app.utils import metricas
+
+# URL para SQLite async (banco padrão, usado quando não há tenant)
 DATABASE_URL = "sqlite+aiosqlite:///./usuarios.db"
 
+# Diretório dos bancos por tenant: um arquivo `<tenant>.db` para cada um
+TENANTS_DIR = os.getenv("TENANTS_DIR", "./tenants")
+# Segundos sem uso até o engine de um tenant ser fechado
+TENANT_OCIOSIDADE = float(os.getenv("TENANT_OCIOSIDADE", "600"))
+# Formato aceito para o id do tenant (vira nome de arquivo)
+TENANT_PADRAO_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
 # Engine assíncrono
 engine = create_async_engine(DATABASE_URL, echo=False)
 
-# Session assíncrona
-SessionLocal = async_sessionmaker(
+# Session assíncrona do banco padrão (dados globais, como a lista de revogação)
+SessionPadrao = async_sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
@@ -17,3 +37,373 @@ SessionLocal = async_sessionmaker(
 
 # Base dos modelos
 Base = declarative_base()
+
+# Tenant da requisição atual (None = banco padrão), definido pelo TenantMiddleware
+tenant_atual: ContextVar[str | None] = ContextVar("tenant_atual", default=None)
+
+
+# -------------------------------------------------------------------
+# Tempo de retenção das conexões do pool
+# -------------------------------------------------------------------
+def _ao_retirar_conexao(dbapi_conn, registro, proxy):
+    registro.info["retirada_em"] = time.perf_counter()
+
+
+def _ao_devolver_conexao(dbapi_conn, registro):
+    retirada_em = registro.info.pop("retirada_em", None)
+    if retirada_em is not None:
+        metricas.observar("db.conexao_retida_ms", (time.perf_counter() - retirada_em) * 1000)
+
+
+# -------------------------------------------------------------------
+# Orçamento de tempo das consultas
+# -------------------------------------------------------------------
+# Comando que aplica o limite no servidor, nos bancos que têm um; no SQLite
+# o limite é imposto de fora, com `interrupt()`
+_COMANDO_TEMPO_LIMITE = {
+    "postgresql": "SET statement_timeout = {ms}",
+    "mysql": "SET SESSION MAX_EXECUTION_TIME = {ms}",
+}
+
+
+class OrcamentoConsulta:
+    """
+    Tempo que as consultas de uma requisição ainda podem usar.
+
+    Enquanto um comando executa no SQLite, um temporizador no event loop
+    chama `interrupt()` na conexão quando o prazo vence; `cancelar()` (cliente
+    desconectou) interrompe na hora os comandos em andamento. Os comandos
+    seguintes da requisição são recusados antes de chegar ao banco.
+    """
+
+    __slots__ = ("limite", "prazo", "cancelado", "_em_execucao", "_ao_cancelar")
+
+    def __init__(self, limite: float):
+        self.limite = limite
+        self.prazo = time.monotonic() + limite
+        self.cancelado = False
+        self._em_execucao: set = set()
+        self._ao_cancelar: list[Callable[[], None]] = []
+
+    def restante(self) -> float:
+        return self.prazo - time.monotonic()
+
+    def esgotado(self) -> bool:
+        return self.cancelado or self.restante() <= 0
+
+    def cancelar(self) -> None:
+        if self.cancelado:
+            return
+        self.cancelado = True
+        for conexao in list(self._em_execucao):
+            conexao.interrupt()
+        for callback in self._ao_cancelar:
+            callback()
+
+    def ao_cancelar(self, callback: Callable[[], None]) -> None:
+        """Registra uma função chamada quando o orçamento for cancelado."""
+        self._ao_cancelar.append(callback)
+
+    def desvinculado(self) -> "OrcamentoConsulta":
+        """
+        Cópia com o mesmo prazo, mas que não é cancelada junto com esta
+        requisição: para trabalho compartilhado com outras requisições
+        (coalescência, carregador por id), que não deve cair quando só um
+        dos clientes desiste.
+        """
+        copia = OrcamentoConsulta(self.limite)
+        copia.prazo = self.prazo
+        return copia
+
+
+# Orçamento da requisição atual (None = sem limite), definido pelo PrazoConsultaMiddleware
+orcamento_consulta: ContextVar[OrcamentoConsulta | None] = ContextVar("orcamento_consulta", default=None)
+
+
+def _conexao_sqlite(conn):
+    """sqlite3.Connection por trás do adaptador do aiosqlite."""
+    return conn.connection.dbapi_connection._connection._conn
+
+
+def _ao_executar(conn, cursor, statement, parameters, context, executemany):
+    orcamento = orcamento_consulta.get()
+    if orcamento is None:
+        return
+    if orcamento.esgotado():
+        metricas.incrementar("db.consultas_recusadas")
+        raise TempoConsultaExcedidoException("Tempo limite das consultas da requisição excedido.")
+
+    comando = _COMANDO_TEMPO_LIMITE.get(conn.dialect.name)
+    if comando is not None:
+        ms = int(orcamento.limite * 1000)
+        if conn.info.get("tempo_limite_ms") != ms:
+            cursor.execute(comando.format(ms=ms))
+            conn.info["tempo_limite_ms"] = ms
+        return
+    if conn.dialect.name != "sqlite":
+        return
+
+    bruta = _conexao_sqlite(conn)
+    orcamento._em_execucao.add(bruta)
+    temporizador = asyncio.get_running_loop().call_later(orcamento.restante(), bruta.interrupt)
+    conn.info["orcamento"] = (orcamento, bruta, temporizador)
+
+
+def _liberar_orcamento(conn):
+    registro = conn.info.pop("orcamento", None)
+    if registro is not None:
+        orcamento, bruta, temporizador = registro
+        temporizador.cancel()
+        orcamento._em_execucao.discard(bruta)
+    return registro
+
+
+def _ao_concluir(conn, cursor, statement, parameters, context, executemany):
+    _liberar_orcamento(conn)
+
+
+def _ao_falhar(contexto):
+    conn = contexto.connection
+    if conn is None:
+        return
+    registro = _liberar_orcamento(conn)
+    orcamento = registro[0] if registro else orcamento_consulta.get()
+    if orcamento is not None and orcamento.esgotado() and contexto.is_disconnect is False:
+        metricas.incrementar("db.consultas_canceladas" if orcamento.cancelado else "db.consultas_interrompidas")
+        raise TempoConsultaExcedidoException(
+            "Consulta cancelada: o cliente desconectou." if orcamento.cancelado
+            else f"Consulta excedeu o tempo limite de {orcamento.limite:g}s."
+        ) from contexto.original_exception
+
+
+# -------------------------------------------------------------------
+# Instrumentação de cada engine (padrão e tenants)
+# -------------------------------------------------------------------
+def _instrumentar(alvo: AsyncEngine) -> None:
+    event.listen(alvo.sync_engine, "checkout", _ao_retirar_conexao)
+    event.listen(alvo.sync_engine, "checkin", _ao_devolver_conexao)
+    event.listen(alvo.sync_engine, "before_cursor_execute", _ao_executar)
+    event.listen(alvo.sync_engine, "after_cursor_execute", _ao_concluir)
+    event.listen(alvo.sync_engine, "handle_error", _ao_falhar)
+
+
+_instrumentar(engine)
+
+
+# -------------------------------------------------------------------
+# Roteamento por tenant
+# -------------------------------------------------------------------
+class _BancoTenant:
+    __slots__ = ("engine", "fabrica", "usado_em")
+
+    def __init__(self, engine_tenant: AsyncEngine):
+        self.engine = engine_tenant
+        self.fabrica = async_sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=engine_tenant,
+            class_=AsyncSession,
+        )
+        self.usado_em = time.monotonic()
+
+
+_bancos_tenant: dict[str, _BancoTenant] = {}
+# Tenants cujas tabelas já foram criadas por este processo
+_tenants_preparados: set[str] = set()
+_preparando = asyncio.Lock()
+
+
+async def criar_esquema(alvo: AsyncEngine) -> None:
+    """
+    Cria as tabelas que faltam, aplica as migrações de esquema (em uma
+    transação) e depois os preenchimentos de dados (em lotes, cada um com
+    o seu commit).
+
+    A transação do esquema já começa com o lock de escrita (BEGIN
+    IMMEDIATE): o pysqlite não abre transação para DDL, e sem o lock dois
+    processos conferem as mesmas tabelas como ausentes e o segundo falha
+    com "table already exists". Com ele, quem chega depois espera e
+    encontra tudo criado.
+    """
+    async with alvo.connect() as conn:
+        if alvo.dialect.name == "sqlite":
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(aplicar_migracoes)
+        await conn.commit()
+    async with alvo.connect() as conn:
+        await conn.run_sync(preencher_dados)
+
+
+def tenant_valido(tenant: str) -> bool:
+    """Retorna True se o id puder ser usado como tenant."""
+    return bool(TENANT_PADRAO_ID.match(tenant))
+
+
+def caminho_banco(tenant: str | None) -> str:
+    """Arquivo SQLite do tenant (ou do banco padrão, para None)."""
+    if tenant is None:
+        return engine.url.database
+    return f"{os.path.join(TENANTS_DIR, tenant)}.db"
+
+
+def _url_banco(tenant: str, criar: bool = False) -> str:
+    # mode=rw: abrir um arquivo que não existe falha em vez de criá-lo
+    if criar:
+        return f"sqlite+aiosqlite:///{caminho_banco(tenant)}"
+    return f"sqlite+aiosqlite:///file:{caminho_banco(tenant)}?mode=rw&uri=true"
+
+
+def _abrir_banco(tenant: str) -> _BancoTenant:
+    banco = _bancos_tenant.get(tenant)
+    if banco is None:
+        engine_tenant = create_async_engine(_url_banco(tenant), echo=False)
+        _instrumentar(engine_tenant)
+        banco = _BancoTenant(engine_tenant)
+        _bancos_tenant[tenant] = banco
+        metricas.definir("db.tenants_abertos", len(_bancos_tenant))
+    banco.usado_em = time.monotonic()
+    return banco
+
+
+async def preparar_tenant(tenant: str | None) -> None:
+    """
+    Garante que o banco do tenant está aberto e com o esquema atualizado.
+
+    O engine é criado na primeira requisição do tenant (neste worker) e
+    reaproveitado pelas seguintes; `fechar_tenants_ociosos` o descarta
+    depois de TENANT_OCIOSIDADE segundos sem uso. O banco em si nunca é
+    criado aqui, só por `criar_banco_tenant` no provisionamento.
+
+    Raises:
+        ValueError: Se o id do tenant não tiver um formato aceito.
+        LookupError: Se o banco do tenant não existir.
+    """
+    if tenant is None:
+        return
+    if tenant in _tenants_preparados:
+        _abrir_banco(tenant)
+        return
+    if not tenant_valido(tenant):
+        raise ValueError(f"Tenant inválido: {tenant!r}")
+    async with _preparando:
+        if tenant in _tenants_preparados:
+            return
+        if not os.path.exists(caminho_banco(tenant)):
+            raise LookupError(f"Banco do tenant {tenant!r} não existe")
+        banco = _abrir_banco(tenant)
+        await criar_esquema(banco.engine)
+        _tenants_preparados.add(tenant)
+
+
+async def criar_banco_tenant(tenant: str) -> None:
+    """
+    Cria o banco do tenant com as tabelas (provisionamento); não faz nada
+    além de atualizar o esquema se ele já existir.
+
+    Raises:
+        ValueError: Se o id do tenant não tiver um formato aceito.
+    """
+    if not tenant_valido(tenant):
+        raise ValueError(f"Tenant inválido: {tenant!r}")
+    os.makedirs(TENANTS_DIR, exist_ok=True)
+    engine_tenant = create_async_engine(_url_banco(tenant, criar=True), echo=False)
+    try:
+        await criar_esquema(engine_tenant)
+    finally:
+        await engine_tenant.dispose()
+
+
+def fabrica_sessao_tenant(tenant: str | None) -> async_sessionmaker:
+    """
+    Retorna a fábrica de sessões do banco do tenant (ou do banco padrão).
+
+    O tenant precisa ter passado por `preparar_tenant` neste processo; se o
+    engine tiver sido fechado por ociosidade, é reaberto aqui.
+    """
+    if tenant is None:
+        return SessionPadrao
+    if tenant not in _tenants_preparados:
+        raise RuntimeError(f"Banco do tenant {tenant!r} não foi preparado")
+    return _abrir_banco(tenant).fabrica
+
+
+class _SessaoPorTenant:
+    """
+    Fábrica de sessões que resolve o banco pelo tenant da requisição atual.
+
+    Tem a mesma interface de chamada de um async_sessionmaker, então
+    repositórios e services continuam usando `SessionLocal()` sem saber
+    em qual arquivo estão gravando. Como cada tenant tem o próprio arquivo
+    (e o próprio lock de escrita do SQLite), escritas de tenants diferentes
+    não se bloqueiam.
+    """
+
+    def __call__(self, **kwargs) -> AsyncSession:
+        return fabrica_sessao_tenant(tenant_atual.get())(**kwargs)
+
+
+SessionLocal = _SessaoPorTenant()
+
+
+def bancos_existentes() -> list[str | None]:
+    """Bancos em disco: o padrão (None) e os tenants em TENANTS_DIR."""
+    tenants = [
+        os.path.basename(arquivo)[:-3]
+        for arquivo in glob.glob(os.path.join(TENANTS_DIR, "*.db"))
+    ]
+    return [None, *sorted(t for t in tenants if tenant_valido(t))]
+
+
+def tenants_abertos() -> list[str]:
+    """Tenants com banco aberto neste worker."""
+    return list(_bancos_tenant)
+
+
+async def fechar_tenants_ociosos() -> None:
+    """
+    Tarefa de fundo: fecha os engines dos tenants sem uso há mais de
+    TENANT_OCIOSIDADE segundos.
+
+    Sessões ainda abertas no engine descartado continuam funcionando; a
+    próxima requisição do tenant apenas abre um engine novo.
+    """
+    while True:
+        await asyncio.sleep(max(1.0, TENANT_OCIOSIDADE / 4))
+        limite = time.monotonic() - TENANT_OCIOSIDADE
+        for tenant, banco in list(_bancos_tenant.items()):
+            if banco.usado_em < limite:
+                del _bancos_tenant[tenant]
+                await banco.engine.dispose()
+        metricas.definir("db.tenants_abertos", len(_bancos_tenant))
+
+
+async def fechar_tenants() -> None:
+    """Fecha os engines de todos os tenants (encerramento da aplicação)."""
+    bancos = list(_bancos_tenant.values())
+    _bancos_tenant.clear()
+    for banco in bancos:
+        await banco.engine.dispose()
+
+
+# -------------------------------------------------------------------
+# Dependência de sessão compartilhada pelas rotas
+# -------------------------------------------------------------------
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Fornece uma sessão assíncrona com escopo de transação por requisição.
+
+    A sessão é preguiçosa: só retira uma conexão do pool ao executar o
+    primeiro comando, então requisições que falham na validação ou na
+    autenticação não ocupam o pool. Ao final, o que ficou pendente é
+    confirmado (ou desfeito, em caso de exceção) e a conexão é devolvida
+    antes do envio da resposta.
+    """
+    async with SessionLocal() as session:
+        try:
+            yield session
+            if session.in_transaction():
+                await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
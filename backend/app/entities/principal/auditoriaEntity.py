@@ -0,0 +1,20 @@
+# app/entities/auditoriaEntity.py
+
+from datetime import datetime
+
+class AuditoriaEntity:
+    def __init__(
+        self,
+        id: int,
+        entidade: str,
+        registro_id: int,
+        operacao: str,
+        dados: dict | None,
+        data: datetime,
+    ):
+        self.id = id
+        self.entidade = entidade
+        self.registro_id = registro_id
+        self.operacao = operacao
+        self.dados = dados
+        self.data = data
@@ -1,7 +1,16 @@
 # app/entities/perfilEntity.py
 
+from app.entities.principal.permissaoEntity import PermissaoEntity
+
 class PerfilEntity:
-    def __init__(self, id: int, nome: str, descricao: str):
+    def __init__(self,
+                 id: int,
+                 nome: str,
+                 descricao: str,
+                 permissoes: list[PermissaoEntity] | None = None,
+                 versao: int = 1):
         self.id = id
         self.nome = nome
-        self.descricao = descricao
\ No newline at end of file
+        self.descricao = descricao
+        self.permissoes = permissoes
+        self.versao = versao
\ No newline at end of file
@@ -0,0 +1,7 @@
+# app/entities/permissaoEntity.py
+
+class PermissaoEntity:
+    def __init__(self, id: int, nome: str, descricao: str):
+        self.id = id
+        self.nome = nome
+        self.descricao = descricao
@@ -13,6 +13,7 @@ class UsuarioEntity:
         senha: str,
         ativo: bool,
         data_criacao: datetime,
+        versao: int = 1,
     ):
         self.id = id
         self.nome = nome
@@ -22,6 +23,7 @@ class UsuarioEntity:
         self.senha = senha
         self.ativo = ativo
         self.data_criacao = data_criacao
+        self.versao = versao
 
     def is_active(self) -> bool:
         """Retorna True se o usuário está ativo"""
@@ -0,0 +1,6 @@
+# app/exceptions/conflito_versao.py
+class ConflitoVersaoException(Exception):
+    def __init__(self, mensagem: str, versao_atual: int):
+        self.mensagem = mensagem
+        self.versao_atual = versao_atual
+        super().__init__(mensagem)
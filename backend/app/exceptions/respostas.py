@@ -0,0 +1,97 @@
+# app/exceptions/respostas.py
+import re
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from sqlalchemy.exc import IntegrityError
+
+from app.schemas.shared.response import ResponseModel
+from app.exceptions.regra_negocio import RegraNegocioException
+from app.exceptions.conflito_versao import ConflitoVersaoException
+from app.exceptions.tempo_consulta import TempoConsultaExcedidoException
+from app.utils.etag import gerar_etag
+
+
+def erros_validacao(erros: list[dict]) -> list[dict]:
+    """
+    Padroniza os erros de validação do Pydantic no formato:
+    { "campo": "<nome_do_campo>", "mensagem": "<mensagem_de_erro>", "tipo": "<tipo_de_erro>" }
+    """
+    erros_formatados = []
+    for err in erros:
+        loc = err.get("loc", [])
+        # remove "body" e une o restante por ponto
+        campo = ".".join(str(x) for x in loc[1:]) if len(loc) > 1 else loc[-1]
+        erros_formatados.append({
+            "campo": campo,
+            "mensagem": err.get("msg"),
+            "tipo": err.get("type")
+        })
+    return erros_formatados
+
+
+def erros_integridade(exc: IntegrityError) -> list[dict]:
+    """
+    Traduz a violação de integridade do banco (ex: UNIQUE, FK, NOT NULL) para
+    o formato: [ { "campo": "<nome_do_campo>", "mensagem": "<msg>", "tipo": "<tipo>" } ]
+    """
+    msg_original = str(exc.orig)
+
+    # Detecta UNIQUE constraint
+    unique_match = re.search(
+        r"UNIQUE constraint failed: [\w\.]+\.([\w]+)",
+        msg_original
+    )
+    if unique_match:
+        campo = unique_match.group(1)
+        return [{
+            "campo": campo,
+            "mensagem": f"Já existe um registro com esse {campo}.",
+            "tipo": "unique"
+        }]
+    # fallback genérico
+    return [{
+        "campo": None,
+        "mensagem": msg_original,
+        "tipo": "integrity_error"
+    }]
+
+
+def resposta_de_erro(exc: Exception) -> tuple[int, ResponseModel, dict | None]:
+    """
+    Converte uma exceção no status HTTP, no envelope `ResponseModel` de erro
+    e nos cabeçalhos que a API devolve para ela. Usado pelos handlers
+    globais e pelo lote (`POST /lote`), que responde um erro por operação.
+
+    Retorna:
+        tuple: (status_code, ResponseModel, cabeçalhos ou None).
+    """
+    if isinstance(exc, RequestValidationError):
+        return 422, ResponseModel(
+            status="error",
+            mensagem="Houve um problema na validação dos campos, verifique os dados enviados e tente novamente.",
+            dados=erros_validacao(exc.errors())
+        ), None
+    if isinstance(exc, IntegrityError):
+        return 400, ResponseModel(
+            status="error",
+            mensagem="Erro de integridade do banco.",
+            dados=erros_integridade(exc)
+        ), None
+    if isinstance(exc, RegraNegocioException):
+        return 200, ResponseModel(status="error", mensagem=exc.mensagem, dados=None), None
+    if isinstance(exc, ConflitoVersaoException):
+        return 409, ResponseModel(
+            status="error",
+            mensagem=exc.mensagem,
+            dados={"versao_atual": exc.versao_atual}
+        ), {"ETag": gerar_etag(exc.versao_atual)}
+    if isinstance(exc, TempoConsultaExcedidoException):
+        return 504, ResponseModel(status="error", mensagem=exc.mensagem, dados=None), None
+    if isinstance(exc, HTTPException):
+        return exc.status_code, ResponseModel(status="error", mensagem=exc.detail, dados=None), exc.headers
+    return 500, ResponseModel(
+        status="error",
+        mensagem="Erro interno no servidor.",
+        dados=None  # ou str(exc) em debug
+    ), None
@@ -0,0 +1,5 @@
+# app/exceptions/tempo_consulta.py
+class TempoConsultaExcedidoException(Exception):
+    def __init__(self, mensagem: str):
+        self.mensagem = mensagem
+        super().__init__(mensagem)
@@ -0,0 +1,162 @@
+# app/middlewares/concorrencia.py
+
+import os
+import time
+
+from app.schemas.shared.response import ResponseModel
+from app.utils import metricas
+
+# Limite inicial, mínimo e máximo de requisições simultâneas por worker
+LIMITE_INICIAL = float(os.getenv("CONCORRENCIA_INICIAL", "32"))
+LIMITE_MINIMO = float(os.getenv("CONCORRENCIA_MINIMO", "4"))
+LIMITE_MAXIMO = float(os.getenv("CONCORRENCIA_MAXIMO", "512"))
+# Cada rota tem a sua latência de referência; a requisição é considerada
+# lenta (sinal de sobrecarga) acima de referência * TOLERANCIA + FOLGA_MS
+TOLERANCIA_LATENCIA = float(os.getenv("CONCORRENCIA_TOLERANCIA", "2"))
+FOLGA_LATENCIA_MS = float(os.getenv("CONCORRENCIA_FOLGA_MS", "50"))
+# Peso de cada amostra ao subir a referência (ao descer, ela acompanha na hora)
+ALFA_REFERENCIA = 0.01
+# Fator da redução multiplicativa e intervalo mínimo entre reduções (s)
+FATOR_REDUCAO = 0.9
+INTERVALO_REDUCAO = 0.1
+
+# Fração do limite que cada classe de prioridade pode ocupar: as classes
+# menores são recusadas primeiro e sobra espaço para as críticas
+CRITICA, NORMAL, BAIXA = "critica", "normal", "baixa"
+FRACAO_PRIORIDADE = {CRITICA: 1.0, NORMAL: 0.8, BAIXA: 0.5}
+
+# (método, caminho) -> prioridade; o que não estiver aqui é NORMAL
+PRIORIDADE_ROTAS = {
+    ("POST", "/usuarios/login"): CRITICA,
+    ("POST", "/usuarios/logout"): CRITICA,
+    ("GET", "/usuarios/me"): CRITICA,
+    ("GET", "/metricas/"): CRITICA,
+    ("GET", "/usuarios/sugestoes"): NORMAL,  # autocompletar: barato e interativo
+    ("POST", "/usuarios/consulta_filtrada"): BAIXA,
+    ("GET", "/usuarios/"): BAIXA,
+    ("GET", "/usuarios/changes"): BAIXA,
+    ("POST", "/lote/"): BAIXA,
+    ("GET", "/auditoria/"): BAIXA,
+    ("GET", "/backups/"): BAIXA,
+    ("POST", "/backups/"): BAIXA,
+}
+# Rotas que ocupam vaga mas não ajustam o limite: a latência delas é
+# dominada por CPU (bcrypt) ou pelo tamanho do trabalho pedido, e não diz
+# nada sobre a fila do worker
+ROTAS_SEM_SINAL = {
+    ("POST", "/usuarios/login"),
+    ("POST", "/usuarios/"),
+    ("POST", "/lote/"),
+    ("POST", "/backups/"),
+}
+# Conexões de longa duração não entram no controle (ocupariam vagas indefinidamente)
+PREFIXOS_IGNORADOS = ("/eventos",)
+
+
+class LimiteAdaptativo:
+    """
+    Limite de concorrência AIMD guiado pela latência observada.
+
+    A latência de cada requisição é comparada com a referência da sua rota
+    (uma média que desce na hora até a menor latência vista e sobe devagar),
+    e não com um alvo único: rotas naturalmente lentas não derrubam o
+    limite, e rotas rápidas que ficam lentas o reduzem.
+
+    Cada requisição concluída dentro da tolerância aumenta o limite em
+    1/limite (cerca de +1 a cada "janela" completa); acima dela, o limite
+    é multiplicado por FATOR_REDUCAO, no máximo uma vez por INTERVALO_REDUCAO.
+    """
+
+    def __init__(self):
+        self.limite = LIMITE_INICIAL
+        self.em_andamento = 0
+        self._ultima_reducao = 0.0
+        # rota -> latência de referência (ms)
+        self._referencias: dict[tuple[str, str], float] = {}
+
+    def entrar(self, prioridade: str) -> bool:
+        if self.em_andamento >= self.limite * FRACAO_PRIORIDADE[prioridade]:
+            return False
+        self.em_andamento += 1
+        return True
+
+    def _lenta(self, rota: tuple[str, str], latencia_ms: float) -> bool:
+        referencia = self._referencias.get(rota)
+        if referencia is None or latencia_ms < referencia:
+            self._referencias[rota] = latencia_ms
+            return False
+        self._referencias[rota] = referencia + (latencia_ms - referencia) * ALFA_REFERENCIA
+        return latencia_ms > referencia * TOLERANCIA_LATENCIA + FOLGA_LATENCIA_MS
+
+    def sair(self, rota: tuple[str, str] | None, latencia_ms: float) -> None:
+        """
+        Libera a vaga e ajusta o limite. `rota` é (método, caminho do
+        template); None para requisições que não devem ajustar o limite.
+        """
+        self.em_andamento -= 1
+        if rota is None:
+            return
+        if self._lenta(rota, latencia_ms):
+            agora = time.monotonic()
+            if agora - self._ultima_reducao >= INTERVALO_REDUCAO:
+                self.limite = max(LIMITE_MINIMO, self.limite * FATOR_REDUCAO)
+                self._ultima_reducao = agora
+        else:
+            self.limite = min(LIMITE_MAXIMO, self.limite + 1 / self.limite)
+        metricas.definir("concorrencia.limite", self.limite)
+
+
+def _rota_do_sinal(scope) -> tuple[str, str] | None:
+    # O roteamento do FastAPI deixa a rota no scope; sem ela (404) ou nas
+    # rotas excluídas, a latência não entra no ajuste
+    rota = scope.get("route")
+    if rota is None or (scope["method"], scope["path"]) in ROTAS_SEM_SINAL:
+        return None
+    return scope["method"], rota.path
+
+
+_corpo_sobrecarga = ResponseModel(
+    status="error",
+    mensagem="Servidor sobrecarregado, tente novamente em instantes.",
+    dados=None
+).model_dump_json().encode()
+
+
+class LimitadorConcorrenciaMiddleware:
+    """
+    Middleware ASGI de descarte de carga: recusa cedo, com 503 e Retry-After,
+    as requisições que excedem o limite adaptativo da sua classe de prioridade,
+    em vez de deixá-las enfileirar no event loop, no aiosqlite e no pool.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.limite = LimiteAdaptativo()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(PREFIXOS_IGNORADOS):
+            await self.app(scope, receive, send)
+            return
+
+        prioridade = PRIORIDADE_ROTAS.get((scope["method"], scope["path"]), NORMAL)
+        if not self.limite.entrar(prioridade):
+            metricas.incrementar(f"concorrencia.descartadas.{prioridade}")
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(_corpo_sobrecarga)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": _corpo_sobrecarga})
+            return
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            latencia_ms = (time.perf_counter() - inicio) * 1000
+            self.limite.sair(_rota_do_sinal(scope), latencia_ms)
+            metricas.observar("http.latencia_ms", latencia_ms)
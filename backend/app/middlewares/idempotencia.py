@@ -0,0 +1,153 @@
+# app/middlewares/idempotencia.py
+
+import hashlib
+
+from app.auth.auth import verificar_token
+from app.schemas.shared.response import ResponseModel
+from app.services.principal import idempotenciaService
+
+# Rotas que aceitam o cabeçalho Idempotency-Key
+ROTAS_IDEMPOTENTES = {
+    ("POST", "/usuarios/"),
+    ("POST", "/perfis/"),
+    ("POST", "/lote/"),
+}
+CABECALHO_CHAVE = b"idempotency-key"
+TAMANHO_MAXIMO_CHAVE = 255
+# Respostas maiores que isso não são guardadas (a chave é liberada)
+TAMANHO_MAXIMO_RESPOSTA = 1024 * 1024
+
+
+def _resposta_erro(status: int, mensagem: str) -> tuple[dict, dict]:
+    corpo = ResponseModel(status="error", mensagem=mensagem, dados=None).model_dump_json().encode()
+    inicio = {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+        ],
+    }
+    return inicio, {"type": "http.response.body", "body": corpo}
+
+
+def _sujeito(scope) -> str:
+    """
+    Dono da chave: o usuário do token ou, sem token válido, o endereço do
+    cliente. Assim a mesma chave de clientes diferentes não colide, e um
+    cliente anônimo não recebe a resposta guardada para outro.
+    """
+    for nome, valor in scope["headers"]:
+        if nome == b"authorization":
+            autorizacao = valor.decode("latin-1")
+            if autorizacao[:7].lower() == "bearer ":
+                payload = verificar_token(autorizacao[7:].strip())
+                if payload and payload.get("sub"):
+                    return f"usuario:{payload['sub']}"
+    cliente = scope.get("client")
+    return f"anonimo:{cliente[0] if cliente else 'desconhecido'}"
+
+
+async def _ler_corpo(receive) -> bytes:
+    partes = []
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            break
+        partes.append(mensagem.get("body", b""))
+        if not mensagem.get("more_body", False):
+            break
+    return b"".join(partes)
+
+
+class IdempotenciaMiddleware:
+    """
+    Middleware ASGI que torna seguras as repetições de POST com `Idempotency-Key`.
+
+    A primeira requisição com uma chave reserva-a (tabela `idempotencia` do
+    banco do tenant), executa normalmente e guarda a resposta por
+    IDEMPOTENCIA_TTL. As repetições recebem a resposta guardada, com o
+    cabeçalho `Idempotent-Replayed: true`, sem executar o handler de novo;
+    as que chegam enquanto a primeira ainda executa aguardam o resultado.
+
+    A chave vale por rota e por usuário (sem token, por endereço do cliente,
+    que o Uvicorn já resolve a partir do proxy). Reutilizá-la com outro corpo
+    é recusado com 422. Respostas 5xx não são guardadas: a reserva é
+    desfeita e a próxima tentativa executa de novo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in ROTAS_IDEMPOTENTES:
+            await self.app(scope, receive, send)
+            return
+
+        chave_cliente = None
+        for nome, valor in scope["headers"]:
+            if nome == CABECALHO_CHAVE:
+                chave_cliente = valor.decode("latin-1").strip()
+                break
+        if chave_cliente is None:
+            await self.app(scope, receive, send)
+            return
+        if not chave_cliente or len(chave_cliente) > TAMANHO_MAXIMO_CHAVE:
+            for mensagem in _resposta_erro(400, f"Idempotency-Key deve ter de 1 a {TAMANHO_MAXIMO_CHAVE} caracteres."):
+                await send(mensagem)
+            return
+
+        corpo = await _ler_corpo(receive)
+        impressao = hashlib.sha256(corpo).hexdigest()
+        chave = hashlib.sha256(
+            "\x00".join((_sujeito(scope), scope["method"], scope["path"], chave_cliente)).encode()
+        ).hexdigest()
+
+        registro = await idempotenciaService.iniciar(chave, impressao)
+        if registro is not None:
+            if registro.impressao != impressao:
+                for mensagem in _resposta_erro(422, "Idempotency-Key já utilizada com outra requisição."):
+                    await send(mensagem)
+                return
+            await send({
+                "type": "http.response.start",
+                "status": registro.status,
+                "headers": idempotenciaService.cabecalhos_guardados(registro) + [(b"idempotent-replayed", b"true")],
+            })
+            await send({"type": "http.response.body", "body": registro.corpo})
+            return
+
+        corpo_entregue = False
+
+        async def receive_com_corpo():
+            nonlocal corpo_entregue
+            if not corpo_entregue:
+                corpo_entregue = True
+                return {"type": "http.request", "body": corpo, "more_body": False}
+            return await receive()
+
+        inicio: dict = {}
+        partes: list[bytes] = []
+        tamanho = 0
+
+        async def send_capturando(mensagem):
+            nonlocal tamanho
+            if mensagem["type"] == "http.response.start":
+                inicio.update(mensagem)
+            elif mensagem["type"] == "http.response.body" and tamanho <= TAMANHO_MAXIMO_RESPOSTA:
+                parte = mensagem.get("body", b"")
+                partes.append(parte)
+                tamanho += len(parte)
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive_com_corpo, send_capturando)
+        except BaseException:
+            await idempotenciaService.liberar(chave)
+            raise
+
+        status = inicio.get("status", 500)
+        if status >= 500 or tamanho > TAMANHO_MAXIMO_RESPOSTA:
+            await idempotenciaService.liberar(chave)
+        else:
+            await idempotenciaService.concluir(chave, status, list(inicio.get("headers", [])), b"".join(partes))
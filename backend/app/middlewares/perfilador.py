@@ -0,0 +1,206 @@
+# app/middlewares/perfilador.py
+
+import os
+import re
+import sys
+import hmac
+import time
+import asyncio
+import hashlib
+import secrets
+import threading
+from collections import Counter
+
+from app.auth.auth import SECRET_KEY
+from app.utils.fastLog import LOG_DIR, log
+
+# Pasta (dentro da pasta de logs) onde os perfis são gravados
+PASTA_PERFIS = os.path.join(LOG_DIR, "perfis")
+# Perfila automaticamente 1 a cada N requisições (0 desativa)
+AMOSTRAGEM = int(os.getenv("PERFILADOR_AMOSTRAGEM", "0"))
+# Intervalo entre amostras da pilha (segundos)
+INTERVALO_AMOSTRA = float(os.getenv("PERFILADOR_INTERVALO", "0.005"))
+# Validade (s) de uma assinatura de `assinar_caminho` e o máximo aceito
+VALIDADE_ASSINATURA = float(os.getenv("PERFILADOR_VALIDADE", "300"))
+VALIDADE_MAXIMA = 3600.0
+# Retenção dos perfis gravados: quantidade máxima de arquivos e idade máxima (horas)
+MAX_ARQUIVOS = int(os.getenv("PERFILADOR_MAX_ARQUIVOS", "200"))
+RETENCAO_HORAS = float(os.getenv("PERFILADOR_RETENCAO_HORAS", "72"))
+
+CABECALHO_ASSINATURA = b"x-perfilar"
+CABECALHO_ARQUIVO = b"x-perfil"
+CABECALHO_SIMULTANEAS = b"x-perfil-simultaneas"
+
+
+def _hmac(metodo: str, caminho: str, expira_em: int, nonce: str) -> str:
+    mensagem = f"{metodo.upper()} {caminho} {expira_em} {nonce}".encode()
+    return hmac.new(SECRET_KEY.encode(), mensagem, hashlib.sha256).hexdigest()
+
+
+def assinar_caminho(metodo: str, caminho: str, validade: float = VALIDADE_ASSINATURA) -> str:
+    """
+    Gera o valor do cabeçalho `X-Perfilar` que autoriza perfilar uma rota:
+    "<expira_em>.<nonce>.<assinatura>".
+
+    A assinatura é um HMAC-SHA256 de "METODO caminho expira_em nonce" com a
+    chave da aplicação, então só quem tem a chave consegue ligar o
+    perfilador em produção. Vale por `validade` segundos (no máximo
+    VALIDADE_MAXIMA) e uma única vez em cada worker.
+    """
+    expira_em = int(time.time() + min(validade, VALIDADE_MAXIMA))
+    nonce = secrets.token_hex(8)
+    return f"{expira_em}.{nonce}.{_hmac(metodo, caminho, expira_em, nonce)}"
+
+
+class _Amostrador(threading.Thread):
+    """
+    Perfilador estatístico: em uma thread à parte, lê periodicamente a pilha
+    da thread do event loop e conta cada pilha no formato "folded"
+    (raiz;...;folha), aceito por flamegraph.pl, speedscope e similares.
+    """
+
+    def __init__(self, id_thread: int, intervalo: float):
+        super().__init__(daemon=True)
+        self.id_thread = id_thread
+        self.intervalo = intervalo
+        self.pilhas: Counter[str] = Counter()
+        self._parar = threading.Event()
+
+    def run(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.id_thread)
+            quadros = []
+            while frame is not None:
+                codigo = frame.f_code
+                quadros.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                frame = frame.f_back
+            if quadros:
+                self.pilhas[";".join(reversed(quadros))] += 1
+
+    def parar(self) -> None:
+        self._parar.set()
+        self.join()
+
+
+def _gravar(caminho: str, pilhas: Counter) -> None:
+    pasta = os.path.dirname(caminho)
+    os.makedirs(pasta, exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for pilha, quantidade in pilhas.most_common():
+            arquivo.write(f"{pilha} {quantidade}\n")
+    _aplicar_retencao(pasta)
+
+
+def _aplicar_retencao(pasta: str) -> None:
+    """Apaga os perfis mais antigos que RETENCAO_HORAS e os que excedem MAX_ARQUIVOS."""
+    limite = time.time() - RETENCAO_HORAS * 3600
+    arquivos = []
+    for entrada in os.scandir(pasta):
+        if entrada.is_file() and entrada.name.endswith(".folded"):
+            arquivos.append((entrada.stat().st_mtime, entrada.path))
+    arquivos.sort(reverse=True)
+    for posicao, (modificado_em, caminho) in enumerate(arquivos):
+        if posicao >= MAX_ARQUIVOS or modificado_em < limite:
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass  # outro worker já apagou
+
+
+class PerfiladorMiddleware:
+    """
+    Middleware ASGI que perfila uma requisição sob demanda.
+
+    Ativa quando a requisição traz `X-Perfilar` com a assinatura de
+    `assinar_caminho` ou, com PERFILADOR_AMOSTRAGEM=N, a cada N requisições.
+    O perfil é gravado em `logs/perfis/*.folded` (mantidos os MAX_ARQUIVOS
+    mais recentes, por até RETENCAO_HORAS) e o nome do arquivo volta no
+    cabeçalho `X-Perfil`. Um perfil por vez por worker: as demais requisições
+    seguem sem perfilador. Inativo, o custo é um contador e a busca de um
+    cabeçalho.
+
+    O amostrador lê a pilha da thread do event loop, que atende todas as
+    requisições do worker: as que rodaram ao mesmo tempo também aparecem no
+    perfil. O máximo de requisições simultâneas durante o perfil vai no
+    cabeçalho `X-Perfil-Simultaneas` (até o início da resposta) e no log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._contador = 0
+        self._ocupado = False
+        self._em_andamento = 0
+        self._simultaneas = 0
+        # nonce -> expiração: cada assinatura é aceita uma vez por worker
+        self._nonces_usados: dict[str, int] = {}
+
+    def _assinatura_valida(self, scope, valor: str) -> bool:
+        try:
+            expira_em, nonce, assinatura = valor.split(".")
+            expira_em = int(expira_em)
+        except ValueError:
+            return False
+        agora = time.time()
+        if not agora < expira_em <= agora + VALIDADE_MAXIMA:
+            return False
+        esperado = _hmac(scope["method"], scope["path"], expira_em, nonce)
+        if not hmac.compare_digest(assinatura, esperado):
+            return False
+        self._nonces_usados = {n: e for n, e in self._nonces_usados.items() if e > agora}
+        if nonce in self._nonces_usados:
+            return False
+        self._nonces_usados[nonce] = expira_em
+        return True
+
+    def _deve_perfilar(self, scope) -> bool:
+        if AMOSTRAGEM:
+            self._contador += 1
+            if self._contador % AMOSTRAGEM == 0:
+                return True
+        for nome, valor in scope["headers"]:
+            if nome == CABECALHO_ASSINATURA:
+                return self._assinatura_valida(scope, valor.decode("latin-1"))
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        self._em_andamento += 1
+        self._simultaneas = max(self._simultaneas, self._em_andamento)
+        try:
+            if self._ocupado or not self._deve_perfilar(scope):
+                await self.app(scope, receive, send)
+            else:
+                await self._perfilar(scope, receive, send)
+        finally:
+            self._em_andamento -= 1
+
+    async def _perfilar(self, scope, receive, send):
+        self._ocupado = True
+        self._simultaneas = self._em_andamento
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "raiz"
+        nome_arquivo = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}-{scope['method']}-{slug}.folded"
+
+        async def send_com_cabecalho(mensagem):
+            if mensagem["type"] == "http.response.start":
+                cabecalhos = list(mensagem.get("headers", []))
+                cabecalhos.append((CABECALHO_ARQUIVO, f"perfis/{nome_arquivo}".encode()))
+                cabecalhos.append((CABECALHO_SIMULTANEAS, str(self._simultaneas).encode()))
+                mensagem = {**mensagem, "headers": cabecalhos}
+            await send(mensagem)
+
+        amostrador = _Amostrador(threading.get_ident(), INTERVALO_AMOSTRA)
+        amostrador.start()
+        try:
+            await self.app(scope, receive, send_com_cabecalho)
+        finally:
+            amostrador.parar()
+            self._ocupado = False
+            if self._simultaneas > 1:
+                log.info(
+                    f"Perfil {nome_arquivo}: até {self._simultaneas} requisições simultâneas nas amostras",
+                    module="Perfilador"
+                )
+            await asyncio.to_thread(_gravar, os.path.join(PASTA_PERFIS, nome_arquivo), amostrador.pilhas)
@@ -0,0 +1,88 @@
+# app/middlewares/prazo.py
+
+import os
+import asyncio
+
+from app.database import OrcamentoConsulta, orcamento_consulta
+
+# Tempo (s) que as consultas de uma requisição podem somar; 0 desativa
+TEMPO_PADRAO = float(os.getenv("CONSULTA_TEMPO_LIMITE", "10"))
+# Listagens e filtros livres recebem um orçamento menor
+TEMPO_LISTAGEM = float(os.getenv("CONSULTA_TEMPO_LIMITE_LISTAGEM", "5"))
+
+# (método, caminho) -> orçamento; o que não estiver aqui usa TEMPO_PADRAO
+TEMPO_ROTAS = {
+    ("POST", "/usuarios/consulta_filtrada"): TEMPO_LISTAGEM,
+    ("GET", "/usuarios/"): TEMPO_LISTAGEM,
+    ("GET", "/usuarios/changes"): TEMPO_LISTAGEM,
+    ("GET", "/auditoria/"): TEMPO_LISTAGEM,
+}
+# Conexões de longa duração não têm orçamento (não fazem consultas na requisição)
+PREFIXOS_IGNORADOS = ("/eventos",)
+
+
+class PrazoConsultaMiddleware:
+    """
+    Middleware ASGI que dá a cada requisição um orçamento de tempo de banco
+    (ver `OrcamentoConsulta`) e cancela as consultas em andamento quando o
+    cliente desconecta.
+
+    O corpo é lido antes de chamar a aplicação; a partir daí uma tarefa fica
+    aguardando o `http.disconnect` do servidor e, se ele chegar antes da
+    resposta, interrompe o comando que estiver executando, devolvendo a
+    conexão ao pool em vez de terminar uma consulta que ninguém vai ler.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(PREFIXOS_IGNORADOS):
+            await self.app(scope, receive, send)
+            return
+        limite = TEMPO_ROTAS.get((scope["method"], scope["path"]), TEMPO_PADRAO)
+        if limite <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        partes = []
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "http.disconnect":
+                return
+            partes.append(mensagem.get("body", b""))
+            if not mensagem.get("more_body", False):
+                break
+
+        orcamento = OrcamentoConsulta(limite)
+        desconexao = asyncio.get_running_loop().create_future()
+        respondido = False
+
+        async def vigiar():
+            mensagem = await receive()
+            if mensagem["type"] == "http.disconnect" and not respondido:
+                orcamento.cancelar()
+            desconexao.set_result(mensagem)
+
+        corpo_entregue = False
+
+        async def receive_com_corpo():
+            nonlocal corpo_entregue
+            if not corpo_entregue:
+                corpo_entregue = True
+                return {"type": "http.request", "body": b"".join(partes), "more_body": False}
+            return await asyncio.shield(desconexao)
+
+        async def send_registrando(mensagem):
+            nonlocal respondido
+            if mensagem["type"] == "http.response.body" and not mensagem.get("more_body", False):
+                respondido = True
+            await send(mensagem)
+
+        vigia = asyncio.create_task(vigiar())
+        token = orcamento_consulta.set(orcamento)
+        try:
+            await self.app(scope, receive_com_corpo, send_registrando)
+        finally:
+            orcamento_consulta.reset(token)
+            vigia.cancel()
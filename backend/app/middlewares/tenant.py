@@ -0,0 +1,110 @@
+# app/middlewares/tenant.py
+
+import os
+
+from app.auth.auth import verificar_token
+from app.database import preparar_tenant, tenant_atual, tenant_valido
+from app.schemas.shared.response import ResponseModel
+from app.services.principal.tenantService import tenant_ativo
+
+# Cabeçalho com o tenant, usado quando a requisição não traz token (ex.: login)
+CABECALHO_TENANT = os.getenv("TENANT_CABECALHO", "X-Tenant").lower().encode()
+# Únicas rotas em que o cabeçalho vale sem token; nas demais ele só é
+# aceito se coincidir com o tenant de um token válido
+ROTAS_CABECALHO_SEM_TOKEN = {("POST", "/usuarios/login")}
+
+
+def _resposta_erro(status: int, mensagem: str) -> tuple[dict, dict]:
+    corpo = ResponseModel(status="error", mensagem=mensagem, dados=None).model_dump_json().encode()
+    inicio = {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+        ],
+    }
+    return inicio, {"type": "http.response.body", "body": corpo}
+
+
+def resolver_tenant(cabecalhos: list[tuple[bytes, bytes]], rota: tuple[str, str]) -> str | None:
+    """
+    Define o tenant da requisição a partir do token ou do cabeçalho.
+
+    Um token válido manda: o tenant é a claim `tenant` emitida no login (None
+    para o banco padrão), e um cabeçalho divergente é recusado. Sem token
+    válido, o cabeçalho só vale nas rotas de ROTAS_CABECALHO_SEM_TOKEN.
+
+    Raises:
+        PermissionError: Cabeçalho diverge do tenant do token, ou foi
+            enviado sem token fora do login.
+        ValueError: Id de tenant com formato inválido.
+    """
+    cabecalho = None
+    autorizacao = None
+    for nome, valor in cabecalhos:
+        if nome == CABECALHO_TENANT:
+            cabecalho = valor.decode("latin-1").strip() or None
+        elif nome == b"authorization":
+            autorizacao = valor.decode("latin-1")
+
+    if autorizacao and autorizacao[:7].lower() == "bearer ":
+        payload = verificar_token(autorizacao[7:].strip())
+        if payload:
+            tenant = payload.get("tenant")
+            if cabecalho is not None and cabecalho != tenant:
+                raise PermissionError("Tenant do cabeçalho não corresponde ao do token.")
+            return tenant
+
+    if cabecalho is None:
+        return None
+    if rota not in ROTAS_CABECALHO_SEM_TOKEN:
+        raise PermissionError("O cabeçalho de tenant exige um token válido do mesmo tenant.")
+    if not tenant_valido(cabecalho):
+        raise ValueError(f"Tenant inválido: {cabecalho!r}")
+    return cabecalho
+
+
+class TenantMiddleware:
+    """
+    Middleware ASGI que seleciona o banco do tenant para a requisição.
+
+    Resolve o tenant, confere se ele está cadastrado e ativo (404 se não),
+    garante que o banco dele está aberto e o publica em `tenant_atual`, que
+    o `SessionLocal` consulta para escolher o engine. Bancos de tenant só
+    são criados no provisionamento (`tenantService.provisionar`), nunca
+    por uma requisição.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            tenant = resolver_tenant(scope["headers"], (scope["method"], scope["path"]))
+            if tenant is not None:
+                if not await tenant_ativo(tenant):
+                    raise LookupError(f"Tenant não encontrado: {tenant!r}")
+                await preparar_tenant(tenant)
+        except LookupError as exc:
+            for mensagem in _resposta_erro(404, str(exc)):
+                await send(mensagem)
+            return
+        except PermissionError as exc:
+            for mensagem in _resposta_erro(403, str(exc)):
+                await send(mensagem)
+            return
+        except ValueError as exc:
+            for mensagem in _resposta_erro(400, str(exc)):
+                await send(mensagem)
+            return
+
+        token = tenant_atual.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            tenant_atual.reset(token)
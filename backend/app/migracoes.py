@@ -0,0 +1,116 @@
+# app/migracoes.py
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Colunas adicionadas a tabelas já existentes: (tabela, coluna, definição).
+# O `create_all` só cria tabelas novas, então bancos criados antes de cada
+# coluna recebem um ALTER TABLE na inicialização.
+COLUNAS_ADICIONADAS = [
+    ("usuarios", "versao", "INTEGER NOT NULL DEFAULT 1"),
+    ("perfil", "versao", "INTEGER NOT NULL DEFAULT 1"),
+    ("usuarios", "perfil_id", "INTEGER REFERENCES perfil(id)"),
+    ("usuarios_arquivo", "perfil_id", "INTEGER REFERENCES perfil(id)"),
+]
+
+# Índices de colunas adicionadas: (nome, tabela, coluna), com o nome que o
+# `create_all` daria em um banco novo
+INDICES_ADICIONADOS = [
+    ("ix_usuarios_perfil_id", "usuarios", "perfil_id"),
+    ("ix_usuarios_arquivo_perfil_id", "usuarios_arquivo", "perfil_id"),
+]
+
+# Linhas convertidas por transação nos preenchimentos de dados
+LOTE_PREENCHIMENTO = 5000
+
+# Gatilhos: (nome, definição). Login e email continuam únicos entre
+# `usuarios` e `usuarios_arquivo`; o erro tem o mesmo texto do UNIQUE do
+# SQLite, então chega ao cliente como qualquer outra duplicidade.
+_CONFERE_ARQUIVO = """
+    SELECT RAISE(ABORT, 'UNIQUE constraint failed: usuarios.login')
+        WHERE EXISTS (SELECT 1 FROM usuarios_arquivo WHERE login = NEW.login);
+    SELECT RAISE(ABORT, 'UNIQUE constraint failed: usuarios.email')
+        WHERE EXISTS (SELECT 1 FROM usuarios_arquivo WHERE email = NEW.email);
+"""
+GATILHOS = [
+    ("usuarios_unicos_arquivo_insert",
+     f"BEFORE INSERT ON usuarios BEGIN {_CONFERE_ARQUIVO} END"),
+    # O id também não pode repetir o de um arquivado (só o restaurado, que
+    # sai do arquivo antes de voltar). Confere ids informados no INSERT: os
+    # gerados pelo SQLite ainda não existem no BEFORE INSERT.
+    ("usuarios_id_arquivo_insert",
+     "BEFORE INSERT ON usuarios WHEN EXISTS (SELECT 1 FROM usuarios_arquivo WHERE id = NEW.id) "
+     "BEGIN SELECT RAISE(ABORT, 'UNIQUE constraint failed: usuarios.id'); END"),
+    ("usuarios_unicos_arquivo_update",
+     f"BEFORE UPDATE OF login, email ON usuarios BEGIN {_CONFERE_ARQUIVO} END"),
+]
+
+
+def _colunas(conn: Connection, tabela: str) -> set[str]:
+    return {linha[1] for linha in conn.execute(text(f"PRAGMA table_info({tabela})"))}
+
+
+def aplicar_migracoes(conn: Connection) -> None:
+    """
+    Ajusta o esquema de um banco existente ao dos modelos.
+
+    Chamada (via `run_sync`) logo após o `create_all`, no banco padrão e no
+    de cada tenant, na mesma transação com o lock de escrita (ver
+    `criar_esquema`): cada passo verifica o estado atual antes de agir, e
+    nenhum outro processo altera o esquema entre a verificação e o ALTER.
+    Rodar de novo não tem efeito.
+    """
+    for tabela, coluna, definicao in COLUNAS_ADICIONADAS:
+        if coluna not in _colunas(conn, tabela):
+            conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}"))
+    for nome, tabela, coluna in INDICES_ADICIONADOS:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({coluna})"))
+    for nome, definicao in GATILHOS:
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {nome} {definicao}"))
+
+
+def preencher_dados(conn: Connection) -> None:
+    """
+    Converte os dados de bancos criados antes de uma mudança de esquema, em
+    lotes de LOTE_PREENCHIMENTO linhas com um commit por lote (`conn` deve
+    estar no modo "commit as you go", fora de `engine.begin()`), para não
+    segurar o lock de escrita do banco durante toda a conversão.
+
+    Hoje: a coluna de texto `perfil` de `usuarios` e `usuarios_arquivo`
+    vira `perfil_id`. Nomes de perfil sem cadastro ganham um perfil novo;
+    a coluna antiga só é removida depois que todas as linhas têm o id, então
+    uma conversão interrompida continua de onde parou na próxima inicialização.
+
+    Cada lote começa com o lock de escrita e confere a coluna de novo: se
+    outro processo converter o mesmo banco ao mesmo tempo, quem chega
+    depois encontra a conversão feita (ou a continua) em vez de falhar.
+    """
+    for tabela in ("usuarios", "usuarios_arquivo"):
+        primeiro_lote = True
+        while True:
+            if conn.dialect.name == "sqlite":
+                conn.execute(text("BEGIN IMMEDIATE"))
+            if "perfil" not in _colunas(conn, tabela):
+                conn.commit()
+                break
+            if primeiro_lote:
+                conn.execute(text(
+                    f"INSERT INTO perfil (nome, descricao, versao) "
+                    f"SELECT DISTINCT {tabela}.perfil, {tabela}.perfil, 1 FROM {tabela} "
+                    f"WHERE {tabela}.perfil_id IS NULL AND {tabela}.perfil NOT IN (SELECT nome FROM perfil)"
+                ))
+                primeiro_lote = False
+            resultado = conn.execute(
+                text(
+                    f"UPDATE {tabela} SET perfil_id = "
+                    f"(SELECT min(perfil.id) FROM perfil WHERE perfil.nome = {tabela}.perfil) "
+                    f"WHERE rowid IN (SELECT rowid FROM {tabela} WHERE perfil_id IS NULL LIMIT :lote)"
+                ),
+                {"lote": LOTE_PREENCHIMENTO},
+            )
+            concluido = resultado.rowcount < LOTE_PREENCHIMENTO
+            if concluido:
+                conn.execute(text(f"ALTER TABLE {tabela} DROP COLUMN perfil"))
+            conn.commit()
+            if concluido:
+                break
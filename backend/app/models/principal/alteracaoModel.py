@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime, timezone
+from app.database import Base
+
+class AlteracaoModel(Base):
+    """
+    Log de alterações: cada insert, update ou delete nas entidades gera uma
+    linha na mesma transação da escrita. `seq` é crescente e serve de cursor
+    para o feed incremental.
+    """
+    __tablename__ = "alteracao"
+    __table_args__ = (
+        Index("ix_alteracao_entidade_seq", "entidade", "seq"),
+        # AUTOINCREMENT garante que um seq nunca é reaproveitado
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entidade = Column(String, nullable=False)        # "usuario" | "perfil"
+    registro_id = Column(Integer, nullable=False)
+    operacao = Column(String(1), nullable=False)     # "I" | "U" | "D" | "A" (arquivado)
+    data = Column(DateTime, default=lambda: datetime.now(timezone.utc))
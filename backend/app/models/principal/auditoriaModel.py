@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from app.database import Base
+
+class AuditoriaModel(Base):
+    __tablename__ = "auditoria"
+    __table_args__ = (
+        # Consulta típica: histórico de um registro, do mais recente ao mais antigo
+        Index("ix_auditoria_entidade_registro", "entidade", "registro_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entidade = Column(String, nullable=False)        # "usuario" | "perfil"
+    registro_id = Column(Integer, nullable=False)
+    operacao = Column(String(1), nullable=False)     # "I" | "U" | "D"
+    dados = Column(Text, nullable=True)              # JSON com os campos gravados
+    data = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+class CacheVersaoModel(Base):
+    __tablename__ = "cache_versao"
+
+    # Versão compartilhada entre os workers: quem altera os dados incrementa,
+    # quem mantém cache local compara e descarta o cache ao notar diferença
+    nome = Column(String, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Text
+from app.database import Base
+
+class IdempotenciaModel(Base):
+    """
+    Resposta guardada para uma `Idempotency-Key`.
+
+    Enquanto a primeira tentativa está em andamento a linha existe sem
+    `status` e `expira_em` marca até quando ela vale como reserva; depois de
+    concluída, guarda a resposta até `expira_em`.
+    """
+    __tablename__ = "idempotencia"
+
+    # sha256 de (usuário, método, caminho, chave)
+    chave = Column(String(64), primary_key=True)
+    # sha256 do corpo da requisição: a mesma chave com outro corpo é recusada
+    impressao = Column(String(64), nullable=False)
+    status = Column(Integer, nullable=True)
+    cabecalhos = Column(Text, nullable=True)        # JSON: [[nome, valor], ...]
+    corpo = Column(LargeBinary, nullable=True)
+    expira_em = Column(DateTime, index=True, nullable=False)
@@ -10,6 +10,7 @@ class perfilModel(Base):
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String, nullable=False)
     descricao = Column(String, nullable=False)
+    versao = Column(Integer, default=1, server_default="1", nullable=False)  # controle de concorrência otimista
 
     permissoes = relationship(
         perfilpermissaoModel,
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, Boolean, DateTime
+from app.database import Base
+
+class TenantModel(Base):
+    # Cadastro dos tenants, no banco padrão: só os ativos daqui são aceitos
+    # nas requisições, e o banco de cada um é criado no provisionamento
+    __tablename__ = "tenant"
+
+    id = Column(String(64), primary_key=True)
+    ativo = Column(Boolean, nullable=False, default=True)
+    criado_em = Column(DateTime, nullable=False)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.database import Base
+
+class TokenRevogadoModel(Base):
+    __tablename__ = "token_revogado"
+    # AUTOINCREMENT impede o SQLite de reaproveitar ids após a limpeza dos expirados
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    # id crescente: permite que cada worker busque apenas as revogações novas
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String, unique=True, index=True, nullable=False)
+    expira_em = Column(DateTime, index=True, nullable=False)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from datetime import datetime, timezone
+from app.database import Base
+
+class UsuarioArquivoModel(Base):
+    """
+    Usuários inativos antigos, movidos da tabela `usuarios` pelo
+    arquivamento. Mesmas colunas (e mesmo id) do registro original, para
+    que as leituras os devolvam como se nunca tivessem saído; uma
+    atualização traz o usuário de volta para `usuarios`.
+    """
+    __tablename__ = "usuarios_arquivo"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    nome = Column(String, nullable=False)
+    login = Column(String, unique=True, index=True, nullable=False)
+    senha = Column(String, nullable=False)
+    email = Column(String, unique=True, nullable=False)
+    ativo = Column(Boolean, nullable=False)
+    perfil_id = Column(Integer, ForeignKey("perfil.id"), index=True, nullable=False)
+    data_criacao = Column(DateTime)
+    versao = Column(Integer, nullable=False)
+    arquivado_em = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
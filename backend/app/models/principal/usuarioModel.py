@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, select
+from sqlalchemy.orm import column_property, deferred
 from datetime import datetime, timezone
 from app.database import Base
+from app.models.principal.perfilModel import perfilModel
 
 class UsuarioModel(Base):
     __tablename__ = "usuarios"
@@ -11,5 +13,12 @@ class UsuarioModel(Base):
     senha = Column(String, nullable=False)
     email = Column(String, unique=True, nullable=False)         # ← novo campo
     ativo = Column(Boolean, default=True, nullable=False)       # ← novo campo
-    perfil = Column(String, nullable=False)
+    perfil_id = Column(Integer, ForeignKey("perfil.id"), index=True, nullable=False)
     data_criacao = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    versao = Column(Integer, default=1, server_default="1", nullable=False)  # controle de concorrência otimista
+
+    # Nome do perfil, só para ordenar por ele no SQL (a API traduz `perfil` para
+    # esta coluna na ordenação e para `perfil_id` nos filtros); nunca é carregado
+    perfil_nome = deferred(column_property(
+        select(perfilModel.nome).where(perfilModel.id == perfil_id).scalar_subquery()
+    ))
@@ -0,0 +1,82 @@
+import asyncio
+from collections.abc import Callable
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import fabrica_sessao_tenant, orcamento_consulta, tenant_atual
+from app.utils import metricas
+
+# Máximo de ids por `IN (...)`, abaixo do limite de parâmetros do SQLite
+TAMANHO_LOTE = 500
+
+
+class CarregadorPorId:
+    """
+    Agrupa buscas por id concorrentes em uma única consulta `WHERE id IN (...)`,
+    no estilo DataLoader.
+
+    As chamadas feitas na mesma volta do event loop (inclusive vindas de
+    requisições diferentes) são acumuladas e despachadas juntas na volta
+    seguinte, em uma sessão própria do carregador. Os modelos retornados
+    ficam desanexados da sessão: servem para leitura, não para alteração.
+
+    Os pedidos são agrupados também por tenant: cada tenant pendente gera a
+    sua consulta, no seu banco.
+    """
+
+    def __init__(self,
+                 modelo: type,
+                 fabrica_sessao: Callable[[str | None], async_sessionmaker] = fabrica_sessao_tenant):
+        self.modelo = modelo
+        self.fabrica_sessao = fabrica_sessao
+        self._pendentes: dict[tuple[str | None, int], list[asyncio.Future]] = {}
+
+    async def carregar(self, id_: int) -> object | None:
+        """Retorna o registro com o id informado, ou None se não existir."""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        if not self._pendentes:
+            loop.call_soon(lambda: asyncio.ensure_future(self._despachar()))
+        self._pendentes.setdefault((tenant_atual.get(), id_), []).append(futuro)
+        return await futuro
+
+    async def carregar_varios(self, ids: list[int]) -> list[object | None]:
+        """Retorna os registros na mesma ordem dos ids (None para os inexistentes)."""
+        return list(await asyncio.gather(*(self.carregar(i) for i in ids)))
+
+    async def _despachar(self) -> None:
+        # O lote atende a várias requisições: o desconectar de uma (a que
+        # agendou o despacho) não deve interromper a consulta das demais
+        orcamento = orcamento_consulta.get()
+        if orcamento is not None:
+            orcamento_consulta.set(orcamento.desvinculado())
+        pendentes, self._pendentes = self._pendentes, {}
+        por_tenant: dict[str | None, dict[int, list[asyncio.Future]]] = {}
+        for (tenant, id_), futuros in pendentes.items():
+            por_tenant.setdefault(tenant, {})[id_] = futuros
+        for tenant, futuros_por_id in por_tenant.items():
+            await self._despachar_tenant(tenant, futuros_por_id)
+
+    async def _despachar_tenant(self, tenant: str | None, pendentes: dict[int, list[asyncio.Future]]) -> None:
+        ids = list(pendentes)
+        nome = self.modelo.__tablename__
+        try:
+            encontrados = {}
+            async with self.fabrica_sessao(tenant)() as db:
+                for inicio in range(0, len(ids), TAMANHO_LOTE):
+                    lote = ids[inicio:inicio + TAMANHO_LOTE]
+                    resultado = await db.execute(select(self.modelo).where(self.modelo.id.in_(lote)))
+                    encontrados.update((m.id, m) for m in resultado.scalars())
+                    metricas.incrementar(f"carregador.{nome}.consultas")
+        except Exception as exc:
+            for futuros in pendentes.values():
+                for futuro in futuros:
+                    if not futuro.done():
+                        futuro.set_exception(exc)
+            return
+
+        metricas.incrementar(f"carregador.{nome}.ids", len(ids))
+        for id_, futuros in pendentes.items():
+            for futuro in futuros:
+                if not futuro.done():
+                    futuro.set_result(encontrados.get(id_))
@@ -0,0 +1,298 @@
+import os
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import fabrica_sessao_tenant, orcamento_consulta, tenant_atual
+from app.utils import metricas
+from app.utils.fastLog import log
+
+# Tempo (ms) que o escritor espera por mais operações depois da primeira
+JANELA_MS = float(os.getenv("ESCRITA_JANELA_MS", "2"))
+# Máximo de operações por transação
+TAMANHO_LOTE = int(os.getenv("ESCRITA_LOTE", "100"))
+# Segundos sem operações até a tarefa do escritor de um tenant encerrar
+OCIOSIDADE = 60.0
+
+Operacao = Callable[[AsyncSession], Awaitable[Any]]
+Acao = Callable[[], Awaitable[None]]
+
+_ENCERRAR = object()
+
+
+class _SessaoDoLote:
+    """
+    Sessão entregue a cada operação do lote.
+
+    Repassa tudo à sessão real, exceto `commit`, que vira `flush`: os
+    repositórios continuam chamando `commit()` como de costume, mas quem
+    confirma a transação é o escritor, uma vez por lote.
+    """
+
+    def __init__(self, sessao: AsyncSession):
+        self._sessao = sessao
+
+    async def commit(self) -> None:
+        await self._sessao.flush()
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._sessao, nome)
+
+
+class _Transacao:
+    __slots__ = ("sessao", "pendentes")
+
+    def __init__(self, sessao: _SessaoDoLote):
+        self.sessao = sessao
+        # Ações a executar depois do COMMIT (ver `apos_confirmar`)
+        self.pendentes: list[Acao] = []
+
+
+# Transação de `executar_em_transacao` em andamento: só é vista pelo código
+# que roda dentro dela (na tarefa do escritor)
+_transacao_atual: ContextVar[_Transacao | None] = ContextVar("transacao_escritor", default=None)
+
+
+class _Pedido:
+    __slots__ = ("operacao", "futuro")
+
+    def __init__(self, operacao: Operacao, futuro: asyncio.Future):
+        self.operacao = operacao
+        self.futuro = futuro
+
+
+class EscritorAgrupado:
+    """
+    Group commit: uma única tarefa por tenant executa as escritas, juntando
+    as que chegam em até JANELA_MS (ou TAMANHO_LOTE operações) em uma só
+    transação — um fsync e uma aquisição do lock de escrita do SQLite por
+    lote, em vez de um por requisição.
+
+    Uma operação que falha (ex.: IntegrityError de um login repetido) é
+    desfeita sozinha e só o seu chamador recebe o erro; as demais seguem no
+    lote, cada uma em um SAVEPOINT próprio (ver `_executar_lote`). Por isso
+    uma operação pode ser executada mais de uma vez antes do COMMIT: ela só
+    deve ter efeitos na sessão recebida (os demais vão em `apos_confirmar`).
+    Os resultados são entregues depois do COMMIT, então o chamador só vê
+    sucesso do que foi gravado.
+
+    Os modelos retornados ficam desanexados da sessão (sem expirar no commit).
+    """
+
+    def __init__(self):
+        self._filas: dict[str | None, asyncio.Queue] = {}
+        self._tarefas: dict[str | None, asyncio.Task] = {}
+
+    async def executar(self, operacao: Operacao) -> Any:
+        """
+        Agenda `operacao(db)` no próximo lote do tenant atual e aguarda o resultado.
+
+        Args:
+            operacao (Callable): Recebe a sessão do lote e faz a escrita, do
+                jeito que faria com uma sessão comum (pode chamar `commit`).
+
+        Returns:
+            Any: O que a operação retornar, após o COMMIT do lote.
+
+        Dentro de `executar_em_transacao`, a operação não vai para a fila:
+        roda na hora, em um SAVEPOINT da transação em andamento, e o
+        resultado volta antes do COMMIT.
+        """
+        if _transacao_atual.get() is not None:
+            async with self.etapa() as sessao:
+                return await operacao(sessao)
+
+        tenant = tenant_atual.get()
+        fila = self._filas.get(tenant)
+        if fila is None:
+            fila = self._filas[tenant] = asyncio.Queue()
+            self._tarefas[tenant] = asyncio.create_task(self._processar(tenant, fila))
+        futuro = asyncio.get_running_loop().create_future()
+        fila.put_nowait(_Pedido(operacao, futuro))
+        return await futuro
+
+    async def executar_em_transacao(self, operacao: Operacao) -> Any:
+        """
+        Executa `operacao(db)` como uma única operação do escritor, na qual
+        várias escritas (inclusive as dos services, que chamam `executar`)
+        são confirmadas ou desfeitas juntas.
+
+        As ações registradas com `apos_confirmar` durante a operação só
+        rodam depois do COMMIT; se a operação falhar, tudo é desfeito, as
+        ações são descartadas e a exceção chega ao chamador.
+
+        Args:
+            operacao (Callable): Recebe a sessão da transação; pode usar
+                `etapa` para isolar partes que podem falhar sozinhas.
+
+        Returns:
+            Any: O que a operação retornar.
+        """
+        pendentes: list[Acao] = []
+
+        async def em_transacao(sessao: _SessaoDoLote) -> Any:
+            transacao = _Transacao(sessao)
+            token = _transacao_atual.set(transacao)
+            try:
+                resultado = await operacao(sessao)
+            finally:
+                _transacao_atual.reset(token)
+            # Atribuição, e não extend: o escritor pode refazer a operação
+            pendentes[:] = transacao.pendentes
+            return resultado
+
+        resultado = await self.executar(em_transacao)
+        for acao in pendentes:
+            try:
+                await acao()
+            except Exception as exc:
+                # A escrita já foi confirmada: a falha de um efeito não a desfaz
+                log.error(f"Falha em ação posterior ao commit: {exc}", module="Escritor")
+        return resultado
+
+    @asynccontextmanager
+    async def etapa(self) -> AsyncIterator[AsyncSession]:
+        """
+        SAVEPOINT dentro de `executar_em_transacao`: se o bloco falhar, só as
+        escritas dele são desfeitas e as ações que ele registrou em
+        `apos_confirmar` são descartadas; a exceção segue para quem chamou.
+        """
+        transacao = _transacao_atual.get()
+        if transacao is None:
+            raise RuntimeError("etapa() só pode ser usada dentro de executar_em_transacao().")
+        marca = len(transacao.pendentes)
+        try:
+            async with transacao.sessao.begin_nested():
+                yield transacao.sessao
+        except BaseException:
+            del transacao.pendentes[marca:]
+            raise
+
+    async def apos_confirmar(self, acao: Acao) -> None:
+        """
+        Executa `acao()` (invalidação de cache, eventos, auditoria...) depois
+        que a escrita que a originou estiver confirmada: na hora, fora de uma
+        transação de `executar_em_transacao`; dentro dela, após o COMMIT.
+        """
+        transacao = _transacao_atual.get()
+        if transacao is None:
+            await acao()
+        else:
+            transacao.pendentes.append(acao)
+
+    def sessao_em_transacao(self) -> AsyncSession | None:
+        """Sessão da transação de `executar_em_transacao` em andamento, se houver."""
+        transacao = _transacao_atual.get()
+        return transacao.sessao if transacao is not None else None
+
+    async def _processar(self, tenant: str | None, fila: asyncio.Queue) -> None:
+        # A tarefa nasce no contexto da requisição que a criou, mas serve a
+        # todas: sem o prazo de consulta dela, um lote nunca é interrompido
+        # no meio (o que desfaria as escritas dos outros chamadores)
+        orcamento_consulta.set(None)
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                primeiro = await asyncio.wait_for(fila.get(), OCIOSIDADE)
+            except asyncio.TimeoutError:
+                if fila.empty():
+                    del self._filas[tenant]
+                    del self._tarefas[tenant]
+                    return
+                continue
+
+            lote = [primeiro]
+            prazo = loop.time() + JANELA_MS / 1000
+            while len(lote) < TAMANHO_LOTE and lote[-1] is not _ENCERRAR:
+                try:
+                    lote.append(fila.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            encerrar = lote[-1] is _ENCERRAR
+            if encerrar:
+                lote.pop()
+            if lote:
+                try:
+                    await self._executar_lote(tenant, lote)
+                except Exception as exc:
+                    log.error(f"Falha no lote de escrita do tenant {tenant}: {exc}", module="Escritor")
+                    for pedido in lote:
+                        if not pedido.futuro.done():
+                            pedido.futuro.set_exception(exc)
+            if encerrar:
+                return
+
+    async def _executar_lote(self, tenant: str | None, lote: list[_Pedido]) -> None:
+        pedidos = [pedido for pedido in lote if not pedido.futuro.cancelled()]
+        async with fabrica_sessao_tenant(tenant)(expire_on_commit=False) as db:
+            if db.bind.dialect.name == "sqlite":
+                # Abre a transação explicitamente (e já com o lock de escrita):
+                # sem isso o driver não emite BEGIN antes do primeiro SAVEPOINT,
+                # e o RELEASE dele confirmaria cada operação em separado.
+                await db.execute(text("BEGIN IMMEDIATE"))
+            sessao = _SessaoDoLote(db)
+
+            # Primeira passada sem SAVEPOINT (dois comandos a menos por
+            # operação, quase sempre nenhuma falha). Se uma operação falhar,
+            # o lote é desfeito: ela recebe o erro, que é o mesmo que teria
+            # no seu SAVEPOINT (as anteriores já tinham sido aplicadas), e as
+            # demais são refeitas cada uma no seu SAVEPOINT.
+            concluidos: list[tuple[_Pedido, Any]] = []
+            falha = None
+            for indice, pedido in enumerate(pedidos):
+                try:
+                    concluidos.append((pedido, await pedido.operacao(sessao)))
+                except Exception as exc:
+                    falha = indice
+                    if not pedido.futuro.done():
+                        pedido.futuro.set_exception(exc)
+                    break
+
+            if falha is not None:
+                metricas.incrementar("escrita.lotes_refeitos")
+                await db.rollback()
+                if db.bind.dialect.name == "sqlite":
+                    await db.execute(text("BEGIN IMMEDIATE"))
+                concluidos = []
+                for pedido in pedidos[:falha] + pedidos[falha + 1:]:
+                    try:
+                        async with db.begin_nested():
+                            resultado = await pedido.operacao(sessao)
+                    except Exception as exc:
+                        if not pedido.futuro.done():
+                            pedido.futuro.set_exception(exc)
+                        continue
+                    concluidos.append((pedido, resultado))
+            await db.commit()
+
+        metricas.incrementar("escrita.lotes")
+        metricas.incrementar("escrita.operacoes", len(lote))
+        metricas.observar("escrita.tamanho_lote", len(lote))
+        for pedido, resultado in concluidos:
+            if not pedido.futuro.done():
+                pedido.futuro.set_result(resultado)
+
+    async def encerrar(self) -> None:
+        """Executa o que estiver enfileirado e encerra as tarefas dos tenants."""
+        for fila in self._filas.values():
+            fila.put_nowait(_ENCERRAR)
+        await asyncio.gather(*self._tarefas.values(), return_exceptions=True)
+        self._filas.clear()
+        self._tarefas.clear()
+
+
+escritor = EscritorAgrupado()
@@ -47,7 +47,7 @@ async def consulta_filtrada(
 
     # 3.1. Se houver colunas específicas, aplica load_only()
     if colunas:
-        validas = [c for c in colunas if hasattr(modelo, c)]
+        validas = [getattr(modelo, c) for c in colunas if hasattr(modelo, c)]
         if validas:
             stmt = stmt.options(load_only(*validas))
 
@@ -117,6 +117,10 @@ async def consulta_filtrada(
                 attr = getattr(modelo, col)
                 stmt = stmt.order_by(attr.desc() if direc.lower() == "desc" else attr.asc())
 
+    # 6.1. Desempate por id: a ordem dos empates não depende do plano da consulta
+    if hasattr(modelo, "id"):
+        stmt = stmt.order_by(modelo.id.asc())
+
     # 7. Limita resultados
     stmt = stmt.limit(limite)
 
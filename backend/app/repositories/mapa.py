@@ -0,0 +1,149 @@
+import os
+import time
+import asyncio
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import select
+
+from app.database import fabrica_sessao_tenant, orcamento_consulta, tenant_atual
+from app.repositories.escritor import escritor
+from app.repositories.principal import alteracaoRepository
+from app.repositories.snapshot import regex_like
+from app.utils import metricas
+
+# Segundos máximos entre leituras do log de alterações (escritas de outros workers)
+DEFASAGEM_SEGUNDOS = float(os.getenv("MAPA_DEFASAGEM", "1"))
+
+
+class _Estado:
+    __slots__ = ("nomes", "ids", "cursor", "sincronizado_em", "sujo")
+
+    def __init__(self, nomes: dict[int, str], cursor: int):
+        self.nomes = nomes
+        # Nomes repetidos: vale o de menor id
+        self.ids: dict[str, int] = {}
+        for id_, nome in sorted(nomes.items(), reverse=True):
+            self.ids[nome] = id_
+        self.cursor = cursor
+        self.sincronizado_em = time.monotonic()
+        self.sujo = False
+
+
+def _casa(nome: str, operador: str, valor: Any) -> bool:
+    """Avalia `nome <operador> valor` como o SQLite faria em uma coluna TEXT."""
+    if operador == "in":
+        if not isinstance(valor, (list, tuple)):
+            raise ValueError(f"'in' requer lista ou tupla, recebeu {type(valor)}")
+        return nome in [str(v) for v in valor if v is not None]
+    if valor is None:
+        return False
+    valor = str(valor) if not isinstance(valor, bool) else str(int(valor))
+    if operador in ("like", "ilike"):
+        return regex_like(f"%{valor}%").fullmatch(nome) is not None
+    if operador == "=":
+        return nome == valor
+    if operador == "!=":
+        return nome != valor
+    if operador == ">":
+        return nome > valor
+    if operador == "<":
+        return nome < valor
+    if operador == ">=":
+        return nome >= valor
+    if operador == "<=":
+        return nome <= valor
+    raise ValueError(f"Operador desconhecido: {operador}")
+
+
+class MapaNomes:
+    """
+    Mapa id ↔ nome de uma tabela pequena (como a de perfis), em memória,
+    para que outras tabelas guardem só o id e a API continue falando em nomes.
+
+    Há um mapa por tenant, carregado inteiro na primeira consulta. Qualquer
+    alteração da entidade no log (deste worker, por `marcar_alteracao`, ou
+    de outros, lido no máximo a cada DEFASAGEM_SEGUNDOS) faz o mapa ser
+    recarregado; um id ou nome desconhecido também força a releitura, então
+    um registro recém-criado em outro worker é encontrado na hora.
+
+    Dentro de uma transação do escritor (`executar_em_transacao`), o mapa é
+    lido da própria sessão dela, sem cache: enxerga o que a transação
+    gravou e ainda não confirmou.
+    """
+
+    def __init__(self, modelo: type, entidade: str):
+        self.modelo = modelo
+        self.entidade = entidade
+        self._estados: dict[str | None, _Estado] = {}
+        self._travas: dict[str | None, asyncio.Lock] = {}
+
+    async def _carregar(self, tenant: str | None) -> _Estado:
+        # O mapa serve a todas as requisições seguintes: não usa o prazo de
+        # consulta de quem disparou a carga
+        token = orcamento_consulta.set(None)
+        try:
+            async with fabrica_sessao_tenant(tenant)() as db:
+                # O cursor é lido antes das linhas: o que mudar durante a
+                # carga é relido na próxima sincronização
+                cursor = await alteracaoRepository.obter_ultimo_seq(db)
+                resultado = await db.execute(select(self.modelo.id, self.modelo.nome))
+                nomes = dict(resultado.all())
+        finally:
+            orcamento_consulta.reset(token)
+        metricas.incrementar(f"mapa.{self.entidade}.cargas")
+        return _Estado(nomes, cursor)
+
+    async def _alterado_desde(self, tenant: str | None, cursor: int) -> bool:
+        async with fabrica_sessao_tenant(tenant)() as db:
+            return bool(await alteracaoRepository.listar_alteracoes_desde(db, self.entidade, cursor, 1))
+
+    async def _estado_atual(self, recarregar: bool = False) -> _Estado:
+        sessao = escritor.sessao_em_transacao()
+        if sessao is not None:
+            resultado = await sessao.execute(select(self.modelo.id, self.modelo.nome))
+            return _Estado(dict(resultado.all()), 0)
+
+        tenant = tenant_atual.get()
+        trava = self._travas.setdefault(tenant, asyncio.Lock())
+        async with trava:
+            estado = self._estados.get(tenant)
+            if estado is None or recarregar or estado.sujo:
+                estado = self._estados[tenant] = await self._carregar(tenant)
+            elif time.monotonic() - estado.sincronizado_em >= DEFASAGEM_SEGUNDOS:
+                if await self._alterado_desde(tenant, estado.cursor):
+                    estado = self._estados[tenant] = await self._carregar(tenant)
+                else:
+                    estado.sincronizado_em = time.monotonic()
+        return estado
+
+    def marcar_alteracao(self) -> None:
+        """Chamado após gravar a entidade: a próxima consulta recarrega o mapa."""
+        estado = self._estados.get(tenant_atual.get())
+        if estado is not None:
+            estado.sujo = True
+
+    async def nomes(self, ids: Iterable[int] = ()) -> dict[int, str]:
+        """
+        Mapa id -> nome atual. Se algum dos `ids` informados não estiver no
+        mapa, ele é relido uma vez antes de responder.
+        """
+        estado = await self._estado_atual()
+        if any(i not in estado.nomes for i in ids if i is not None):
+            estado = await self._estado_atual(recarregar=True)
+        return estado.nomes
+
+    async def id_por_nome(self, nome: str) -> int | None:
+        """Id do registro com o nome (o de menor id, se houver repetidos), ou None."""
+        estado = await self._estado_atual()
+        if nome not in estado.ids:
+            estado = await self._estado_atual(recarregar=True)
+        return estado.ids.get(nome)
+
+    async def ids_que_casam(self, operador: str, valor: Any) -> list[int]:
+        """
+        Ids cujo nome satisfaz o filtro (`=`, `!=`, `>`, `<`, `>=`, `<=`,
+        `like`, `ilike` ou `in`, com a semântica de `generic.consulta_filtrada`).
+        """
+        estado = await self._estado_atual()
+        return sorted(id_ for id_, nome in estado.nomes.items() if _casa(nome, operador, valor))
@@ -0,0 +1,79 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.principal.alteracaoModel import AlteracaoModel
+
+INSERCAO = "I"
+ATUALIZACAO = "U"
+REMOCAO = "D"
+# Movido para a tabela de arquivo: o registro continua existindo
+ARQUIVAMENTO = "A"
+
+
+def registrar_alteracao(db: AsyncSession,
+                        entidade: str,
+                        registro_id: int,
+                        operacao: str
+                        ) -> None:
+    """
+    Adiciona uma linha ao log de alterações na transação corrente da sessão.
+
+    Não faz commit: deve ser chamada pelo repositório antes do commit da
+    própria escrita, para que o log e o dado sejam gravados juntos.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        entidade (str): Nome da entidade alterada ("usuario", "perfil").
+        registro_id (int): Id do registro alterado.
+        operacao (str): INSERCAO, ATUALIZACAO, REMOCAO ou ARQUIVAMENTO.
+    """
+    db.add(AlteracaoModel(entidade=entidade, registro_id=registro_id, operacao=operacao))
+
+
+async def listar_alteracoes_desde(db: AsyncSession,
+                                  entidade: str,
+                                  cursor: int,
+                                  limite: int
+                                  ) -> list[AlteracaoModel]:
+    """
+    Lista as alterações da entidade com `seq` maior que o cursor, em ordem.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        entidade (str): Nome da entidade.
+        cursor (int): Último `seq` já conhecido pelo cliente.
+        limite (int): Quantidade máxima de alterações retornadas.
+
+    Retorna:
+        list[AlteracaoModel]: Alterações encontradas.
+    """
+    resultado = await db.execute(
+        select(AlteracaoModel)
+        .where(AlteracaoModel.entidade == entidade, AlteracaoModel.seq > cursor)
+        .order_by(AlteracaoModel.seq)
+        .limit(limite)
+    )
+    return resultado.scalars().all()
+
+
+async def listar_todas_alteracoes_desde(db: AsyncSession,
+                                        cursor: int,
+                                        limite: int
+                                        ) -> list[AlteracaoModel]:
+    """
+    Lista as alterações de todas as entidades com `seq` maior que o cursor, em ordem.
+    """
+    resultado = await db.execute(
+        select(AlteracaoModel)
+        .where(AlteracaoModel.seq > cursor)
+        .order_by(AlteracaoModel.seq)
+        .limit(limite)
+    )
+    return resultado.scalars().all()
+
+
+async def obter_ultimo_seq(db: AsyncSession) -> int:
+    """
+    Retorna o maior `seq` do log (0 se vazio).
+    """
+    resultado = await db.execute(select(func.max(AlteracaoModel.seq)))
+    return resultado.scalar_one_or_none() or 0
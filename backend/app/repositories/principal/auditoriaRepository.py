@@ -0,0 +1,43 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.principal.auditoriaModel import AuditoriaModel
+
+
+async def inserir_eventos(db: AsyncSession, eventos: list[dict]) -> None:
+    """
+    Grava um lote de eventos de auditoria em um único INSERT de várias linhas.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        eventos (list[dict]): Dicionários com entidade, registro_id, operacao, dados e data.
+    """
+    await db.execute(insert(AuditoriaModel), eventos)
+    await db.commit()
+
+
+async def listar_auditoria(db: AsyncSession,
+                           entidade: str,
+                           registro_id: int | None = None,
+                           antes_de: int | None = None,
+                           limite: int = 100
+                           ) -> list[AuditoriaModel]:
+    """
+    Lista eventos de auditoria do mais recente para o mais antigo.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        entidade (str): Entidade auditada.
+        registro_id (int | None): Restringe ao histórico de um registro.
+        antes_de (int | None): Paginação: apenas eventos com id menor que este.
+        limite (int): Quantidade máxima de eventos.
+
+    Retorna:
+        list[AuditoriaModel]: Eventos encontrados.
+    """
+    stmt = select(AuditoriaModel).where(AuditoriaModel.entidade == entidade)
+    if registro_id is not None:
+        stmt = stmt.where(AuditoriaModel.registro_id == registro_id)
+    if antes_de is not None:
+        stmt = stmt.where(AuditoriaModel.id < antes_de)
+    resultado = await db.execute(stmt.order_by(AuditoriaModel.id.desc()).limit(limite))
+    return resultado.scalars().all()
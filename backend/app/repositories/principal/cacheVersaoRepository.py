@@ -0,0 +1,27 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.principal.cacheVersaoModel import CacheVersaoModel
+
+
+async def obter_versao(db: AsyncSession, nome: str) -> int:
+    """
+    Retorna a versão compartilhada do cache `nome` (0 se nunca incrementada).
+    """
+    resultado = await db.execute(
+        select(CacheVersaoModel.versao).where(CacheVersaoModel.nome == nome)
+    )
+    return resultado.scalar_one_or_none() or 0
+
+
+async def incrementar_versao(db: AsyncSession, nome: str) -> None:
+    """
+    Incrementa a versão compartilhada do cache `nome` em um único UPSERT.
+    """
+    stmt = insert(CacheVersaoModel).values(nome=nome, versao=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CacheVersaoModel.nome],
+        set_={"versao": CacheVersaoModel.versao + 1},
+    )
+    await db.execute(stmt)
+    await db.commit()
@@ -0,0 +1,93 @@
+from datetime import datetime
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.principal.idempotenciaModel import IdempotenciaModel
+
+
+async def reservar(db: AsyncSession,
+                   chave: str,
+                   impressao: str,
+                   agora: datetime,
+                   reserva_ate: datetime
+                   ) -> IdempotenciaModel | None:
+    """
+    Tenta reservar a chave para uma nova execução.
+
+    A reserva é uma linha sem `status`. Uma linha vencida (resposta expirada
+    ou reserva abandonada por um worker que caiu) é reaproveitada.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        chave (str): Chave já com o escopo do usuário e da rota.
+        impressao (str): Hash do corpo da requisição.
+        agora (datetime): Instante atual (UTC).
+        reserva_ate (datetime): Até quando a reserva vale sem ser concluída.
+
+    Retorna:
+        IdempotenciaModel | None: None se a chave foi reservada; caso contrário,
+            o registro existente (em andamento ou concluído).
+    """
+    inserido = await db.execute(
+        insert(IdempotenciaModel)
+        .values(chave=chave, impressao=impressao, expira_em=reserva_ate)
+        .on_conflict_do_nothing(index_elements=["chave"])
+    )
+    reservado = inserido.rowcount == 1
+    if not reservado:
+        reaproveitado = await db.execute(
+            update(IdempotenciaModel)
+            .where(IdempotenciaModel.chave == chave, IdempotenciaModel.expira_em <= agora)
+            .values(impressao=impressao, status=None, cabecalhos=None, corpo=None, expira_em=reserva_ate)
+        )
+        reservado = reaproveitado.rowcount == 1
+    await db.commit()
+    if reservado:
+        return None
+    resultado = await db.execute(
+        select(IdempotenciaModel).where(IdempotenciaModel.chave == chave)
+    )
+    return resultado.scalar_one_or_none()
+
+
+async def gravar_resposta(db: AsyncSession,
+                          chave: str,
+                          status: int,
+                          cabecalhos: str,
+                          corpo: bytes,
+                          expira_em: datetime
+                          ) -> None:
+    """
+    Conclui a reserva guardando a resposta até `expira_em`.
+    """
+    await db.execute(
+        update(IdempotenciaModel)
+        .where(IdempotenciaModel.chave == chave, IdempotenciaModel.status.is_(None))
+        .values(status=status, cabecalhos=cabecalhos, corpo=corpo, expira_em=expira_em)
+    )
+    await db.commit()
+
+
+async def liberar(db: AsyncSession, chave: str) -> None:
+    """
+    Desfaz uma reserva não concluída, permitindo que uma nova tentativa execute.
+    """
+    await db.execute(
+        delete(IdempotenciaModel)
+        .where(IdempotenciaModel.chave == chave, IdempotenciaModel.status.is_(None))
+    )
+    await db.commit()
+
+
+async def remover_expirados(db: AsyncSession, agora: datetime) -> int:
+    """
+    Remove as respostas e reservas vencidas.
+
+    Retorna:
+        int: Quantidade de registros removidos.
+    """
+    resultado = await db.execute(
+        delete(IdempotenciaModel).where(IdempotenciaModel.expira_em <= agora)
+    )
+    await db.commit()
+    return resultado.rowcount
@@ -1,15 +1,34 @@
 # app/repositories/principal/perfilRepository.py
 
+from sqlalchemy import delete, exists, insert, or_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 from app.models.principal.perfilModel import perfilModel
+from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
 from app.schemas.principal.perfil import PerfilCreate, PerfilUpdate
 from app.repositories.generic import consulta_filtrada
+from app.repositories.carregador import CarregadorPorId
+from app.repositories.mapa import MapaNomes
+from app.repositories.principal import alteracaoRepository
+from app.exceptions.conflito_versao import ConflitoVersaoException
+
+
+# Agrupa as buscas por id concorrentes em uma única consulta
+carregador_perfis = CarregadorPorId(perfilModel)
+
+# id <-> nome dos perfis: os usuários guardam o id e a API fala em nomes
+mapa_perfis = MapaNomes(perfilModel, "perfil")
 
 
 async def criar_perfil(db: AsyncSession, dados: PerfilCreate) -> perfilModel:
     novo = perfilModel(**dados.model_dump())
     db.add(novo)
+    await db.flush()
+    alteracaoRepository.registrar_alteracao(db, "perfil", novo.id, alteracaoRepository.INSERCAO)
     await db.commit()
     await db.refresh(novo)
     return novo
@@ -20,11 +39,80 @@ async def listar_perfis(db: AsyncSession) -> list[perfilModel]:
     return resultado.scalars().all()
 
 
+def _com_permissoes():
+    # perfil -> perfilpermissao -> permissao: uma consulta por nível, independente da quantidade de perfis
+    return selectinload(perfilModel.permissoes).selectinload(perfilpermissaoModel.permissao)
+
+
+async def listar_perfis_com_permissoes(db: AsyncSession) -> list[perfilModel]:
+    resultado = await db.execute(select(perfilModel).options(_com_permissoes()))
+    return resultado.scalars().all()
+
+
+async def buscar_perfil_com_permissoes(db: AsyncSession, perfil_id: int) -> perfilModel | None:
+    resultado = await db.execute(
+        select(perfilModel).where(perfilModel.id == perfil_id).options(_com_permissoes())
+    )
+    return resultado.scalar_one_or_none()
+
+
+async def buscar_ids_permissoes_existentes(db: AsyncSession, ids: list[int]) -> set[int]:
+    resultado = await db.execute(select(permissaoModel.id).where(permissaoModel.id.in_(ids)))
+    return set(resultado.scalars().all())
+
+
+async def substituir_permissoes(db: AsyncSession, perfil_id: int, ids_permissoes: list[int]) -> perfilModel | None:
+    """
+    Substitui o conjunto de permissões do perfil aplicando apenas a diferença:
+    um DELETE para as removidas e um INSERT em lote para as novas.
+    """
+    existe = await db.execute(select(perfilModel.id).where(perfilModel.id == perfil_id))
+    if existe.scalar_one_or_none() is None:
+        return None
+
+    atuais = await db.execute(
+        select(perfilpermissaoModel.id_permissao).where(perfilpermissaoModel.id_perfil == perfil_id)
+    )
+    atuais = set(atuais.scalars().all())
+    desejadas = set(ids_permissoes)
+
+    remover = atuais - desejadas
+    adicionar = desejadas - atuais
+    if remover:
+        await db.execute(
+            delete(perfilpermissaoModel).where(
+                perfilpermissaoModel.id_perfil == perfil_id,
+                perfilpermissaoModel.id_permissao.in_(remover),
+            )
+        )
+    if adicionar:
+        await db.execute(
+            insert(perfilpermissaoModel),
+            [{"id_perfil": perfil_id, "id_permissao": i} for i in sorted(adicionar)],
+        )
+    if remover or adicionar:
+        await db.execute(
+            update(perfilModel).where(perfilModel.id == perfil_id).values(versao=perfilModel.versao + 1)
+        )
+        alteracaoRepository.registrar_alteracao(db, "perfil", perfil_id, alteracaoRepository.ATUALIZACAO)
+    await db.commit()
+    return await buscar_perfil_com_permissoes(db, perfil_id)
+
+
 async def buscar_perfil_por_id(db: AsyncSession, perfil_id: int) -> perfilModel | None:
     resultado = await db.execute(select(perfilModel).where(perfilModel.id == perfil_id))
     return resultado.scalar_one_or_none()
 
 
+async def carregar_perfil_por_id(perfil_id: int) -> perfilModel | None:
+    return await carregador_perfis.carregar(perfil_id)
+
+
+async def carregar_perfis_por_ids(ids: list[int]) -> list[perfilModel]:
+    modelos = await carregador_perfis.carregar_varios(ids)
+    return [m for m in modelos if m is not None]
+
+
 async def buscar_perfis_com_filtros(
     db: AsyncSession,
     filtros: list[dict[str, object]] | list[list] | None = None,
@@ -35,25 +123,54 @@ async def buscar_perfis_com_filtros(
     return await consulta_filtrada(db, perfilModel, filtros, ordenacao, colunas, limite)
 
 
-async def atualizar_perfil(db: AsyncSession, perfil_id: int, dados: PerfilUpdate) -> perfilModel | None:
-    perfil = await buscar_perfil_por_id(db, perfil_id)
+async def atualizar_perfil(db: AsyncSession,
+                          perfil_id: int,
+                          dados: PerfilUpdate,
+                          versao_esperada: int | None = None) -> perfilModel | None:
+    """
+    Atualiza o perfil em um único UPDATE condicional, incrementando a versão.
+    Com `versao_esperada`, levanta ConflitoVersaoException se o perfil já
+    estiver em outra versão.
+    """
+    condicoes = [perfilModel.id == perfil_id]
+    if versao_esperada is not None:
+        condicoes.append(perfilModel.versao == versao_esperada)
+    resultado = await db.execute(
+        update(perfilModel)
+        .where(*condicoes)
+        .values(**dados.model_dump(exclude_unset=True), versao=perfilModel.versao + 1)
+        .returning(perfilModel)
+    )
+    perfil = resultado.scalar_one_or_none()
     if not perfil:
-        return None
-
-    dados_dict = dados.model_dump(exclude_unset=True)
-    for campo, valor in dados_dict.items():
-        setattr(perfil, campo, valor)
-
+        versao_atual = await db.scalar(select(perfilModel.versao).where(perfilModel.id == perfil_id))
+        if versao_atual is None:
+            return None
+        raise ConflitoVersaoException(
+            "O perfil foi alterado por outra requisição. Recarregue e tente novamente.",
+            versao_atual
+        )
+
+    alteracaoRepository.registrar_alteracao(db, "perfil", perfil_id, alteracaoRepository.ATUALIZACAO)
     await db.commit()
     await db.refresh(perfil)
     return perfil
 
 
+async def perfil_em_uso(db: AsyncSession, perfil_id: int) -> bool:
+    """True se algum usuário (ativo ou arquivado) tem o perfil."""
+    return await db.scalar(select(or_(
+        exists().where(UsuarioModel.perfil_id == perfil_id),
+        exists().where(UsuarioArquivoModel.perfil_id == perfil_id),
+    )))
+
+
 async def deletar_perfil(db: AsyncSession, perfil_id: int) -> bool:
     perfil = await buscar_perfil_por_id(db, perfil_id)
     if not perfil:
         return False
 
     await db.delete(perfil)
+    alteracaoRepository.registrar_alteracao(db, "perfil", perfil_id, alteracaoRepository.REMOCAO)
     await db.commit()
     return True
\ No newline at end of file
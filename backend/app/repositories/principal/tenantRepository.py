@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.principal.tenantModel import TenantModel
+
+
+async def tenant_ativo(db: AsyncSession, tenant_id: str) -> bool:
+    """
+    Retorna True se o tenant estiver cadastrado e ativo.
+    """
+    resultado = await db.execute(
+        select(TenantModel.ativo).where(TenantModel.id == tenant_id)
+    )
+    return bool(resultado.scalar_one_or_none())
+
+
+async def registrar_tenant(db: AsyncSession, tenant_id: str, criado_em: datetime) -> None:
+    """
+    Cadastra o tenant como ativo (ou reativa um já cadastrado).
+    """
+    await db.execute(
+        insert(TenantModel)
+        .values(id=tenant_id, ativo=True, criado_em=criado_em)
+        .on_conflict_do_update(index_elements=[TenantModel.id], set_={"ativo": True})
+    )
+    await db.commit()
@@ -0,0 +1,65 @@
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.principal.tokenRevogadoModel import TokenRevogadoModel
+
+
+async def revogar_token(db: AsyncSession,
+                        jti: str,
+                        expira_em: datetime
+                        ) -> None:
+    """
+    Registra o `jti` de um token como revogado até a sua expiração.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        jti (str): Identificador único do token.
+        expira_em (datetime): Expiração do token (UTC); após ela o registro pode ser descartado.
+    """
+    existente = await db.execute(
+        select(TokenRevogadoModel.id).where(TokenRevogadoModel.jti == jti)
+    )
+    if existente.scalar_one_or_none() is None:
+        db.add(TokenRevogadoModel(jti=jti, expira_em=expira_em))
+        await db.commit()
+
+
+async def token_revogado(db: AsyncSession, jti: str) -> bool:
+    """
+    Retorna True se o `jti` constar na tabela de revogados.
+    """
+    resultado = await db.execute(
+        select(TokenRevogadoModel.id).where(TokenRevogadoModel.jti == jti)
+    )
+    return resultado.scalar_one_or_none() is not None
+
+
+async def listar_revogados_desde(db: AsyncSession,
+                                 ultimo_id: int
+                                 ) -> list[tuple[int, str]]:
+    """
+    Lista as revogações com id maior que `ultimo_id`, em ordem crescente.
+
+    Retorna:
+        list[tuple[int, str]]: Pares (id, jti).
+    """
+    resultado = await db.execute(
+        select(TokenRevogadoModel.id, TokenRevogadoModel.jti)
+        .where(TokenRevogadoModel.id > ultimo_id)
+        .order_by(TokenRevogadoModel.id)
+    )
+    return [(linha.id, linha.jti) for linha in resultado]
+
+
+async def remover_expirados(db: AsyncSession, agora: datetime) -> int:
+    """
+    Remove as revogações de tokens já expirados.
+
+    Retorna:
+        int: Quantidade de registros removidos.
+    """
+    resultado = await db.execute(
+        delete(TokenRevogadoModel).where(TokenRevogadoModel.expira_em <= agora)
+    )
+    await db.commit()
+    return resultado.rowcount
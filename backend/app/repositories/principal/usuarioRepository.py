@@ -1,12 +1,55 @@
+from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, func, insert, literal, union_all, update
 from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
 from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
 from app.schemas.principal.usuario import UsuarioCreate, UsuarioUpdate
 from app.repositories.generic import consulta_filtrada
+from app.repositories.carregador import CarregadorPorId
+from app.repositories.snapshot import SnapshotColunar
+from app.repositories.sugestoes import IndicePrefixos
+from app.repositories.principal import alteracaoRepository
+from app.exceptions.conflito_versao import ConflitoVersaoException
+
+
+# Agrupa as buscas por id concorrentes em uma única consulta
+carregador_usuarios = CarregadorPorId(UsuarioModel)
+carregador_arquivo = CarregadorPorId(UsuarioArquivoModel)
+
+# Colunas de `usuarios`, que o arquivo repete com os mesmos nomes
+_COLUNAS = [coluna.name for coluna in UsuarioModel.__table__.columns]
+
+# Usuários ativos e arquivados em uma única "tabela", para a consulta
+# filtrada com `incluir_arquivados` (o SQLite leva os filtros para dentro
+# de cada lado do UNION ALL e usa os índices de cada tabela)
+UsuarioComArquivo = aliased(
+    UsuarioModel,
+    union_all(
+        select(*UsuarioModel.__table__.columns),
+        select(*(UsuarioArquivoModel.__table__.c[nome] for nome in _COLUNAS)),
+    ).subquery("usuarios_com_arquivo"),
+)
+
+# Próximo id de usuário: acima do maior id das duas tabelas. A tabela não usa
+# AUTOINCREMENT, e o SQLite daria a um cadastro novo o id de um arquivado
+# sempre que ele fosse maior que todos os de `usuarios`
+_proximo_id = func.max(
+    select(func.coalesce(func.max(UsuarioModel.id), 0)).scalar_subquery(),
+    select(func.coalesce(func.max(UsuarioArquivoModel.id), 0)).scalar_subquery(),
+) + 1
+
+# Cópia colunar em memória para a consulta filtrada (opcional, requer NumPy)
+snapshot_usuarios = SnapshotColunar(UsuarioModel, "usuario")
+
+# Índice de prefixos para o autocompletar de usuários
+indice_sugestoes = IndicePrefixos(UsuarioModel, "usuario", ("nome", "login", "email"))
 
 
 async def criar_usuario(db: AsyncSession, 
-                        dados: UsuarioCreate
+                        dados: UsuarioCreate,
+                        perfil_id: int
                         ) -> UsuarioModel:
     """
     Cria um novo registro de usuário no banco de dados.
@@ -14,15 +57,18 @@ async def criar_usuario(db: AsyncSession,
     Parâmetros:
         db (AsyncSession): Sessão assíncrona do banco de dados.
         dados (UsuarioCreate): Dados do novo usuário validados via Pydantic.
+        perfil_id (int): Id do perfil informado (por nome) em `dados`.
 
     Retorna:
         UsuarioModel: Instância do modelo recém-criada e atualizada.
     """
     
-    usuario_dict = dados.model_dump()
-    novo_usuario = UsuarioModel(**usuario_dict)
+    usuario_dict = dados.model_dump(exclude={"perfil"})
+    novo_usuario = UsuarioModel(**usuario_dict, perfil_id=perfil_id, id=_proximo_id)
     
     db.add(novo_usuario)
+    await db.flush()  # gera o id para o log de alterações
+    alteracaoRepository.registrar_alteracao(db, "usuario", novo_usuario.id, alteracaoRepository.INSERCAO)
     await db.commit()
     await db.refresh(novo_usuario)  # Atualiza com dados gerados no banco (ex: ID gerado)
     return novo_usuario
@@ -31,23 +77,24 @@ async def criar_usuario(db: AsyncSession,
 async def listar_usuarios(db: AsyncSession
                           ) -> list[UsuarioModel]:
     """
-    Retorna todos os usuários cadastrados.
+    Retorna todos os usuários cadastrados, inclusive os arquivados.
 
     Parâmetros:
         db (AsyncSession): Sessão assíncrona do banco de dados.
 
     Retorna:
-        list[UsuarioModel]: Lista de objetos de modelo representando os usuários.
+        list[UsuarioModel | UsuarioArquivoModel]: Os ativos e, em seguida, os arquivados.
     """
     resultado = await db.execute(select(UsuarioModel))
-    return resultado.scalars().all()
+    arquivados = await db.execute(select(UsuarioArquivoModel))
+    return [*resultado.scalars().all(), *arquivados.scalars().all()]
 
 
 async def buscar_usuario_por_id(db: AsyncSession, 
                                 usuario_id: int
                                 ) -> UsuarioModel | None:
     """
-    Busca um usuário pelo ID.
+    Busca um usuário pelo ID (somente na tabela de usuários ativos).
 
     Parâmetros:
         db (AsyncSession): Sessão assíncrona do banco de dados.
@@ -62,12 +109,124 @@ async def buscar_usuario_por_id(db: AsyncSession,
     return resultado.scalar_one_or_none()
 
 
+async def buscar_usuario_por_login(db: AsyncSession,
+                                   login: str
+                                   ) -> UsuarioModel | None:
+    """
+    Busca um usuário pelo login (coluna única e indexada), recorrendo ao
+    arquivo se ele não estiver entre os ativos.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        login (str): Login do usuário.
+
+    Retorna:
+        UsuarioModel | UsuarioArquivoModel | None: Usuário encontrado ou None se não existir.
+    """
+    resultado = await db.execute(
+        select(UsuarioModel).where(UsuarioModel.login == login)
+    )
+    usuario = resultado.scalar_one_or_none()
+    if usuario is None:
+        resultado = await db.execute(
+            select(UsuarioArquivoModel).where(UsuarioArquivoModel.login == login)
+        )
+        usuario = resultado.scalar_one_or_none()
+    return usuario
+
+
+async def carregar_usuario_por_id(usuario_id: int) -> UsuarioModel | None:
+    """
+    Busca um usuário pelo ID através do carregador em lote, somente leitura.
+
+    Buscas concorrentes são agrupadas em um único `WHERE id IN (...)`; os
+    ids que não estão entre os ativos são procurados, também em lote, no
+    arquivo. O modelo retornado não pertence a nenhuma sessão ativa.
+
+    Parâmetros:
+        usuario_id (int): Identificador único do usuário.
+
+    Retorna:
+        UsuarioModel | UsuarioArquivoModel | None: Usuário encontrado ou None se não existir.
+    """
+    usuario = await carregador_usuarios.carregar(usuario_id)
+    if usuario is None:
+        usuario = await carregador_arquivo.carregar(usuario_id)
+    return usuario
+
+
+async def carregar_usuarios_por_ids(ids: list[int]) -> list[UsuarioModel]:
+    """
+    Busca vários usuários pelos IDs através do carregador em lote, somente leitura.
+
+    Parâmetros:
+        ids (list[int]): Identificadores dos usuários.
+
+    Retorna:
+        list[UsuarioModel | UsuarioArquivoModel]: Usuários encontrados (ativos
+            ou arquivados), na ordem dos ids informados.
+    """
+    modelos = await carregador_usuarios.carregar_varios(ids)
+    faltantes = [i for i, m in zip(ids, modelos) if m is None]
+    if faltantes:
+        arquivados = dict(zip(faltantes, await carregador_arquivo.carregar_varios(faltantes)))
+        modelos = [m if m is not None else arquivados[i] for i, m in zip(ids, modelos)]
+    return [m for m in modelos if m is not None]
+
+
+async def sugerir_ids(termo: str, limite: int, deslocamento: int = 0) -> list[int]:
+    """
+    Busca no índice em memória os ids dos usuários cujo nome, login ou
+    email começa pelo termo (sem distinção de acentos e maiúsculas).
+
+    Parâmetros:
+        termo (str): Início digitado pelo usuário.
+        limite (int): Quantidade máxima de ids.
+        deslocamento (int): Ids a pular, para ler as páginas seguintes.
+
+    Retorna:
+        list[int]: Ids em ordem alfabética do valor encontrado.
+    """
+    return await indice_sugestoes.buscar(termo, limite, deslocamento)
+
+
+async def buscar_usuarios_por_ids(db: AsyncSession,
+                                  ids: list[int]
+                                  ) -> list[UsuarioModel]:
+    """
+    Busca vários usuários pelos IDs, ativos ou arquivados, na sessão informada.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        ids (list[int]): Identificadores dos usuários.
+
+    Retorna:
+        list[UsuarioModel | UsuarioArquivoModel]: Usuários encontrados (sem ordem garantida).
+    """
+    if not ids:
+        return []
+    resultado = await db.execute(
+        select(UsuarioModel).where(UsuarioModel.id.in_(ids))
+    )
+    usuarios = resultado.scalars().all()
+    if len(usuarios) < len(set(ids)):
+        encontrados = {u.id for u in usuarios}
+        resultado = await db.execute(
+            select(UsuarioArquivoModel).where(
+                UsuarioArquivoModel.id.in_([i for i in ids if i not in encontrados])
+            )
+        )
+        usuarios = [*usuarios, *resultado.scalars().all()]
+    return usuarios
+
+
 async def buscar_usuarios_com_filtros(
     db: AsyncSession,
     filtros: list[dict[str, object]] | list[list] | None = None,
     ordenacao: list[str] | None = None,
     colunas: list[str] | None = None,
     limite: None = 25,
+    incluir_arquivados: bool = False,
 ) -> list[UsuarioModel]:
     """
     Busca usuários com base em filtros dinâmicos reutilizando a função genérica.
@@ -77,37 +236,86 @@ async def buscar_usuarios_com_filtros(
         filtros: Lista de dicionários com filtros (coluna, valor, operador, etc).
         ordenacao: Lista como ["nome ASC", "id DESC"].
         colunas: Lista de colunas para carregamento otimizado (opcional).
+        incluir_arquivados: Busca também na tabela de arquivo.
 
     Retorna:
         Lista de usuários encontrados conforme os filtros aplicados.
     """
-    return await consulta_filtrada(db, UsuarioModel, filtros, ordenacao, colunas, limite)
+    modelo = UsuarioComArquivo if incluir_arquivados else UsuarioModel
+    return await consulta_filtrada(db, modelo, filtros, ordenacao, colunas, limite)
+
+
+async def buscar_usuarios_com_filtros_em_memoria(
+    filtros: list[dict[str, object]] | list[list] | None = None,
+    ordenacao: list[str] | None = None,
+    colunas: list[str] | None = None,
+    limite: int = 25,
+) -> list[UsuarioModel] | None:
+    """
+    Mesma busca de `buscar_usuarios_com_filtros`, respondida pelo snapshot
+    colunar em memória, sem consultar a tabela.
+
+    Retorna:
+        Lista de usuários (modelos fora de sessão), ou None se a consulta
+        não puder ser reproduzida com exatidão pelo snapshot.
+    """
+    return await snapshot_usuarios.consultar(filtros, ordenacao, colunas, limite)
     
 
 async def atualizar_usuario(db: AsyncSession, 
                             usuario_id: int, 
-                            novos_dados: UsuarioUpdate
+                            novos_dados: UsuarioUpdate,
+                            versao_esperada: int | None = None,
+                            perfil_id: int | None = None
                             ) -> UsuarioModel | None:
     """
-    Atualiza os dados de um usuário existente.
+    Atualiza os dados de um usuário existente em um único UPDATE condicional.
+
+    A versão é incrementada a cada atualização. Com `versao_esperada`, o
+    UPDATE só afeta a linha se ela ainda estiver nessa versão
+    (`WHERE id = ? AND versao = ?`), sem travar nada entre a leitura feita
+    pelo cliente e a escrita. Um usuário arquivado volta para a tabela de
+    ativos, na mesma transação, antes de ser atualizado.
 
     Parâmetros:
         db (AsyncSession): Sessão assíncrona do banco de dados.
         usuario_id (int): ID do usuário a ser atualizado.
         dados (UsuarioUpdate): Campos atualizados do usuário (validados via Pydantic).
+        versao_esperada (int | None): Versão lida pelo cliente; None não confere.
+        perfil_id (int | None): Id do novo perfil, se `novos_dados` trocar o perfil.
 
     Retorna:
         UsuarioModel | None: Modelo atualizado ou None se o usuário não existir.
+
+    Levanta:
+        ConflitoVersaoException: Se o usuário já estiver em outra versão.
     """
-    usuario = await buscar_usuario_por_id(db, usuario_id)
-    if not usuario:
-        return None
+    novos_dados_dict = novos_dados.model_dump(exclude_unset=True, exclude={"perfil"})
+    if perfil_id is not None:
+        novos_dados_dict["perfil_id"] = perfil_id
 
-    novos_dados_dict = novos_dados.model_dump(exclude_unset=True)
-    
-    for coluna, valor in novos_dados_dict.items():
-        setattr(usuario, coluna, valor)
+    condicoes = [UsuarioModel.id == usuario_id]
+    if versao_esperada is not None:
+        condicoes.append(UsuarioModel.versao == versao_esperada)
+    resultado = await db.execute(
+        update(UsuarioModel)
+        .where(*condicoes)
+        .values(**novos_dados_dict, versao=UsuarioModel.versao + 1)
+        .returning(UsuarioModel)
+    )
+    usuario = resultado.scalar_one_or_none()
+    if not usuario:
+        versao_atual = await db.scalar(select(UsuarioModel.versao).where(UsuarioModel.id == usuario_id))
+        if versao_atual is None:
+            if not await _restaurar_do_arquivo(db, usuario_id):
+                return None
+            return await atualizar_usuario(db, usuario_id, novos_dados, versao_esperada, perfil_id)
+        raise ConflitoVersaoException(
+            "O usuário foi alterado por outra requisição. Recarregue e tente novamente.",
+            versao_atual
+        )
 
+    alteracaoRepository.registrar_alteracao(db, "usuario", usuario_id, alteracaoRepository.ATUALIZACAO)
     await db.commit()
     await db.refresh(usuario)
     return usuario
@@ -117,7 +325,7 @@ async def deletar_usuario(db: AsyncSession,
                           usuario_id: int
                           ) -> bool:
     """
-    Remove um usuário do banco de dados.
+    Remove um usuário do banco de dados (ativo ou arquivado).
 
     Parâmetros:
         db (AsyncSession): Sessão assíncrona do banco de dados.
@@ -128,8 +336,75 @@ async def deletar_usuario(db: AsyncSession,
     """
     usuario = await buscar_usuario_por_id(db, usuario_id)
     if not usuario:
+        resultado = await db.execute(
+            delete(UsuarioArquivoModel).where(UsuarioArquivoModel.id == usuario_id)
+        )
+        if not resultado.rowcount:
+            return False
+    else:
+        await db.delete(usuario)
+    alteracaoRepository.registrar_alteracao(db, "usuario", usuario_id, alteracaoRepository.REMOCAO)
+    await db.commit()
+    return True
+
+
+async def _restaurar_do_arquivo(db: AsyncSession, usuario_id: int) -> bool:
+    """Move o usuário do arquivo de volta para `usuarios`, sem commit."""
+    # Primeiro sai do arquivo: o gatilho de unicidade confere login e email lá
+    resultado = await db.execute(
+        delete(UsuarioArquivoModel)
+        .where(UsuarioArquivoModel.id == usuario_id)
+        .returning(*(UsuarioArquivoModel.__table__.c[nome] for nome in _COLUNAS))
+    )
+    linha = resultado.mappings().one_or_none()
+    if linha is None:
         return False
+    await db.execute(insert(UsuarioModel).values(**linha))
+    return True
+
 
-    await db.delete(usuario)
+async def arquivar_inativos(db: AsyncSession,
+                            criados_antes_de: datetime,
+                            limite: int
+                            ) -> list[int]:
+    """
+    Move para `usuarios_arquivo` um lote de usuários inativos criados antes
+    de `criados_antes_de`, registrando cada um no log de alterações.
+
+    As condições são repetidas no INSERT e no DELETE: um usuário reativado
+    entre a seleção e a escrita fica onde está. Os ids arquivados não voltam
+    a ser usados: `criar_usuario` gera ids acima dos das duas tabelas.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        criados_antes_de (datetime): Data de criação limite.
+        limite (int): Tamanho máximo do lote.
+
+    Retorna:
+        list[int]: Ids arquivados (vazia quando não resta nenhum).
+    """
+    condicoes = (
+        UsuarioModel.ativo.is_(False),
+        UsuarioModel.data_criacao < criados_antes_de,
+    )
+    ids = (await db.scalars(
+        select(UsuarioModel.id).where(*condicoes).order_by(UsuarioModel.id).limit(limite)
+    )).all()
+    if not ids:
+        return []
+
+    selecionados = (*condicoes, UsuarioModel.id.in_(ids))
+    colunas = [UsuarioModel.__table__.c[nome] for nome in _COLUNAS]
+    await db.execute(
+        insert(UsuarioArquivoModel).from_select(
+            [*_COLUNAS, "arquivado_em"],
+            select(*colunas, literal(datetime.now(timezone.utc))).where(*selecionados),
+        )
+    )
+    arquivados = (await db.scalars(
+        delete(UsuarioModel).where(*selecionados).returning(UsuarioModel.id)
+    )).all()
+    for usuario_id in arquivados:
+        alteracaoRepository.registrar_alteracao(db, "usuario", usuario_id, alteracaoRepository.ARQUIVAMENTO)
     await db.commit()
-    return True
+    return list(arquivados)
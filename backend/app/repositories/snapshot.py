@@ -0,0 +1,477 @@
+import os
+import re
+import time
+import asyncio
+import bisect
+from functools import reduce
+from typing import Any
+
+from sqlalchemy import Boolean, DateTime, Integer, String
+from sqlalchemy.dialects import sqlite
+
+from app.database import fabrica_sessao_tenant, tenant_atual
+from app.repositories.principal import alteracaoRepository
+from app.utils import metricas
+
+try:
+    import numpy as np
+except ImportError:  # dependência opcional: sem NumPy o snapshot fica desligado
+    np = None
+
+# Segundos máximos entre sincronizações com o log de alterações (escritas de
+# outros workers); escritas deste worker forçam a sincronização na consulta seguinte
+DEFASAGEM_SEGUNDOS = float(os.getenv("SNAPSHOT_DEFASAGEM", "0.2"))
+# Alterações lidas do log e ids relidos por consulta
+LOTE = 500
+
+TEXTO, INTEIRO, BOOLEANO, DATA = "texto", "inteiro", "booleano", "data"
+
+_DIALETO = sqlite.dialect()
+
+
+class _NaoSuportado(Exception):
+    """A consulta sai do que o snapshot reproduz com exatidão: vai para o SQL."""
+
+
+def regex_like(padrao: str) -> re.Pattern:
+    """
+    Traduz um padrão LIKE do SQLite: `%` e `_` são curingas, sem escape, e a
+    comparação ignora maiúsculas/minúsculas apenas em letras ASCII.
+    """
+    partes = [".*" if c == "%" else "." if c == "_" else re.escape(c) for c in padrao]
+    return re.compile("".join(partes), re.S | re.I | re.A)
+
+
+class _ColunaTexto:
+    """
+    Coluna codificada por dicionário: cada linha guarda o código do valor
+    (-1 para NULL). A posição de cada código na ordem BINARY do SQLite (a
+    mesma ordem das strings em Python) é recalculada só quando surgem
+    valores novos.
+    """
+
+    def __init__(self, capacidade: int):
+        self.valores: list[str] = []
+        self.indice: dict[str, int] = {}
+        self.codigos = np.full(capacidade, -1, dtype=np.int32)
+        self._posicao = None
+        self._ordenados: list[str] = []
+
+    def codificar(self, valor: str | None) -> int:
+        if valor is None:
+            return -1
+        codigo = self.indice.get(valor)
+        if codigo is None:
+            codigo = len(self.valores)
+            self.valores.append(valor)
+            self.indice[valor] = codigo
+            self._posicao = None
+        return codigo
+
+    def ordem(self) -> tuple[Any, list[str]]:
+        """Retorna (posição por código, valores ordenados); o último item da posição (-1) é o NULL."""
+        if self._posicao is None:
+            ordem = sorted(range(len(self.valores)), key=self.valores.__getitem__)
+            posicao = np.empty(len(self.valores) + 1, dtype=np.int64)
+            posicao[np.asarray(ordem, dtype=np.int64)] = np.arange(len(ordem), dtype=np.int64)
+            posicao[-1] = -1
+            self._posicao = posicao
+            self._ordenados = [self.valores[i] for i in ordem]
+        return self._posicao, self._ordenados
+
+    def redimensionar(self, capacidade: int) -> None:
+        codigos = np.full(capacidade, -1, dtype=np.int32)
+        codigos[:len(self.codigos)] = self.codigos
+        self.codigos = codigos
+
+
+class _Estado:
+    """Snapshot de um tenant: colunas em arrays, linhas removidas marcadas em `vivo`."""
+
+    def __init__(self, tipos: dict[str, str], capacidade: int = 1024):
+        self.tipos = tipos
+        self.capacidade = capacidade
+        self.linhas = 0
+        self.removidas = 0
+        self.vivo = np.zeros(capacidade, dtype=bool)
+        self.posicao_por_id: dict[int, int] = {}
+        self.colunas: dict[str, Any] = {}
+        # Colunas numéricas com algum NULL: o snapshot não as filtra nem ordena
+        self.com_nulos: set[str] = set()
+        for nome, tipo in tipos.items():
+            if tipo in (TEXTO, DATA):
+                self.colunas[nome] = _ColunaTexto(capacidade)
+            else:
+                self.colunas[nome] = np.zeros(capacidade, dtype=np.int64)
+        self.cursor = 0
+        self.sincronizado_em = 0.0
+        self.sujo = True
+
+    def _garantir_capacidade(self, necessaria: int) -> None:
+        if necessaria <= self.capacidade:
+            return
+        capacidade = max(necessaria, self.capacidade * 2)
+        vivo = np.zeros(capacidade, dtype=bool)
+        vivo[:self.linhas] = self.vivo[:self.linhas]
+        self.vivo = vivo
+        for nome, coluna in self.colunas.items():
+            if isinstance(coluna, _ColunaTexto):
+                coluna.redimensionar(capacidade)
+            else:
+                nova = np.zeros(capacidade, dtype=np.int64)
+                nova[:self.linhas] = coluna[:self.linhas]
+                self.colunas[nome] = nova
+        self.capacidade = capacidade
+
+    def gravar(self, registro: dict) -> None:
+        """Insere ou substitui a linha do registro (valores crus, como estão no SQLite)."""
+        posicao = self.posicao_por_id.get(registro["id"])
+        if posicao is None:
+            self._garantir_capacidade(self.linhas + 1)
+            posicao = self.linhas
+            self.linhas += 1
+            self.posicao_por_id[registro["id"]] = posicao
+        self.vivo[posicao] = True
+        for nome, coluna in self.colunas.items():
+            valor = registro[nome]
+            if isinstance(coluna, _ColunaTexto):
+                coluna.codigos[posicao] = coluna.codificar(valor)
+            elif valor is None:
+                self.com_nulos.add(nome)
+                coluna[posicao] = 0
+            else:
+                coluna[posicao] = valor
+
+    def remover(self, id_: int) -> None:
+        posicao = self.posicao_por_id.pop(id_, None)
+        if posicao is not None:
+            self.vivo[posicao] = False
+            self.removidas += 1
+
+
+class SnapshotColunar:
+    """
+    Cópia colunar em memória (arrays NumPy) de uma tabela, para responder a
+    `consulta_filtrada` sem ir ao SQLite.
+
+    Avalia a mesma árvore de filtros de `generic.consulta_filtrada` como
+    máscaras vetorizadas, com a semântica do SQLite: comparação BINARY de
+    textos, afinidade de tipos, LIKE sem distinção de maiúsculas só em ASCII,
+    NULL nunca satisfaz uma comparação e desempate final por id. O que ela
+    não reproduz com exatidão (filtros em datas, NULL como valor, tipos que
+    o SQLite converteria de outro jeito, `colunas`) faz `consultar` retornar
+    None, e a consulta segue pelo SQL.
+
+    Há um snapshot por tenant, carregado na primeira consulta e atualizado
+    incrementalmente pelo log de alterações: a cada consulta, se houve
+    escrita neste worker (`marcar_alteracao`) ou se passaram
+    DEFASAGEM_SEGUNDOS desde a última leitura do log.
+    """
+
+    def __init__(self, modelo: type, entidade: str):
+        self.modelo = modelo
+        self.entidade = entidade
+        self.tabela = modelo.__table__
+        self.tipos: dict[str, str] = {}
+        self._conversores: dict[str, Any] = {}
+        for coluna in self.tabela.columns:
+            if isinstance(coluna.type, Boolean):
+                self.tipos[coluna.key] = BOOLEANO
+            elif isinstance(coluna.type, Integer):
+                self.tipos[coluna.key] = INTEIRO
+            elif isinstance(coluna.type, DateTime):
+                self.tipos[coluna.key] = DATA
+            elif isinstance(coluna.type, String):
+                self.tipos[coluna.key] = TEXTO
+            else:
+                continue
+            self._conversores[coluna.key] = coluna.type.dialect_impl(_DIALETO).result_processor(_DIALETO, None)
+        # Tabela com colunas de tipo não suportado: o snapshot não é usado
+        self._completo = len(self.tipos) == len(self.tabela.columns)
+        self._sql_colunas = ", ".join(f'"{self.tabela.c[nome].name}"' for nome in self.tipos)
+        self._estados: dict[str | None, _Estado] = {}
+        self._travas: dict[str | None, asyncio.Lock] = {}
+
+    @property
+    def disponivel(self) -> bool:
+        return np is not None
+
+    def marcar_alteracao(self) -> None:
+        """Chamado pelos services após gravar: a próxima consulta relê o log."""
+        estado = self._estados.get(tenant_atual.get())
+        if estado is not None:
+            estado.sujo = True
+
+    # ------------------------------------------------------------------
+    # Carga e sincronização
+    # ------------------------------------------------------------------
+    async def _ler_registros(self, db, ids: list[int] | None) -> list[dict]:
+        conexao = await db.connection()
+        nomes = list(self.tipos)
+        sql = f'SELECT {self._sql_colunas} FROM "{self.tabela.name}"'
+        if ids is None:
+            resultado = await conexao.exec_driver_sql(sql)
+            return [dict(zip(nomes, linha)) for linha in resultado.all()]
+        registros = []
+        for inicio in range(0, len(ids), LOTE):
+            lote = ids[inicio:inicio + LOTE]
+            marcadores = ", ".join("?" for _ in lote)
+            resultado = await conexao.exec_driver_sql(
+                f'{sql} WHERE "{self.tabela.c.id.name}" IN ({marcadores})', tuple(lote)
+            )
+            registros.extend(dict(zip(nomes, linha)) for linha in resultado.all())
+        return registros
+
+    async def _carregar(self, tenant: str | None) -> _Estado:
+        async with fabrica_sessao_tenant(tenant)() as db:
+            # O cursor é lido antes das linhas: o que mudar durante a carga
+            # é reaplicado na primeira sincronização
+            cursor = await alteracaoRepository.obter_ultimo_seq(db)
+            registros = await self._ler_registros(db, None)
+        estado = _Estado(self.tipos, max(1024, len(registros) * 2))
+        for registro in registros:
+            estado.gravar(registro)
+        estado.cursor = cursor
+        estado.sincronizado_em = time.monotonic()
+        estado.sujo = False
+        metricas.incrementar(f"snapshot.{self.entidade}.cargas")
+        return estado
+
+    async def _sincronizar(self, tenant: str | None, estado: _Estado) -> _Estado:
+        async with fabrica_sessao_tenant(tenant)() as db:
+            alterados: set[int] = set()
+            while True:
+                alteracoes = await alteracaoRepository.listar_alteracoes_desde(
+                    db, self.entidade, estado.cursor, LOTE
+                )
+                for alteracao in alteracoes:
+                    alterados.add(alteracao.registro_id)
+                    estado.cursor = alteracao.seq
+                if len(alteracoes) < LOTE:
+                    break
+            registros = await self._ler_registros(db, sorted(alterados)) if alterados else []
+
+        encontrados = set()
+        for registro in registros:
+            estado.gravar(registro)
+            encontrados.add(registro["id"])
+        for id_ in alterados - encontrados:
+            estado.remover(id_)
+        estado.sincronizado_em = time.monotonic()
+        estado.sujo = False
+
+        # Muitas linhas removidas: recarrega para compactar arrays e dicionários
+        if estado.removidas > 1024 and estado.removidas > estado.linhas // 2:
+            return await self._carregar(tenant)
+        return estado
+
+    async def _estado_atual(self) -> _Estado:
+        tenant = tenant_atual.get()
+        trava = self._travas.setdefault(tenant, asyncio.Lock())
+        async with trava:
+            estado = self._estados.get(tenant)
+            if estado is None:
+                estado = await self._carregar(tenant)
+            elif estado.sujo or time.monotonic() - estado.sincronizado_em >= DEFASAGEM_SEGUNDOS:
+                estado = await self._sincronizar(tenant, estado)
+            self._estados[tenant] = estado
+        metricas.definir(f"snapshot.{self.entidade}.linhas", len(estado.posicao_por_id))
+        return estado
+
+    # ------------------------------------------------------------------
+    # Avaliação
+    # ------------------------------------------------------------------
+    def _operando(self, tipo: str, valor: Any) -> Any:
+        """Converte o valor como o SQLAlchemy + SQLite fariam, ou recusa a consulta."""
+        if tipo == TEXTO:
+            # Afinidade TEXT: inteiros são comparados como texto
+            if isinstance(valor, str):
+                return valor
+            if isinstance(valor, int) and not isinstance(valor, bool):
+                return str(valor)
+        elif tipo == INTEIRO:
+            if isinstance(valor, bool):
+                return int(valor)
+            if isinstance(valor, int) or (isinstance(valor, float) and np.isfinite(valor)):
+                return valor
+        elif tipo == BOOLEANO:
+            if isinstance(valor, (bool, int, float)) and valor in (0, 1):
+                return int(valor)
+        raise _NaoSuportado
+
+    def _condicao(self, estado: _Estado, coluna: str, operador: str, valor: Any):
+        tipo = self.tipos.get(coluna)
+        if tipo is None or tipo == DATA or coluna in estado.com_nulos:
+            raise _NaoSuportado
+        n = estado.linhas
+        dados = estado.colunas[coluna]
+
+        if operador in ("like", "ilike"):
+            # No SQLite, ilike (lower(x) LIKE lower(y)) equivale ao LIKE
+            if tipo == BOOLEANO:
+                raise _NaoSuportado
+            regex = regex_like(f"%{valor}%")
+            if tipo == TEXTO:
+                casa = np.fromiter(
+                    (regex.fullmatch(v) is not None for v in dados.valores), dtype=bool, count=len(dados.valores)
+                )
+                return np.append(casa, False)[dados.codigos[:n]]
+            unicos, inverso = np.unique(dados[:n], return_inverse=True)
+            casa = np.fromiter(
+                (regex.fullmatch(str(int(v))) is not None for v in unicos), dtype=bool, count=len(unicos)
+            )
+            return casa[inverso]
+
+        if operador == "in":
+            if not isinstance(valor, (list, tuple)):
+                raise _NaoSuportado
+            if valor and isinstance(valor[0], bool) and tipo != BOOLEANO:
+                # O SQLAlchemy tipa a lista pelo primeiro item: começando por
+                # um bool, todos viram 0/1 (e outros valores dão erro no SQL)
+                if not all(isinstance(v, (bool, int, float)) and v in (0, 1) for v in valor):
+                    raise _NaoSuportado
+                valor = [int(v) for v in valor]
+            itens = [self._operando(tipo, v) for v in valor]
+            if tipo == TEXTO:
+                codigos = [dados.indice[i] for i in itens if i in dados.indice]
+                return np.isin(dados.codigos[:n], np.asarray(codigos, dtype=np.int32))
+            return np.isin(dados[:n], np.asarray(itens)) if itens else np.zeros(n, dtype=bool)
+
+        # O SQLAlchemy só aceita True/False com = e != (vira `IS`/`IS NOT`-like)
+        if isinstance(valor, bool) and operador not in ("=", "!="):
+            raise _NaoSuportado
+        operando = self._operando(tipo, valor)
+        if tipo != TEXTO:
+            coluna_n = dados[:n]
+            if operador == "=":
+                return coluna_n == operando
+            if operador == "!=":
+                return coluna_n != operando
+            if operador == ">":
+                return coluna_n > operando
+            if operador == "<":
+                return coluna_n < operando
+            if operador == ">=":
+                return coluna_n >= operando
+            if operador == "<=":
+                return coluna_n <= operando
+            raise _NaoSuportado
+
+        codigos = dados.codigos[:n]
+        if operador in ("=", "!="):
+            codigo = dados.indice.get(operando)
+            if operador == "=":
+                return codigos == codigo if codigo is not None else np.zeros(n, dtype=bool)
+            nao_nulo = codigos != -1
+            return (codigos != codigo) & nao_nulo if codigo is not None else nao_nulo
+        posicao, ordenados = dados.ordem()
+        postos = posicao[codigos]
+        if operador == "<":
+            return (postos >= 0) & (postos < bisect.bisect_left(ordenados, operando))
+        if operador == "<=":
+            return (postos >= 0) & (postos < bisect.bisect_right(ordenados, operando))
+        if operador == ">":
+            return postos >= bisect.bisect_right(ordenados, operando)
+        if operador == ">=":
+            return postos >= bisect.bisect_left(ordenados, operando)
+        raise _NaoSuportado
+
+    def _avaliar(self, estado: _Estado, grupo: list):
+        """Espelha `processar` de generic.consulta_filtrada: havendo "ou", os "e" do grupo são ignorados."""
+        ands, ors = [], []
+        for f in grupo:
+            if isinstance(f, list):
+                sub = self._avaliar(estado, f)
+                if sub is not None:
+                    ands.append(sub)
+                continue
+            coluna = f.get("coluna")
+            if not coluna or not hasattr(self.modelo, coluna):
+                continue
+            condicao = self._condicao(estado, coluna, f.get("filtro", "=").lower(), f.get("valor"))
+            (ors if f.get("ou", False) else ands).append(condicao)
+        if ors:
+            return reduce(np.logical_or, ors)
+        if ands:
+            return reduce(np.logical_and, ands)
+        return None
+
+    def _chave_ordenacao(self, estado: _Estado, coluna: str, linhas):
+        tipo = self.tipos.get(coluna)
+        if tipo is None or coluna in estado.com_nulos:
+            raise _NaoSuportado
+        dados = estado.colunas[coluna]
+        if isinstance(dados, _ColunaTexto):
+            posicao, _ = dados.ordem()
+            # NULL tem posto -1: primeiro no ASC e último no DESC, como no SQLite
+            return posicao[dados.codigos[linhas]]
+        return dados[linhas]
+
+    def _registro(self, estado: _Estado, posicao: int) -> object:
+        valores = {}
+        for nome, dados in estado.colunas.items():
+            if isinstance(dados, _ColunaTexto):
+                codigo = dados.codigos[posicao]
+                valor = dados.valores[codigo] if codigo >= 0 else None
+            else:
+                valor = int(dados[posicao])
+            conversor = self._conversores[nome]
+            valores[nome] = conversor(valor) if conversor and valor is not None else valor
+        return self.modelo(**valores)
+
+    async def consultar(
+        self,
+        filtros: list | None,
+        ordenacao: list[str] | None,
+        colunas: list[str] | None,
+        limite: int,
+    ) -> list[object] | None:
+        """
+        Executa a consulta no snapshot.
+
+        Retorna:
+            list | None: Modelos transitórios (fora de qualquer sessão), na
+            mesma ordem do SQL; None se a consulta precisar ir ao SQL.
+        """
+        if np is None or not self._completo:
+            return None
+        # load_only altera o carregamento dos modelos: fica com o SQL
+        if colunas and any(hasattr(self.modelo, c) for c in colunas):
+            metricas.incrementar(f"snapshot.{self.entidade}.recusadas")
+            return None
+        if filtros is None:
+            filtros = []
+        elif not isinstance(filtros, list):
+            filtros = [filtros]
+
+        estado = await self._estado_atual()
+        try:
+            n = estado.linhas
+            mascara = estado.vivo[:n].copy()
+            condicao = self._avaliar(estado, filtros)
+            if condicao is not None:
+                mascara &= condicao
+            linhas = np.flatnonzero(mascara)
+
+            chaves = []
+            for item in ordenacao or []:
+                partes = item.split()
+                if not partes:
+                    raise _NaoSuportado
+                coluna = partes[0]
+                direcao = partes[1] if len(partes) > 1 else "asc"
+                if not hasattr(self.modelo, coluna):
+                    continue
+                chave = self._chave_ordenacao(estado, coluna, linhas)
+                chaves.append(-chave if direcao.lower() == "desc" else chave)
+            # Desempate por id, como no SQL
+            chaves.append(estado.colunas["id"][linhas])
+            linhas = linhas[np.lexsort(chaves[::-1])]
+        except _NaoSuportado:
+            metricas.incrementar(f"snapshot.{self.entidade}.recusadas")
+            return None
+
+        if limite >= 0:
+            linhas = linhas[:limite]
+        metricas.incrementar(f"snapshot.{self.entidade}.consultas")
+        return [self._registro(estado, int(p)) for p in linhas]
@@ -0,0 +1,307 @@
+import os
+import time
+import heapq
+import asyncio
+import bisect
+import unicodedata
+from array import array
+from collections.abc import Iterator
+
+from app.database import fabrica_sessao_tenant, orcamento_consulta, tenant_atual
+from app.repositories.principal import alteracaoRepository
+from app.utils import metricas
+from app.utils.fastLog import log
+
+# Caracteres guardados de cada valor normalizado: limita a memória por
+# registro; termos mais longos são conferidos nos registros carregados
+TAMANHO_CHAVE = int(os.getenv("SUGESTOES_TAMANHO_CHAVE", "24"))
+# Segundos máximos entre leituras do log de alterações (escritas de outros workers)
+DEFASAGEM_SEGUNDOS = float(os.getenv("SUGESTOES_DEFASAGEM", "1"))
+# Alterações lidas do log e ids relidos por vez
+LOTE = 500
+# Registros alterados desde a última carga que disparam uma reconstrução
+LIMITE_ALTERADOS = 4096
+# Linhas lidas do banco entre uma cessão do event loop e outra, na carga
+PARTICAO_CARGA = 10_000
+
+
+def normalizar(texto: str | None, tamanho: int | None = TAMANHO_CHAVE) -> str:
+    """
+    Forma de comparação dos termos: sem acentos, sem distinção de
+    maiúsculas e com espaços colapsados, cortada em `tamanho` caracteres.
+    """
+    if not texto:
+        return ""
+    if not texto.isascii():
+        decomposto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in decomposto if not unicodedata.combining(c))
+    normalizado = " ".join(texto.casefold().split())
+    return normalizado if tamanho is None else normalizado[:tamanho]
+
+
+class _Base:
+    """
+    Chaves ordenadas (bytes UTF-8, mesma ordem do BINARY do SQLite) guardadas
+    em um único buffer com offsets, em vez de um objeto `bytes` por chave:
+    cerca de TAMANHO_CHAVE + 8 bytes por entrada.
+    """
+
+    __slots__ = ("buffer", "offsets", "ids")
+
+    def __init__(self, buffer: bytes = b"", offsets: array | None = None, ids: array | None = None):
+        self.buffer = buffer
+        self.offsets = offsets if offsets is not None else array("I", [0])
+        self.ids = ids if ids is not None else array("I")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def chave(self, posicao: int) -> bytes:
+        return self.buffer[self.offsets[posicao]:self.offsets[posicao + 1]]
+
+    def inicio(self, prefixo: bytes) -> int:
+        """Primeira posição com chave >= prefixo (bisect_left sobre o buffer)."""
+        baixo, alto = 0, len(self.ids)
+        while baixo < alto:
+            meio = (baixo + alto) // 2
+            if self.chave(meio) < prefixo:
+                baixo = meio + 1
+            else:
+                alto = meio
+        return baixo
+
+
+class _Estado:
+    """
+    Índice de um tenant: a base imutável, montada na carga, mais as
+    alterações posteriores. Um registro alterado tem as entradas da base
+    ocultadas e as atuais guardadas em `recentes` (lista ordenada pequena).
+    """
+
+    def __init__(self, base: _Base, cursor: int):
+        self.base = base
+        self.recentes: list[tuple[bytes, int]] = []
+        self.chaves_recentes: dict[int, list[bytes]] = {}
+        self.ocultos: set[int] = set()
+        self.cursor = cursor
+        self.sincronizado_em = time.monotonic()
+        self.sujo = False
+        self.reconstruindo = False
+
+    def gravar(self, id_: int, valores: list[str | None]) -> None:
+        self.remover(id_)
+        chaves = sorted({c.encode() for c in map(normalizar, valores) if c})
+        for chave in chaves:
+            bisect.insort(self.recentes, (chave, id_))
+        self.chaves_recentes[id_] = chaves
+
+    def remover(self, id_: int) -> None:
+        self.ocultos.add(id_)
+        for chave in self.chaves_recentes.pop(id_, []):
+            del self.recentes[bisect.bisect_left(self.recentes, (chave, id_))]
+
+    def _da_base(self, prefixo: bytes) -> Iterator[tuple[bytes, int]]:
+        base, ocultos = self.base, self.ocultos
+        for posicao in range(base.inicio(prefixo), len(base)):
+            chave = base.chave(posicao)
+            if not chave.startswith(prefixo):
+                return
+            id_ = base.ids[posicao]
+            if id_ not in ocultos:
+                yield chave, id_
+
+    def _dos_recentes(self, prefixo: bytes) -> Iterator[tuple[bytes, int]]:
+        for posicao in range(bisect.bisect_left(self.recentes, (prefixo,)), len(self.recentes)):
+            entrada = self.recentes[posicao]
+            if not entrada[0].startswith(prefixo):
+                return
+            yield entrada
+
+    def buscar(self, prefixo: bytes, limite: int, deslocamento: int = 0) -> list[int]:
+        ids: list[int] = []
+        vistos: set[int] = set()
+        for _, id_ in heapq.merge(self._da_base(prefixo), self._dos_recentes(prefixo)):
+            if id_ in vistos:
+                continue
+            vistos.add(id_)
+            if len(vistos) <= deslocamento:
+                continue
+            ids.append(id_)
+            if len(ids) == limite:
+                break
+        return ids
+
+
+class IndicePrefixos:
+    """
+    Índice em memória para autocompletar: ids dos registros cujo valor
+    normalizado de alguma das `colunas` começa pelo termo, em ordem
+    alfabética do valor encontrado.
+
+    A base é um array ordenado com busca binária, montado em uma só
+    consulta (o SQLite normaliza, remove duplicatas e ordena). As escritas
+    deste worker entram na hora (`gravar`/`remover`); as de outros workers
+    chegam pelo log de alterações, lido no máximo a cada DEFASAGEM_SEGUNDOS.
+    Passadas LIMITE_ALTERADOS alterações, a base é reconstruída em segundo
+    plano, enquanto o índice atual continua respondendo.
+
+    Memória: até TAMANHO_CHAVE + 8 bytes por valor distinto, ou seja, no
+    máximo ~96 MB por milhão de registros com três colunas (bem menos com
+    valores curtos), mais as alterações ainda não incorporadas à base.
+    """
+
+    def __init__(self, modelo: type, entidade: str, colunas: tuple[str, ...]):
+        self.modelo = modelo
+        self.entidade = entidade
+        self.colunas = colunas
+        tabela = modelo.__table__
+        id_ = tabela.c.id.name
+        selecoes = " UNION ".join(
+            f'SELECT normalizar_sugestao("{tabela.c[coluna].name}") AS chave, "{id_}" AS id FROM "{tabela.name}"'
+            for coluna in colunas
+        )
+        self._sql_carga = f"SELECT chave, id FROM ({selecoes}) WHERE chave != '' ORDER BY chave, id"
+        self._sql_registros = (
+            f'SELECT "{id_}", ' + ", ".join(f'"{tabela.c[c].name}"' for c in colunas)
+            + f' FROM "{tabela.name}" WHERE "{id_}" IN '
+        )
+        self._estados: dict[str | None, _Estado] = {}
+        self._travas: dict[str | None, asyncio.Lock] = {}
+
+    # ------------------------------------------------------------------
+    # Carga e sincronização
+    # ------------------------------------------------------------------
+    async def _carregar(self, tenant: str | None) -> _Estado:
+        inicio = time.perf_counter()
+        buffer = bytearray()
+        offsets = array("I", [0])
+        ids = array("I")
+        # A carga serve a todas as requisições seguintes: não usa o prazo de
+        # consulta de quem a disparou
+        token = orcamento_consulta.set(None)
+        try:
+            cursor = await self._ler_base(tenant, buffer, offsets, ids)
+        finally:
+            orcamento_consulta.reset(token)
+        estado = _Estado(_Base(bytes(buffer), offsets, ids), cursor)
+        metricas.incrementar(f"sugestoes.{self.entidade}.cargas")
+        metricas.definir(f"sugestoes.{self.entidade}.entradas", len(ids))
+        metricas.observar(f"sugestoes.{self.entidade}.carga_ms", (time.perf_counter() - inicio) * 1000)
+        return estado
+
+    async def _ler_base(self, tenant: str | None, buffer: bytearray, offsets: array, ids: array) -> int:
+        async with fabrica_sessao_tenant(tenant)() as db:
+            # O cursor é lido antes das linhas: o que mudar durante a carga
+            # é reaplicado na primeira sincronização
+            cursor = await alteracaoRepository.obter_ultimo_seq(db)
+            # Direto no driver: sem o processamento de linhas do SQLAlchemy,
+            # que custaria mais que a própria consulta
+            conexao = await db.connection()
+            driver = (await conexao.get_raw_connection()).driver_connection
+            await driver.create_function("normalizar_sugestao", 1, normalizar, deterministic=True)
+            async with driver.execute(self._sql_carga) as cursor_driver:
+                while particao := await cursor_driver.fetchmany(PARTICAO_CARGA):
+                    for chave, id_ in particao:
+                        buffer += chave.encode()
+                        offsets.append(len(buffer))
+                        ids.append(id_)
+        return cursor
+
+    async def _ler_registros(self, db, ids: list[int]) -> list[tuple]:
+        conexao = await db.connection()
+        registros = []
+        for inicio in range(0, len(ids), LOTE):
+            lote = ids[inicio:inicio + LOTE]
+            resultado = await conexao.exec_driver_sql(
+                self._sql_registros + "(" + ", ".join("?" for _ in lote) + ")", tuple(lote)
+            )
+            registros.extend(resultado.all())
+        return registros
+
+    async def _sincronizar(self, tenant: str | None, estado: _Estado) -> None:
+        async with fabrica_sessao_tenant(tenant)() as db:
+            alterados: set[int] = set()
+            while True:
+                alteracoes = await alteracaoRepository.listar_alteracoes_desde(
+                    db, self.entidade, estado.cursor, LOTE
+                )
+                for alteracao in alteracoes:
+                    alterados.add(alteracao.registro_id)
+                    estado.cursor = alteracao.seq
+                if len(alteracoes) < LOTE:
+                    break
+            registros = await self._ler_registros(db, sorted(alterados)) if alterados else []
+
+        for id_, *valores in registros:
+            estado.gravar(id_, valores)
+            alterados.discard(id_)
+        for id_ in alterados:
+            estado.remover(id_)
+        estado.sincronizado_em = time.monotonic()
+        estado.sujo = False
+
+    async def _reconstruir(self, tenant: str | None) -> None:
+        try:
+            novo = await self._carregar(tenant)
+        except Exception as exc:
+            log.error(f"Falha ao reconstruir o índice de sugestões: {exc}", module="Sugestoes")
+            self._estados[tenant].reconstruindo = False
+            return
+        # O que foi gravado desde o cursor da nova base volta pelo log
+        novo.sujo = True
+        async with self._travas[tenant]:
+            self._estados[tenant] = novo
+
+    async def _estado_atual(self) -> _Estado:
+        tenant = tenant_atual.get()
+        trava = self._travas.setdefault(tenant, asyncio.Lock())
+        async with trava:
+            estado = self._estados.get(tenant)
+            if estado is None:
+                estado = self._estados[tenant] = await self._carregar(tenant)
+            elif estado.sujo or time.monotonic() - estado.sincronizado_em >= DEFASAGEM_SEGUNDOS:
+                await self._sincronizar(tenant, estado)
+
+        if not estado.reconstruindo and len(estado.ocultos) > max(LIMITE_ALTERADOS, len(estado.base) // 8):
+            estado.reconstruindo = True
+            asyncio.create_task(self._reconstruir(tenant))
+        return estado
+
+    async def preparar(self) -> None:
+        """Monta o índice do tenant atual (chamado na inicialização para o banco padrão)."""
+        await self._estado_atual()
+
+    # ------------------------------------------------------------------
+    # Escritas deste worker
+    # ------------------------------------------------------------------
+    def gravar(self, registro: object) -> None:
+        """Atualiza as entradas de um registro inserido ou alterado neste worker."""
+        estado = self._estados.get(tenant_atual.get())
+        if estado is not None:
+            estado.gravar(registro.id, [getattr(registro, coluna) for coluna in self.colunas])
+
+    def remover(self, id_: int) -> None:
+        """Remove as entradas de um registro excluído neste worker."""
+        estado = self._estados.get(tenant_atual.get())
+        if estado is not None:
+            estado.remover(id_)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    async def buscar(self, termo: str, limite: int, deslocamento: int = 0) -> list[int]:
+        """
+        Ids dos registros com algum valor começando por `termo` (normalizado),
+        ordenados pelo valor encontrado, pulando os `deslocamento` primeiros.
+        Termos maiores que TAMANHO_CHAVE são comparados só até esse tamanho:
+        quem chama confere os registros e pede a página seguinte se faltarem.
+        """
+        prefixo = normalizar(termo).encode()
+        if not prefixo:
+            return []
+        estado = await self._estado_atual()
+        inicio = time.perf_counter()
+        ids = estado.buscar(prefixo, limite, deslocamento)
+        metricas.incrementar(f"sugestoes.{self.entidade}.consultas")
+        metricas.observar(f"sugestoes.{self.entidade}.busca_us", (time.perf_counter() - inicio) * 1_000_000)
+        return ids
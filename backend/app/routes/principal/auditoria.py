@@ -0,0 +1,43 @@
+# Importações Externas
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Importações Internas
+from app.database import get_db
+from app.schemas.shared.response import ResponseModel
+from app.schemas.principal.auditoria import AuditoriaRead
+from app.services.principal import auditoriaService
+from app.auth.dependencies import obter_usuario_atual
+
+
+# Rota
+router = APIRouter(
+    prefix="/auditoria",
+    tags=["Auditoria"]
+)
+
+
+@router.get("/", response_model=ResponseModel[list[AuditoriaRead]])
+async def consultar_auditoria(
+    entidade: Literal["usuario", "perfil"],
+    registro_id: int | None = None,
+    antes_de: int | None = None,
+    limite: int = Query(100, ge=1, le=1000),
+    usuario_logado=Depends(obter_usuario_atual),
+    db: AsyncSession = Depends(get_db)
+) -> ResponseModel[list[AuditoriaRead]]:
+    """
+    Consulta o histórico de alterações auditadas, do mais recente ao mais antigo.
+
+    ## Parâmetros
+    - `entidade`: Entidade auditada (`usuario` ou `perfil`).
+    - `registro_id`: Restringe ao histórico de um registro.
+    - `antes_de`: Paginação: retorna apenas eventos com id menor que este.
+    - `limite`: Quantidade máxima de eventos.
+
+    ## Retorna
+    - `ResponseModel[list[AuditoriaRead]]`: Eventos de auditoria encontrados.
+    """
+    eventos = await auditoriaService.consultar(db, entidade, registro_id, antes_de, limite)
+    return ResponseModel(status="success", mensagem=None, dados=eventos)
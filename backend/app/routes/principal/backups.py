@@ -0,0 +1,43 @@
+# Importações Externas
+import asyncio
+from fastapi import APIRouter, Depends
+
+# Importações Internas
+from app.database import tenant_atual
+from app.schemas.shared.response import ResponseModel
+from app.services.principal import backupService
+from app.auth.dependencies import exigir_admin
+
+
+# Rota
+router = APIRouter(
+    prefix="/backups",
+    tags=["Backups"]
+)
+
+
+@router.post("/", response_model=ResponseModel[dict])
+async def executar_backup(usuario_logado=Depends(exigir_admin)) -> ResponseModel[dict]:
+    """
+    Faz agora o backup online do banco do tenant do administrador.
+
+    O serviço continua atendendo durante a cópia. Se o cliente desconectar,
+    o backup segue até o fim.
+
+    ## Retorna
+    - `ResponseModel[dict]`: Relatório do backup (arquivo, tamanho, duração,
+      reinícios da cópia, passo mais longo e latência das requisições durante a cópia).
+    """
+    relatorio = await asyncio.shield(asyncio.ensure_future(backupService.executar(tenant_atual.get())))
+    return ResponseModel(status="success", mensagem="Backup concluído.", dados=relatorio)
+
+
+@router.get("/", response_model=ResponseModel[dict])
+async def listar_backups(usuario_logado=Depends(exigir_admin)) -> ResponseModel[dict]:
+    """
+    Lista os backups do banco do tenant do administrador, do mais recente ao mais antigo.
+
+    ## Retorna
+    - `ResponseModel[dict]`: Arquivos existentes e o relatório do último backup feito por este worker.
+    """
+    return ResponseModel(status="success", mensagem=None, dados=backupService.listar(tenant_atual.get()))
@@ -0,0 +1,66 @@
+# Importações Externas
+import json
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+# Importações Internas
+from app.database import tenant_atual
+from app.services.principal import eventoService
+
+
+# Rota
+router = APIRouter(
+    prefix="/eventos",
+    tags=["Eventos"]
+)
+
+# Entidades que podem ser assinadas
+ENTIDADES = {"usuario", "perfil"}
+# Intervalo (segundos) entre comentários de keep-alive quando não há eventos
+HEARTBEAT_SEGUNDOS = 15
+
+
+@router.get("/")
+async def assinar_eventos(request: Request, entidades: str | None = None) -> StreamingResponse:
+    """
+    Fluxo Server-Sent Events com as inserções, atualizações e remoções.
+
+    ## Parâmetros
+    - `entidades`: Entidades de interesse separadas por vírgula (`usuario`, `perfil`).
+      Sem o parâmetro, recebe todas.
+
+    ## Retorna
+    - `text/event-stream`: um evento por alteração do tenant da requisição, com `event` igual à entidade,
+      `id` igual ao `seq` do log e `data` com `{"seq", "entidade", "id", "operacao"}`.
+    """
+    filtro = None
+    if entidades:
+        filtro = {e.strip() for e in entidades.split(",")} & ENTIDADES
+
+    tenant = tenant_atual.get()
+    await eventoService.acompanhar_tenant(tenant)
+    assinatura = eventoService.difusor.assinar(filtro, tenant)
+
+    async def gerar():
+        try:
+            yield ": conectado\n\n"
+            while not assinatura.encerrada:
+                evento = await assinatura.proximo(HEARTBEAT_SEGUNDOS)
+                if evento is None:
+                    if assinatura.encerrada or await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield (
+                    f"id: {evento['seq']}\n"
+                    f"event: {evento['entidade']}\n"
+                    f"data: {json.dumps({k: v for k, v in evento.items() if k != 'tenant'})}\n\n"
+                )
+        finally:
+            eventoService.difusor.cancelar(assinatura)
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,51 @@
+# Importações Externas
+from fastapi import APIRouter
+
+# Importações Internas
+from app.schemas.principal.lote import LoteRequest, ResultadoOperacao
+from app.schemas.shared.response import ResponseModel
+from app.services.principal import loteService
+from app.utils.negociacao import RotaNegociada
+
+
+# Rota
+router = APIRouter(
+    prefix="/lote",
+    tags=["Lote"],
+    route_class=RotaNegociada
+)
+
+
+@router.post("/", response_model=ResponseModel[list[ResultadoOperacao]])
+async def executar_lote(dados: LoteRequest) -> ResponseModel[list[ResultadoOperacao]]:
+    """
+    Executa várias operações de usuários e perfis em uma única requisição e
+    transação, na ordem enviada.
+
+    ## Parâmetros
+    - `dados.operacoes`: Lista de operações, cada uma com `operacao` (ex:
+      `perfil.criar`, `usuario.atualizar`, `usuario.consultar`), `id` do
+      registro quando houver, `versao` (como o `If-Match`) e `dados` (o corpo
+      que a rota avulsa receberia).
+    - `dados.modo`: `tudo_ou_nada` (padrão: a primeira falha desfaz todas) ou
+      `independente` (cada operação é gravada ou desfeita sozinha).
+
+    ## Retorna
+    - `ResponseModel[list[ResultadoOperacao]]`: Um resultado por operação, no
+      mesmo envelope das rotas avulsas e com o `codigo` HTTP que cada uma teria.
+      As operações desfeitas ou não executadas por causa de outra trazem 424.
+    """
+    resultados = await loteService.executar(dados)
+    falhas = [i for i, r in enumerate(resultados) if r.status == "error"]
+    if not falhas:
+        mensagem = "Lote executado com sucesso."
+    elif dados.modo == "tudo_ou_nada":
+        indice = next(i for i in falhas if resultados[i].codigo != 424)
+        mensagem = f"Nenhuma operação foi gravada: a operação {indice} falhou."
+    else:
+        mensagem = f"{len(falhas)} de {len(resultados)} operações falharam; as demais foram gravadas."
+    return ResponseModel(
+        status="error" if falhas else "success",
+        mensagem=mensagem,
+        dados=resultados
+    )
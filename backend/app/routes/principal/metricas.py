@@ -0,0 +1,28 @@
+# Importações Externas
+from fastapi import APIRouter, Depends
+
+# Importações Internas
+from app.database import engine
+from app.schemas.shared.response import ResponseModel
+from app.auth.dependencies import obter_usuario_atual
+from app.utils import metricas
+
+
+# Rota
+router = APIRouter(
+    prefix="/metricas",
+    tags=["Métricas"]
+)
+
+
+@router.get("/", response_model=ResponseModel[dict])
+async def consultar_metricas(usuario_logado=Depends(obter_usuario_atual)) -> ResponseModel[dict]:
+    """
+    Retorna as métricas internas do worker que atendeu a requisição.
+
+    ## Retorna
+    - `ResponseModel[dict]`: Contadores, resumos de duração e estado do pool de conexões.
+    """
+    dados = metricas.consultar()
+    dados["pool"] = engine.pool.status()
+    return ResponseModel(status="success", mensagem=None, dados=dados)
@@ -1,39 +1,95 @@
 
 # Importações Externas
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from collections.abc import AsyncGenerator
 
 # Importações Internas
-from app.database import SessionLocal
+from app.database import get_db
 
 from app.schemas.principal.filtro import ConsultaFiltradaRequest
 from app.schemas.shared.response import ResponseModel
 
-from app.schemas.principal.perfil import PerfilCreate, PerfilRead
+from app.schemas.principal.perfil import PerfilCreate, PerfilRead, PerfilUpdate, PerfilComPermissoesRead, PerfilPermissoesUpdate
 from app.services.principal import perfilService
+from app.utils.etag import gerar_etag, versao_if_match
+from app.utils.negociacao import RotaNegociada
 
 
 # Rota
 router = APIRouter(
     prefix="/perfis",
-    tags=["Perfil", "Perfis"]
+    tags=["Perfil", "Perfis"],
+    route_class=RotaNegociada
 )
 
 
-# Dependência de sessão assíncrona
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
-        yield session
-
-
-@router.get("/", response_model=ResponseModel[list[PerfilRead]])
-async def listar_perfis(db: AsyncSession = Depends(get_db)):
+@router.get(
+    "/",
+    response_model=ResponseModel[list[PerfilComPermissoesRead]] | ResponseModel[list[PerfilRead]]
+)
+async def listar_perfis(incluir: str | None = None, db: AsyncSession = Depends(get_db)):
+    """
+    Lista os perfis. Com `?incluir=permissoes`, traz também as permissões de
+    cada perfil, carregadas em um número constante de consultas.
+    """
+    if incluir and "permissoes" in incluir.split(","):
+        perfis = await perfilService.listar_com_permissoes(db)
+        return ResponseModel[list[PerfilComPermissoesRead]].model_validate(
+            {"status": "success", "mensagem": None, "dados": perfis}, from_attributes=True
+        )
     perfis = await perfilService.listar(db)
-    return ResponseModel(status="success", mensagem=None, dados=perfis)
+    return ResponseModel[list[PerfilRead]].model_validate(
+        {"status": "success", "mensagem": None, "dados": perfis}, from_attributes=True
+    )
 
 
 @router.post("/", response_model=ResponseModel[PerfilRead])
 async def criar_perfil(dados: PerfilCreate, db: AsyncSession = Depends(get_db)):
     perfil = await perfilService.criar(db, dados)
     return ResponseModel(status="success", mensagem="Perfil criado", dados=perfil)
+
+
+@router.put("/{perfil_id}/permissoes", response_model=ResponseModel[PerfilComPermissoesRead])
+async def atualizar_permissoes(
+    perfil_id: int,
+    dados: PerfilPermissoesUpdate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Substitui o conjunto de permissões do perfil pelos ids informados.
+    """
+    perfil = await perfilService.atualizar_permissoes(db, perfil_id, dados.permissoes)
+    if not perfil:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return ResponseModel(status="success", mensagem="Permissões atualizadas", dados=perfil)
+
+
+@router.get("/{perfil_id}", response_model=ResponseModel[PerfilRead])
+async def buscar_perfil(perfil_id: int, response: Response, db: AsyncSession = Depends(get_db)):
+    """
+    Busca um perfil pelo ID. O cabeçalho `ETag` traz a versão do perfil.
+    """
+    perfil = await perfilService.buscar_por_id(db, perfil_id)
+    if not perfil:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    response.headers["ETag"] = gerar_etag(perfil.versao)
+    return ResponseModel(status="success", mensagem=None, dados=perfil)
+
+
+@router.put("/{perfil_id}", response_model=ResponseModel[PerfilRead])
+async def atualizar_perfil(
+    perfil_id: int,
+    dados: PerfilUpdate,
+    response: Response,
+    versao_esperada: int | None = Depends(versao_if_match),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Atualiza nome e/ou descrição do perfil. Com `If-Match`, recusa com 409 se
+    o perfil foi alterado desde a leitura.
+    """
+    perfil = await perfilService.atualizar(db, perfil_id, dados, versao_esperada)
+    if not perfil:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    response.headers["ETag"] = gerar_etag(perfil.versao)
+    return ResponseModel(status="success", mensagem="Perfil atualizado", dados=perfil)
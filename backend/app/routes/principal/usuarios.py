@@ -1,50 +1,64 @@
 # Importações Externas
-from fastapi import APIRouter, Depends, HTTPException
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from collections.abc import AsyncGenerator
 
 # Importações Internas
-from app.database import SessionLocal
+from app.database import get_db, tenant_atual
 from app.services.principal import usuarioService
 
-from app.schemas.principal.usuario import UsuarioCreate, UsuarioLogin, UsuarioUpdate, UsuarioRead
-from app.schemas.principal.filtro import ConsultaFiltradaRequest
+from app.schemas.principal.usuario import UsuarioCreate, UsuarioLogin, UsuarioUpdate, UsuarioRead, UsuarioAlteracoesRead
+from app.schemas.principal.filtro import ConsultaUsuariosRequest
 from app.schemas.shared.response import ResponseModel
 
 from app.auth.security import verificar_senha
 from app.auth.auth import criar_token
 from app.auth.dependencies import obter_usuario_atual
+from app.auth.revogacao import lista_revogacao
+from app.auth import limitador
+from app.utils.etag import gerar_etag, versao_if_match
+from app.utils.negociacao import RotaNegociada, formato_resposta
 
 
 # Rota
 router = APIRouter(
     prefix="/usuarios",
-    tags=["Usuários"]
+    tags=["Usuários"],
+    route_class=RotaNegociada
 )
 
-
-# Dependência de sessão assíncrona
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
-        yield session
-
 # ------------------------------------------------------------------------- #
 #                              ENDPOINTS                                    #
 # ------------------------------------------------------------------------- #
 
 
 @router.post("/login", response_model=ResponseModel[dict])
-async def login(dados: UsuarioLogin, db: AsyncSession = Depends(get_db)):
-    usuario = await usuarioService.buscar_com_filtros(
-        db, [{"coluna": "login", "valor": dados.login, "filtro": "="}]
-    )
-
-    usuario = usuario[0] if usuario else None
+async def login(dados: UsuarioLogin, request: Request, db: AsyncSession = Depends(get_db)):
+    # Limita tentativas por IP e por login antes de qualquer consulta ou bcrypt
+    ip = request.client.host if request.client else "desconhecido"
+    espera = limitador.verificar_tentativa(ip, dados.login)
+    if espera:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas tentativas de login. Tente novamente mais tarde.",
+            headers={"Retry-After": str(math.ceil(espera))}
+        )
+
+    usuario = await usuarioService.buscar_por_login(db, dados.login)
 
     if not usuario or not verificar_senha(dados.senha, usuario.senha):
+        limitador.registrar_falha(ip, dados.login)
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
 
-    token = criar_token({"sub": usuario.login})
+    limitador.registrar_sucesso(dados.login)
+
+    # O token carrega o tenant em que o usuário se autenticou; nas próximas
+    # requisições ele prevalece sobre o cabeçalho (ver TenantMiddleware)
+    claims = {"sub": usuario.login}
+    tenant = tenant_atual.get()
+    if tenant is not None:
+        claims["tenant"] = tenant
+    token = criar_token(claims)
 
     return ResponseModel(
         status="success",
@@ -71,6 +85,28 @@ async def me(usuario_logado=Depends(obter_usuario_atual)):
     return {"usuario": usuario_logado}
 
 
+@router.post("/logout", response_model=ResponseModel[dict])
+async def logout(usuario_logado=Depends(obter_usuario_atual)) -> ResponseModel[dict]:
+    """
+    Encerra a sessão atual revogando o token utilizado na requisição.
+
+    ## Parâmetros
+    - `usuario_logado`: Payload do token autenticado, injetado via `Depends`.
+
+    ## Retorna
+    - `ResponseModel[dict]`: Confirmação do logout.
+    """
+    jti = usuario_logado.get("jti")
+    if not jti:
+        raise HTTPException(status_code=400, detail="Token sem identificador, não pode ser revogado.")
+    await lista_revogacao.revogar(jti, usuario_logado["exp"])
+    return ResponseModel(
+        status="success",
+        mensagem="Logout realizado com sucesso.",
+        dados=None
+    )
+
+
 @router.post("/", response_model=ResponseModel[UsuarioRead])
 async def criar_usuario(
     dados: UsuarioCreate,
@@ -95,17 +131,28 @@ async def criar_usuario(
 
 
 @router.get("/", response_model=ResponseModel[list[UsuarioRead]])
-async def listar_usuarios(db: AsyncSession = Depends(get_db)) -> ResponseModel[list[UsuarioRead]]:
+async def listar_usuarios(
+    ids: str | None = None,
+    db: AsyncSession = Depends(get_db)
+) -> ResponseModel[list[UsuarioRead]]:
     """
-    Lista todos os usuários cadastrados.
+    Lista todos os usuários cadastrados, ou apenas os informados em `ids`.
 
     ## Parâmetros
+    - `ids`: IDs separados por vírgula (ex: `?ids=1,2,3`), resolvidos em uma única consulta.
     - `db`: Sessão assíncrona do banco de dados.
 
     ## Retorna
     - `ResponseModel[list[UsuarioRead]]`: Lista de usuários cadastrados.
     """
-    usuarios = await usuarioService.listar(db)
+    if ids is not None:
+        try:
+            lista_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+        except ValueError:
+            raise HTTPException(status_code=422, detail="O parâmetro ids deve conter números separados por vírgula.")
+        usuarios = await usuarioService.buscar_por_ids(db, lista_ids)
+    else:
+        usuarios = await usuarioService.listar(db)
     
     mensagem = "Usuários consultados com sucesso!" if usuarios else "Nenhum usuário encontrado."
     
@@ -116,9 +163,59 @@ async def listar_usuarios(db: AsyncSession = Depends(get_db)) -> ResponseModel[l
     )
 
 
+@router.get("/sugestoes", response_model=ResponseModel[list[UsuarioRead]])
+async def sugerir_usuarios(
+    q: str = Query(..., min_length=1, max_length=100),
+    limite: int = Query(10, ge=1, le=50)
+) -> ResponseModel[list[UsuarioRead]]:
+    """
+    Autocompletar de usuários por início do nome, login ou email.
+
+    ## Parâmetros
+    - `q`: Termo digitado (sem distinção de acentos e maiúsculas).
+    - `limite`: Quantidade máxima de sugestões.
+
+    ## Retorna
+    - `ResponseModel[list[UsuarioRead]]`: Usuários em ordem alfabética do valor encontrado.
+    """
+    usuarios = await usuarioService.sugerir(q, limite)
+    return ResponseModel(
+        status="success",
+        mensagem=None,
+        dados=usuarios
+    )
+
+
+@router.get("/changes", response_model=ResponseModel[UsuarioAlteracoesRead])
+async def listar_alteracoes(
+    since: int = Query(0, ge=0),
+    limite: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db)
+) -> ResponseModel[UsuarioAlteracoesRead]:
+    """
+    Feed incremental de alterações de usuários.
+
+    ## Parâmetros
+    - `since`: Cursor devolvido pela chamada anterior (0 na primeira sincronização).
+    - `limite`: Máximo de alterações lidas do log por chamada.
+    - `db`: Sessão assíncrona do banco de dados.
+
+    ## Retorna
+    - `ResponseModel[UsuarioAlteracoesRead]`: Usuários alterados, ids removidos,
+      o novo cursor e se há mais alterações a buscar.
+    """
+    alteracoes = await usuarioService.listar_alteracoes(db, since, limite)
+    return ResponseModel(
+        status="success",
+        mensagem=None,
+        dados=alteracoes
+    )
+
+
 @router.get("/{usuario_id}", response_model=ResponseModel[UsuarioRead])
 async def buscar_usuario(
     usuario_id: int,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ) -> ResponseModel[UsuarioRead]:
     """
@@ -130,10 +227,12 @@ async def buscar_usuario(
 
     ## Retorna
     - `ResponseModel[UsuarioRead]`: Dados do usuário encontrado, ou 404 se não existir.
+      O cabeçalho `ETag` traz a versão, para ser reenviada em `If-Match` no PUT.
     """
-    usuario = await usuarioService.buscar(db, usuario_id)
+    usuario = await usuarioService.buscar_pela_id(db, usuario_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    response.headers["ETag"] = gerar_etag(usuario.versao)
     return ResponseModel(
         status="success",
         mensagem=None,
@@ -145,6 +244,8 @@ async def buscar_usuario(
 async def atualizar_usuario(
     usuario_id: int,
     dados: UsuarioUpdate,
+    response: Response,
+    versao_esperada: int | None = Depends(versao_if_match),
     db: AsyncSession = Depends(get_db)
 ) -> ResponseModel[UsuarioRead]:
     """
@@ -153,14 +254,18 @@ async def atualizar_usuario(
     ## Parâmetros
     - `usuario_id`: ID do usuário a ser atualizado.
     - `dados`: Campos a serem atualizados (validados via `UsuarioUpdate`).
+    - `If-Match` (cabeçalho): ETag obtido no GET; se o usuário mudou desde
+      então, a atualização é recusada com 409.
     - `db`: Sessão assíncrona do banco de dados.
 
     ## Retorna
-    - `ResponseModel[UsuarioRead]`: Usuário atualizado ou 404 se não encontrado.
+    - `ResponseModel[UsuarioRead]`: Usuário atualizado (com o novo `ETag`), 404 se
+      não encontrado ou 409 se a versão não confere.
     """
-    usuario = await usuarioService.atualizar(db, usuario_id, dados)
+    usuario = await usuarioService.atualizar(db, usuario_id, dados, versao_esperada)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    response.headers["ETag"] = gerar_etag(usuario.versao)
     return ResponseModel(
         status="success",
         mensagem="Usuário atualizado com sucesso.",
@@ -194,43 +299,21 @@ async def remover_usuario(
 
 
 @router.post("/consulta_filtrada", response_model=ResponseModel[list[UsuarioRead]])
-async def buscar_usuarios_filtrados(
-    dados: ConsultaFiltradaRequest,
-    db: AsyncSession = Depends(get_db)
-) -> ResponseModel[list[UsuarioRead]]:
+async def buscar_usuarios_filtrados(dados: ConsultaUsuariosRequest) -> Response:
     """
     Realiza busca de usuários com filtros dinâmicos.
 
+    Requisições simultâneas com o mesmo corpo compartilham uma única consulta
+    e a mesma resposta serializada (JSON, ou MessagePack com
+    `Accept: application/msgpack`).
+
     ## Parâmetros
-    - `dados`: Objeto contendo filtros, ordenação, colunas desejadas e limite.
-    - `db`: Sessão assíncrona do banco de dados.
+    - `dados`: Objeto contendo filtros, ordenação, colunas desejadas, limite e
+      `incluir_arquivados` (busca também os inativos antigos já arquivados).
 
     ## Retorna
     - `ResponseModel[list[UsuarioRead]]`: Lista de usuários encontrados conforme os critérios informados.
     """
-
-    # Passo 1: Acessar a lista de filtros do objeto Pydantic (ConsultaFiltradaRequest)
-    # Neste ponto, dados.filtros é uma lista de objetos do tipo `Filtro`, não um dicionário puro
-    filtros_objetos = dados.filtros  # Pode ser None ou lista de Filtro
-
-    # Passo 2: Converter os objetos Pydantic (Filtro) para dicionários padrão Python (dict)
-    # Isso é necessário porque o repositório espera `list[dict[str, object]]`, não objetos Filtro
-    filtros_dict = [filtro.model_dump() for filtro in filtros_objetos] if filtros_objetos else None
-
-    # Passo 3: Chamar o service, repassando os dados transformados e os demais parâmetros
-    usuarios = await usuarioService.buscar_com_filtros(
-        db=db,
-        filtros=filtros_dict,
-        ordenacao=dados.ordenacao,
-        colunas=dados.colunas,
-        limite=dados.limite
-    )
-
-    # Passo 4: Retornar os dados dentro do ResponseModel padronizado para a API
-    return ResponseModel(
-        status="success",
-        mensagem=None,
-        dados=usuarios
-    )
-
-
+    formato = formato_resposta.get()
+    conteudo = await usuarioService.consulta_filtrada_serializada(dados, formato)
+    return Response(content=conteudo, media_type=formato)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Any
+
+
+class AuditoriaRead(BaseModel):
+    id: int
+    entidade: str
+    registro_id: int
+    operacao: str
+    dados: Any = None
+    data: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -13,3 +13,8 @@ class ConsultaFiltradaRequest(BaseModel):
     ordenacao: list[str] | None = None
     colunas: list[str] | None = None
     limite: int = 25
+
+
+class ConsultaUsuariosRequest(ConsultaFiltradaRequest):
+    # Inclui os usuários movidos para o arquivo (inativos antigos)
+    incluir_arquivados: bool = False
@@ -0,0 +1,38 @@
+from typing import Any, Literal
+from pydantic import BaseModel, Field, model_validator
+from app.schemas.shared.response import ResponseModel
+
+# Operações que exigem o `id` do registro
+OPERACOES_COM_ID = {
+    "usuario.buscar", "usuario.atualizar", "usuario.remover",
+    "perfil.buscar", "perfil.atualizar", "perfil.atualizar_permissoes",
+}
+
+
+class OperacaoLote(BaseModel):
+    operacao: Literal[
+        "usuario.criar", "usuario.buscar", "usuario.listar", "usuario.consultar",
+        "usuario.atualizar", "usuario.remover",
+        "perfil.criar", "perfil.buscar", "perfil.listar",
+        "perfil.atualizar", "perfil.atualizar_permissoes",
+    ]
+    id: int | None = None
+    versao: int | None = None        # como o If-Match: recusa com 409 se o registro mudou
+    dados: dict[str, Any] | None = None  # corpo que a rota avulsa receberia
+
+    @model_validator(mode="after")
+    def _exigir_id(self):
+        if self.operacao in OPERACOES_COM_ID and self.id is None:
+            raise ValueError(f"A operação '{self.operacao}' requer o campo id.")
+        return self
+
+
+class LoteRequest(BaseModel):
+    operacoes: list[OperacaoLote] = Field(..., min_length=1, max_length=100)
+    # tudo_ou_nada: a primeira falha desfaz o lote inteiro;
+    # independente: cada operação é confirmada ou desfeita sozinha
+    modo: Literal["tudo_ou_nada", "independente"] = "tudo_ou_nada"
+
+
+class ResultadoOperacao(ResponseModel[Any]):
+    codigo: int                      # status HTTP que a operação teria como requisição avulsa
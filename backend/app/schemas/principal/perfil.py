@@ -1,4 +1,5 @@
 from pydantic import BaseModel, ConfigDict
+from app.schemas.principal.permissao import PermissaoRead
 
 
 class PerfilBase(BaseModel):
@@ -12,6 +13,7 @@ class PerfilCreate(PerfilBase):
 
 class PerfilRead(PerfilBase):
     id: int
+    versao: int
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -19,3 +21,11 @@ class PerfilRead(PerfilBase):
 class PerfilUpdate(BaseModel):
     nome: str | None = None
     descricao: str | None = None
+
+
+class PerfilComPermissoesRead(PerfilRead):
+    permissoes: list[PermissaoRead] = []
+
+
+class PerfilPermissoesUpdate(BaseModel):
+    permissoes: list[int]
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class PermissaoRead(BaseModel):
+    id: int
+    nome: str
+    descricao: str
+
+    model_config = ConfigDict(from_attributes=True)
@@ -25,10 +25,19 @@ class UsuarioRead(BaseModel):
     email: EmailStr
     ativo: bool
     data_criacao: datetime
+    versao: int                      # também enviada no cabeçalho ETag
 
     model_config = ConfigDict(from_attributes=True)
 
 
+# Feed incremental: alterações desde um cursor
+class UsuarioAlteracoesRead(BaseModel):
+    cursor: int                      # enviar como `since` na próxima chamada
+    mais: bool                       # True se há mais alterações além deste lote
+    alterados: list[UsuarioRead]     # inseridos ou atualizados (estado atual)
+    removidos: list[int]             # ids removidos
+
+
 # Para editar: todos opcionais
 class UsuarioUpdate(BaseModel):
     nome: Optional[str] = Field(None, min_length=6)
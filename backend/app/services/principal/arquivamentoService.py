@@ -0,0 +1,85 @@
+# app/services/principal/arquivamentoService.py
+
+import os
+import random
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.database import bancos_existentes, preparar_tenant, tenant_atual
+from app.repositories.escritor import escritor
+from app.repositories.principal import usuarioRepository
+from app.services.principal import eventoService
+from app.utils import metricas
+from app.utils.fastLog import log
+
+# Idade (dias desde a criação) a partir da qual um usuário inativo é arquivado
+IDADE_DIAS = float(os.getenv("ARQUIVAMENTO_IDADE_DIAS", "180"))
+# Intervalo (s) entre as passagens do arquivamento; 0 desativa
+INTERVALO_SEGUNDOS = float(os.getenv("ARQUIVAMENTO_INTERVALO", "3600"))
+# Usuários movidos por transação e pausa (s) entre uma e outra: cada lote
+# segura o lock de escrita do SQLite só enquanto move as suas linhas
+TAMANHO_LOTE = int(os.getenv("ARQUIVAMENTO_LOTE", "500"))
+PAUSA_SEGUNDOS = float(os.getenv("ARQUIVAMENTO_PAUSA", "0.05"))
+
+
+async def arquivar(tenant: str | None) -> int:
+    """
+    Move para o arquivo, em lotes de ARQUIVAMENTO_LOTE, os usuários
+    inativos do banco do tenant criados há mais de ARQUIVAMENTO_IDADE_DIAS.
+
+    Cada lote passa pelo escritor agrupado, como qualquer outra escrita, e
+    é registrado no log de alterações: o snapshot e o índice de sugestões
+    dos outros workers deixam de ver esses usuários na próxima
+    sincronização; as leituras por id continuam encontrando-os no arquivo.
+
+    Parâmetros:
+        tenant (str | None): Tenant do banco; None para o banco padrão.
+
+    Retorna:
+        int: Quantidade de usuários arquivados.
+    """
+    await preparar_tenant(tenant)
+    token = tenant_atual.set(tenant)
+    try:
+        criados_antes_de = datetime.now(timezone.utc) - timedelta(days=IDADE_DIAS)
+        total = 0
+        while True:
+            ids = await escritor.executar(
+                lambda sessao: usuarioRepository.arquivar_inativos(sessao, criados_antes_de, TAMANHO_LOTE)
+            )
+            if not ids:
+                break
+            total += len(ids)
+            usuarioRepository.snapshot_usuarios.marcar_alteracao()
+            for usuario_id in ids:
+                usuarioRepository.indice_sugestoes.remover(usuario_id)
+            eventoService.notificar()
+            metricas.incrementar("arquivamento.usuarios", len(ids))
+            if len(ids) < TAMANHO_LOTE:
+                break
+            await asyncio.sleep(PAUSA_SEGUNDOS)
+    finally:
+        tenant_atual.reset(token)
+
+    if total:
+        log.info(f"{total} usuários arquivados no banco {tenant or 'padrão'}", module="Arquivamento")
+    return total
+
+
+async def agendar_arquivamento() -> None:
+    """
+    Tarefa de fundo: a cada ARQUIVAMENTO_INTERVALO arquiva os usuários
+    inativos antigos do banco padrão e dos tenants. Vários workers podem
+    rodar ao mesmo tempo: as condições são conferidas na própria escrita.
+    """
+    if INTERVALO_SEGUNDOS <= 0:
+        return
+    # Espalha os workers, que sobem juntos
+    await asyncio.sleep(random.uniform(0, min(60.0, INTERVALO_SEGUNDOS / 10)))
+    while True:
+        for tenant in bancos_existentes():
+            try:
+                await arquivar(tenant)
+            except Exception as exc:
+                log.error(f"Falha no arquivamento do banco {tenant or 'padrão'}: {exc}", module="Arquivamento")
+        await asyncio.sleep(INTERVALO_SEGUNDOS)
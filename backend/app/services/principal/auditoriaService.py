@@ -0,0 +1,131 @@
+# app/services/principal/auditoriaService.py
+
+import os
+import json
+import asyncio
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import fabrica_sessao_tenant, tenant_atual
+from app.repositories.principal import auditoriaRepository
+from app.entities.principal.auditoriaEntity import AuditoriaEntity
+from app.models.principal.auditoriaModel import AuditoriaModel
+from app.utils import metricas
+from app.utils.fastLog import log
+
+# Eventos em memória aguardando gravação; cheia, quem registra aguarda (backpressure)
+TAMANHO_FILA = int(os.getenv("AUDITORIA_TAMANHO_FILA", "10000"))
+# Máximo de eventos por INSERT e tempo máximo (s) que um evento espera pelo lote
+LOTE = int(os.getenv("AUDITORIA_LOTE", "500"))
+INTERVALO_SEGUNDOS = float(os.getenv("AUDITORIA_INTERVALO", "0.5"))
+
+# Campos que nunca vão para a auditoria
+CAMPOS_OCULTOS = {"senha"}
+
+_fila: asyncio.Queue = asyncio.Queue(maxsize=TAMANHO_FILA)
+_ENCERRAR = object()
+
+
+def _to_entity(modelo: AuditoriaModel) -> AuditoriaEntity:
+    return AuditoriaEntity(
+        id=modelo.id,
+        entidade=modelo.entidade,
+        registro_id=modelo.registro_id,
+        operacao=modelo.operacao,
+        dados=json.loads(modelo.dados) if modelo.dados else None,
+        data=modelo.data
+    )
+
+
+async def registrar(entidade: str, registro_id: int, operacao: str, dados: dict | None = None) -> None:
+    """
+    Enfileira um evento de auditoria para gravação em lote.
+
+    Parâmetros:
+        entidade (str): Entidade alterada ("usuario", "perfil").
+        registro_id (int): Id do registro alterado.
+        operacao (str): "I", "U" ou "D".
+        dados (dict | None): Campos gravados; campos sensíveis são descartados.
+    """
+    if dados:
+        dados = {k: v for k, v in dados.items() if k not in CAMPOS_OCULTOS}
+    await _fila.put({
+        "tenant": tenant_atual.get(),
+        "entidade": entidade,
+        "registro_id": registro_id,
+        "operacao": operacao,
+        "dados": json.dumps(dados, default=str, ensure_ascii=False) if dados else None,
+        "data": datetime.now(timezone.utc).replace(tzinfo=None),
+    })
+
+
+async def _gravar(lote: list[dict]) -> None:
+    # Um INSERT por tenant presente no lote, cada um no banco do seu tenant
+    por_tenant: dict[str | None, list[dict]] = {}
+    for evento in lote:
+        por_tenant.setdefault(evento["tenant"], []).append(evento)
+    for tenant, eventos in por_tenant.items():
+        await _gravar_tenant(tenant, eventos)
+
+
+async def _gravar_tenant(tenant: str | None, lote: list[dict]) -> None:
+    try:
+        async with fabrica_sessao_tenant(tenant)() as db:
+            await auditoriaRepository.inserir_eventos(
+                db, [{k: v for k, v in e.items() if k != "tenant"} for e in lote]
+            )
+        metricas.incrementar("auditoria.gravados", len(lote))
+    except Exception as exc:
+        # Não perde os eventos: ficam no log da aplicação para reprocessamento
+        log.error(
+            f"Falha ao gravar {len(lote)} eventos de auditoria do tenant {tenant}: {exc}",
+            module="Auditoria",
+            eventos=json.dumps(lote, default=str, ensure_ascii=False),
+        )
+
+
+async def processar_fila() -> None:
+    """
+    Tarefa de fundo: agrupa os eventos enfileirados e grava cada lote em um
+    único INSERT. Termina (gravando o que restar) após `encerrar()`.
+    """
+    loop = asyncio.get_running_loop()
+    encerrando = False
+    while not encerrando:
+        lote = [await _fila.get()]
+        prazo = loop.time() + INTERVALO_SEGUNDOS
+        while len(lote) < LOTE and lote[-1] is not _ENCERRAR:
+            try:
+                lote.append(_fila.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            restante = prazo - loop.time()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(_fila.get(), restante))
+            except asyncio.TimeoutError:
+                break
+
+        if lote[-1] is _ENCERRAR:
+            encerrando = True
+            lote.pop()
+            while not _fila.empty():
+                lote.append(_fila.get_nowait())
+        for inicio in range(0, len(lote), LOTE):
+            await _gravar(lote[inicio:inicio + LOTE])
+
+
+async def encerrar() -> None:
+    """Sinaliza o fim da tarefa de gravação após esvaziar a fila."""
+    await _fila.put(_ENCERRAR)
+
+
+async def consultar(db: AsyncSession,
+                    entidade: str,
+                    registro_id: int | None = None,
+                    antes_de: int | None = None,
+                    limite: int = 100) -> list[AuditoriaEntity]:
+    modelos = await auditoriaRepository.listar_auditoria(db, entidade, registro_id, antes_de, limite)
+    return [_to_entity(m) for m in modelos]
@@ -0,0 +1,241 @@
+# app/services/principal/backupService.py
+
+import os
+import re
+import gzip
+import time
+import random
+import shutil
+import sqlite3
+import asyncio
+from contextlib import closing
+from datetime import datetime, timezone
+
+from app.database import bancos_existentes, caminho_banco
+from app.utils import metricas
+from app.utils.fastLog import log
+
+# Diretório dos backups: `<banco>-<carimbo UTC>.db[.gz]`, com os dos tenants
+# no subdiretório `tenants`
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+# Intervalo (s) entre backups agendados; 0 desativa o agendamento
+INTERVALO_SEGUNDOS = float(os.getenv("BACKUP_INTERVALO", str(24 * 3600)))
+# Backups mantidos por banco; os mais antigos são apagados
+RETENCAO = int(os.getenv("BACKUP_RETENCAO", "7"))
+# Comprime o arquivo com gzip ao final
+COMPRIMIR = os.getenv("BACKUP_COMPRIMIR", "1") == "1"
+# Páginas copiadas por passo e pausa (s) entre passos: cada passo segura o
+# lock de leitura do banco só enquanto copia as suas páginas
+PAGINAS_POR_PASSO = int(os.getenv("BACKUP_PAGINAS", "256"))
+PAUSA_SEGUNDOS = float(os.getenv("BACKUP_PAUSA", "0.005"))
+# Reinícios tolerados com o mesmo tamanho de passo (o SQLite reinicia a cópia
+# quando outra conexão grava no banco); a cada excesso o passo é quadruplicado
+REINICIOS_POR_TAMANHO = 3
+
+NOME_PADRAO = "usuarios"
+
+# Um backup por vez neste worker (agendado ou disparado pelo administrador)
+_trava = asyncio.Lock()
+# Relatório do último backup de cada banco feito por este worker
+_ultimos: dict[str, dict] = {}
+
+
+class _Reiniciar(Exception):
+    pass
+
+
+def _nome_banco(tenant: str | None) -> str:
+    return NOME_PADRAO if tenant is None else tenant
+
+
+def _diretorio(tenant: str | None) -> str:
+    return BACKUP_DIR if tenant is None else os.path.join(BACKUP_DIR, "tenants")
+
+
+def _arquivos(tenant: str | None, parciais: bool = False) -> list[str]:
+    """Backups de um banco, do mais antigo ao mais recente."""
+    padrao = re.compile(
+        rf"{re.escape(_nome_banco(tenant))}-\d{{8}}T\d{{12}}Z\.db(\.gz)?" + (r"(\.parcial)?" if parciais else "")
+    )
+    diretorio = _diretorio(tenant)
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(
+        os.path.join(diretorio, arquivo) for arquivo in os.listdir(diretorio) if padrao.fullmatch(arquivo)
+    )
+
+
+def _copiar(origem: str, destino: str) -> dict:
+    """
+    Copia `origem` para `destino` com a API de backup online do SQLite, em
+    passos de poucas páginas com pausa entre eles. Roda em uma thread.
+    """
+    paginas = PAGINAS_POR_PASSO
+    reinicios = 0
+    passo_maximo = 0.0
+    total = 0
+    with closing(sqlite3.connect(f"file:{origem}?mode=ro", uri=True)) as fonte, \
+            closing(sqlite3.connect(destino)) as copia:
+        while True:
+            restantes_antes = None
+            reinicios_neste_tamanho = 0
+            marca = time.perf_counter()
+
+            def progresso(status, restantes, paginas_total):
+                nonlocal marca, restantes_antes, reinicios_neste_tamanho, reinicios, passo_maximo, total
+                passo_maximo = max(passo_maximo, time.perf_counter() - marca)
+                total = paginas_total
+                if restantes_antes is not None and restantes > restantes_antes:
+                    reinicios += 1
+                    reinicios_neste_tamanho += 1
+                    if reinicios_neste_tamanho > REINICIOS_POR_TAMANHO:
+                        raise _Reiniciar()
+                restantes_antes = restantes
+                time.sleep(PAUSA_SEGUNDOS)
+                marca = time.perf_counter()
+
+            try:
+                fonte.backup(copia, pages=paginas, progress=progresso)
+                break
+            except _Reiniciar:
+                # Escritas frequentes demais para o tamanho do passo: passos
+                # maiores terminam antes da próxima escrita
+                paginas *= 4
+    return {"paginas": total, "paginas_por_passo": paginas, "reinicios": reinicios,
+            "passo_maximo_ms": round(passo_maximo * 1000, 2)}
+
+
+def _comprimir(caminho: str) -> str:
+    destino = caminho + ".gz"
+    with open(caminho, "rb") as entrada, gzip.open(destino + ".parcial", "wb", compresslevel=6) as saida:
+        shutil.copyfileobj(entrada, saida, 1024 * 1024)
+    os.replace(destino + ".parcial", destino)
+    os.remove(caminho)
+    return destino
+
+
+def _aplicar_retencao(tenant: str | None) -> list[str]:
+    arquivos = _arquivos(tenant)
+    excedentes = arquivos[:-RETENCAO] if RETENCAO > 0 else []
+    for arquivo in excedentes:
+        os.remove(arquivo)
+    return excedentes
+
+
+def _latencia() -> tuple[int, float]:
+    resumo = metricas.consultar()["resumos"].get("http.latencia_ms")
+    if resumo is None:
+        return 0, 0.0
+    return resumo["quantidade"], resumo["media"] * resumo["quantidade"]
+
+
+async def executar(tenant: str | None) -> dict:
+    """
+    Faz o backup do banco do tenant (ou do padrão) sem parar o serviço.
+
+    A cópia roda em uma thread, em passos de BACKUP_PAGINAS páginas: entre
+    um passo e outro as escritas seguem normalmente. O arquivo é gravado com
+    extensão `.parcial` e renomeado só quando completo (e comprimido, se
+    BACKUP_COMPRIMIR), então um backup listado está sempre íntegro.
+
+    Parâmetros:
+        tenant (str | None): Tenant do banco; None para o banco padrão.
+
+    Retorna:
+        dict: Relatório com arquivo, tamanho, duração, reinícios da cópia, o
+            passo mais longo (tempo máximo em que o backup segurou o banco) e a
+            latência média das requisições deste worker durante o backup,
+            comparada à de antes dele.
+    """
+    nome = _nome_banco(tenant)
+    origem = caminho_banco(tenant)
+    if not os.path.exists(origem):
+        raise FileNotFoundError(f"Banco {nome!r} não encontrado")
+
+    async with _trava:
+        os.makedirs(_diretorio(tenant), exist_ok=True)
+        carimbo = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        destino = os.path.join(_diretorio(tenant), f"{nome}-{carimbo}.db")
+
+        quantidade_antes, soma_antes = _latencia()
+        inicio = time.perf_counter()
+        try:
+            estatisticas = await asyncio.to_thread(_copiar, origem, destino + ".parcial")
+            os.replace(destino + ".parcial", destino)
+            if COMPRIMIR:
+                destino = await asyncio.to_thread(_comprimir, destino)
+        except BaseException:
+            for resto in (destino + ".parcial", destino + ".gz.parcial"):
+                if os.path.exists(resto):
+                    os.remove(resto)
+            metricas.incrementar("backup.falhas")
+            raise
+        duracao = time.perf_counter() - inicio
+        quantidade_depois, soma_depois = _latencia()
+        removidos = await asyncio.to_thread(_aplicar_retencao, tenant)
+
+    requisicoes = quantidade_depois - quantidade_antes
+    relatorio = {
+        "banco": nome,
+        "arquivo": os.path.basename(destino),
+        "bytes": os.path.getsize(destino),
+        "duracao_s": round(duracao, 3),
+        **estatisticas,
+        "requisicoes_durante": requisicoes,
+        "latencia_media_ms_durante": round((soma_depois - soma_antes) / requisicoes, 2) if requisicoes else None,
+        "latencia_media_ms_antes": round(soma_antes / quantidade_antes, 2) if quantidade_antes else None,
+        "removidos": [os.path.basename(r) for r in removidos],
+        "concluido_em": datetime.now(timezone.utc).isoformat(),
+    }
+    _ultimos[nome] = relatorio
+    metricas.incrementar("backup.execucoes")
+    metricas.observar("backup.duracao_ms", duracao * 1000)
+    metricas.observar("backup.passo_maximo_ms", estatisticas["passo_maximo_ms"])
+    log.info(
+        f"Backup de {nome} concluído em {duracao:.2f}s ({relatorio['bytes']} bytes, "
+        f"{estatisticas['reinicios']} reinícios, passo máximo {estatisticas['passo_maximo_ms']}ms)",
+        module="Backup",
+    )
+    return relatorio
+
+
+def listar(tenant: str | None) -> dict:
+    """Backups existentes do banco do tenant e o relatório do último feito por este worker."""
+    arquivos = _arquivos(tenant)
+    return {
+        "arquivos": [
+            {"arquivo": os.path.basename(a), "bytes": os.path.getsize(a)}
+            for a in reversed(arquivos)
+        ],
+        "ultimo": _ultimos.get(_nome_banco(tenant)),
+    }
+
+
+def _backup_recente(tenant: str | None) -> bool:
+    """
+    True se já há um backup do banco (ou um em andamento) mais novo que o
+    intervalo, feito por qualquer worker.
+    """
+    arquivos = _arquivos(tenant, parciais=True)
+    return bool(arquivos) and time.time() - os.path.getmtime(arquivos[-1]) < INTERVALO_SEGUNDOS * 0.9
+
+
+async def agendar_backups() -> None:
+    """
+    Tarefa de fundo: a cada BACKUP_INTERVALO faz o backup do banco padrão e
+    dos tenants. Com vários workers, quem chega depois encontra o backup
+    recente no diretório e não repete.
+    """
+    if INTERVALO_SEGUNDOS <= 0:
+        return
+    # Espalha os workers, que sobem juntos
+    await asyncio.sleep(random.uniform(0, min(60.0, INTERVALO_SEGUNDOS / 10)))
+    while True:
+        for tenant in bancos_existentes():
+            if _backup_recente(tenant):
+                continue
+            try:
+                await executar(tenant)
+            except Exception as exc:
+                log.error(f"Falha no backup agendado de {_nome_banco(tenant)}: {exc}", module="Backup")
+        await asyncio.sleep(INTERVALO_SEGUNDOS)
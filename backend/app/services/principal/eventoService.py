@@ -0,0 +1,95 @@
+# app/services/principal/eventoService.py
+
+import os
+import asyncio
+
+from app.database import fabrica_sessao_tenant, preparar_tenant
+from app.repositories.principal import alteracaoRepository
+from app.utils.eventos import Difusor
+from app.utils.fastLog import log
+
+# Intervalo máximo (segundos) entre leituras do log de alterações; cobre as
+# escritas feitas por outros workers, que não conseguem acordar este processo
+INTERVALO_SEGUNDOS = float(os.getenv("EVENTOS_INTERVALO", "1"))
+# Eventos pendentes por assinante antes de ele ser considerado lento
+TAMANHO_FILA = int(os.getenv("EVENTOS_TAMANHO_FILA", "100"))
+# Alterações lidas do log por consulta
+LOTE = 500
+
+difusor = Difusor(TAMANHO_FILA)
+
+_novidade = asyncio.Event()
+
+# Último `seq` publicado de cada tenant acompanhado (None = banco padrão)
+_cursores: dict[str | None, int] = {}
+
+
+def notificar() -> None:
+    """
+    Avisa que houve escrita neste worker, antecipando a próxima leitura do log.
+
+    Chamado pelos services após gravar; os eventos em si saem sempre do log
+    de alterações, que é a fonte comum a todos os workers.
+    """
+    _novidade.set()
+
+
+async def acompanhar_tenant(tenant: str | None) -> None:
+    """
+    Passa a ler o log de alterações do tenant, a partir do fim atual.
+
+    Chamado ao abrir uma assinatura, antes de responder: o que o tenant
+    gravar dali em diante chega ao assinante.
+    """
+    if tenant in _cursores:
+        return
+    async with fabrica_sessao_tenant(tenant)() as db:
+        ultimo = await alteracaoRepository.obter_ultimo_seq(db)
+    _cursores.setdefault(tenant, ultimo)
+
+
+async def _publicar_novas(tenant: str | None) -> None:
+    await preparar_tenant(tenant)
+    while True:
+        async with fabrica_sessao_tenant(tenant)() as db:
+            alteracoes = await alteracaoRepository.listar_todas_alteracoes_desde(db, _cursores[tenant], LOTE)
+        for alteracao in alteracoes:
+            difusor.publicar({
+                "tenant": tenant,
+                "seq": alteracao.seq,
+                "entidade": alteracao.entidade,
+                "id": alteracao.registro_id,
+                "operacao": alteracao.operacao,
+            })
+            _cursores[tenant] = alteracao.seq
+        if len(alteracoes) < LOTE:
+            break
+
+
+async def acompanhar_alteracoes() -> None:
+    """
+    Tarefa de fundo: lê o log de alterações de cada tenant acompanhado a
+    partir do último `seq` visto e publica cada alteração no difusor local.
+
+    O banco padrão é sempre acompanhado; os demais tenants, enquanto tiverem
+    assinantes neste worker. Começa do fim do log: assinantes recebem apenas
+    o que acontecer depois.
+    """
+    await acompanhar_tenant(None)
+
+    while True:
+        try:
+            await asyncio.wait_for(_novidade.wait(), INTERVALO_SEGUNDOS)
+        except asyncio.TimeoutError:
+            pass
+        _novidade.clear()
+
+        assinados = difusor.tenants()
+        for tenant in list(_cursores):
+            if tenant is not None and tenant not in assinados:
+                del _cursores[tenant]
+                continue
+            try:
+                await _publicar_novas(tenant)
+            except Exception as exc:
+                log.error(f"Falha ao ler o log de alterações do tenant {tenant}: {exc}", module="Eventos")
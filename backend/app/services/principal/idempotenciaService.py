@@ -0,0 +1,127 @@
+# app/services/principal/idempotenciaService.py
+
+import os
+import json
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.database import SessionLocal, fabrica_sessao_tenant, tenant_atual, tenants_abertos
+from app.models.principal.idempotenciaModel import IdempotenciaModel
+from app.repositories.principal import idempotenciaRepository
+from app.utils import metricas
+from app.utils.fastLog import log
+
+# Por quanto tempo (s) a resposta de uma chave é devolvida às repetições
+TTL_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_TTL", str(24 * 3600)))
+# Prazo (s) da reserva de uma execução em andamento; vencido, outra tentativa
+# pode assumir a chave (ex.: o worker que a reservou caiu no meio)
+RESERVA_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_RESERVA", "60"))
+# Intervalo (s) entre consultas ao aguardar uma execução de outro worker
+INTERVALO_ESPERA = 0.05
+# Intervalo (s) entre limpezas das chaves vencidas
+LIMPEZA_SEGUNDOS = float(os.getenv("IDEMPOTENCIA_LIMPEZA", "300"))
+
+# Execuções em andamento neste worker: repetições concorrentes aguardam o
+# evento em vez de consultar o banco em laço
+_em_andamento: dict[tuple[str | None, str], asyncio.Event] = {}
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def iniciar(chave: str, impressao: str) -> IdempotenciaModel | None:
+    """
+    Reserva a chave para esta requisição ou aguarda a execução que já a reservou.
+
+    Parâmetros:
+        chave (str): Chave já com o escopo do usuário e da rota.
+        impressao (str): Hash do corpo da requisição.
+
+    Retorna:
+        IdempotenciaModel | None: None se esta requisição deve executar (e depois
+            chamar `concluir` ou `liberar`); caso contrário, a resposta guardada
+            pela execução anterior com a mesma chave.
+    """
+    local = (tenant_atual.get(), chave)
+    aguardou = False
+    while True:
+        evento = _em_andamento.get(local)
+        if evento is not None:
+            aguardou = True
+            try:
+                await asyncio.wait_for(evento.wait(), RESERVA_SEGUNDOS)
+            except asyncio.TimeoutError:
+                pass
+
+        agora = _agora()
+        async with SessionLocal() as db:
+            registro = await idempotenciaRepository.reservar(
+                db, chave, impressao, agora, agora + timedelta(seconds=RESERVA_SEGUNDOS)
+            )
+        if registro is None:
+            _em_andamento[local] = asyncio.Event()
+            return None
+        if registro.status is not None:
+            metricas.incrementar("idempotencia.repeticoes")
+            return registro
+
+        # Em andamento em outro worker (ou reserva local ainda não registrada)
+        if not aguardou:
+            metricas.incrementar("idempotencia.esperas")
+            aguardou = True
+        await asyncio.sleep(INTERVALO_ESPERA)
+
+
+def _finalizar(chave: str) -> None:
+    evento = _em_andamento.pop((tenant_atual.get(), chave), None)
+    if evento is not None:
+        evento.set()
+
+
+async def concluir(chave: str, status: int, cabecalhos: list[tuple[bytes, bytes]], corpo: bytes) -> None:
+    """
+    Guarda a resposta da execução e libera as repetições que a aguardam.
+    """
+    try:
+        async with SessionLocal() as db:
+            await idempotenciaRepository.gravar_resposta(
+                db,
+                chave,
+                status,
+                json.dumps([[nome.decode("latin-1"), valor.decode("latin-1")] for nome, valor in cabecalhos]),
+                corpo,
+                _agora() + timedelta(seconds=TTL_SEGUNDOS),
+            )
+    finally:
+        _finalizar(chave)
+
+
+async def liberar(chave: str) -> None:
+    """
+    Desfaz a reserva de uma execução que falhou: a próxima tentativa executa de novo.
+    """
+    try:
+        async with SessionLocal() as db:
+            await idempotenciaRepository.liberar(db, chave)
+    finally:
+        _finalizar(chave)
+
+
+def cabecalhos_guardados(registro: IdempotenciaModel) -> list[tuple[bytes, bytes]]:
+    """Cabeçalhos da resposta guardada, no formato ASGI."""
+    return [(nome.encode("latin-1"), valor.encode("latin-1")) for nome, valor in json.loads(registro.cabecalhos)]
+
+
+async def limpar_expiradas() -> None:
+    """Tarefa de fundo: remove periodicamente as chaves vencidas do banco padrão e dos tenants abertos."""
+    while True:
+        await asyncio.sleep(LIMPEZA_SEGUNDOS)
+        for tenant in [None, *tenants_abertos()]:
+            try:
+                async with fabrica_sessao_tenant(tenant)() as db:
+                    removidas = await idempotenciaRepository.remover_expirados(db, _agora())
+                if removidas:
+                    log.info(f"{removidas} chaves de idempotência vencidas removidas (tenant {tenant})", module="Idempotencia")
+            except Exception as exc:
+                log.error(f"Falha ao limpar chaves de idempotência do tenant {tenant}: {exc}", module="Idempotencia")
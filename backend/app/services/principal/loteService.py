@@ -0,0 +1,228 @@
+# app/services/principal/loteService.py
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.security import gerar_hash_senha
+from app.exceptions.respostas import resposta_de_erro
+from app.repositories.escritor import escritor
+from app.schemas.principal.filtro import ConsultaUsuariosRequest
+from app.schemas.principal.lote import LoteRequest, OperacaoLote, ResultadoOperacao
+from app.schemas.principal.perfil import (
+    PerfilCreate, PerfilRead, PerfilUpdate, PerfilComPermissoesRead, PerfilPermissoesUpdate
+)
+from app.schemas.principal.usuario import UsuarioCreate, UsuarioRead, UsuarioUpdate
+from app.services.principal import perfilService, usuarioService
+from app.utils import metricas
+from app.utils.fastLog import log
+
+# (código, mensagem, dados) do resultado de uma operação bem-sucedida
+Execucao = tuple[int, str | None, Any]
+
+
+class _LoteDesfeito(Exception):
+    def __init__(self, indice: int):
+        self.indice = indice
+        super().__init__(f"Operação {indice} falhou")
+
+
+def _validar(schema: type[BaseModel], dados: dict | None) -> Any:
+    # Os erros apontam para o campo dentro de `dados`, como na rota avulsa
+    try:
+        return schema.model_validate(dados or {})
+    except ValidationError as exc:
+        raise RequestValidationError([{**e, "loc": ("dados", *e["loc"])} for e in exc.errors()])
+
+
+def _filtro_por_id(registro_id: int) -> list[dict]:
+    return [{"coluna": "id", "valor": registro_id, "filtro": "=", "ou": False}]
+
+
+# Preparação: o que não depende do banco (validação dos `dados` e o hash
+# das senhas, que é caro) é feito antes de abrir a transação, para não
+# segurar o lock de escrita do SQLite enquanto isso.
+
+def _sem_dados(op: OperacaoLote) -> None:
+    return None
+
+
+def _com_dados(schema: type[BaseModel]) -> Callable[[OperacaoLote], Any]:
+    return lambda op: _validar(schema, op.dados)
+
+
+def _preparar_usuario_criar(op: OperacaoLote) -> tuple[UsuarioCreate, str]:
+    dados = _validar(UsuarioCreate, op.dados)
+    return dados, gerar_hash_senha(dados.senha)
+
+
+# As leituras usam a sessão do lote (e não o cache ou o carregador por id):
+# enxergam o que as operações anteriores gravaram e ainda não foi confirmado.
+
+async def _usuario_criar(db: AsyncSession, op: OperacaoLote, preparado: tuple[UsuarioCreate, str]) -> Execucao:
+    dados, senha_hash = preparado
+    usuario = await usuarioService.criar(db, dados, senha_hash)
+    return 200, "Usuário criado com sucesso.", UsuarioRead.model_validate(usuario)
+
+
+async def _usuario_buscar(db: AsyncSession, op: OperacaoLote, preparado: None) -> Execucao:
+    usuarios = await usuarioService.buscar_com_filtros(db, _filtro_por_id(op.id), limite=1, incluir_arquivados=True)
+    if not usuarios:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return 200, None, UsuarioRead.model_validate(usuarios[0])
+
+
+async def _usuario_listar(db: AsyncSession, op: OperacaoLote, preparado: None) -> Execucao:
+    usuarios = await usuarioService.listar(db)
+    mensagem = "Usuários consultados com sucesso!" if usuarios else "Nenhum usuário encontrado."
+    return 200, mensagem, [UsuarioRead.model_validate(u) for u in usuarios]
+
+
+async def _usuario_consultar(db: AsyncSession, op: OperacaoLote, consulta: ConsultaUsuariosRequest) -> Execucao:
+    usuarios = await usuarioService.buscar_com_filtros(
+        db, consulta.model_dump()["filtros"], consulta.ordenacao, consulta.colunas,
+        consulta.limite, consulta.incluir_arquivados
+    )
+    return 200, None, [UsuarioRead.model_validate(u) for u in usuarios]
+
+
+async def _usuario_atualizar(db: AsyncSession, op: OperacaoLote, dados: UsuarioUpdate) -> Execucao:
+    usuario = await usuarioService.atualizar(db, op.id, dados, op.versao)
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return 200, "Usuário atualizado com sucesso.", UsuarioRead.model_validate(usuario)
+
+
+async def _usuario_remover(db: AsyncSession, op: OperacaoLote, preparado: None) -> Execucao:
+    if not await usuarioService.remover(db, op.id):
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return 200, "Usuário removido com sucesso.", {"id": op.id}
+
+
+async def _perfil_criar(db: AsyncSession, op: OperacaoLote, dados: PerfilCreate) -> Execucao:
+    perfil = await perfilService.criar(db, dados)
+    return 200, "Perfil criado", PerfilRead.model_validate(perfil)
+
+
+async def _perfil_buscar(db: AsyncSession, op: OperacaoLote, preparado: None) -> Execucao:
+    perfis = await perfilService.buscar_com_filtros(db, _filtro_por_id(op.id), limite=1)
+    if not perfis:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return 200, None, PerfilRead.model_validate(perfis[0])
+
+
+async def _perfil_listar(db: AsyncSession, op: OperacaoLote, preparado: None) -> Execucao:
+    perfis = await perfilService.listar(db)
+    return 200, None, [PerfilRead.model_validate(p) for p in perfis]
+
+
+async def _perfil_atualizar(db: AsyncSession, op: OperacaoLote, dados: PerfilUpdate) -> Execucao:
+    perfil = await perfilService.atualizar(db, op.id, dados, op.versao)
+    if not perfil:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return 200, "Perfil atualizado", PerfilRead.model_validate(perfil)
+
+
+async def _perfil_atualizar_permissoes(db: AsyncSession, op: OperacaoLote, dados: PerfilPermissoesUpdate) -> Execucao:
+    perfil = await perfilService.atualizar_permissoes(db, op.id, dados.permissoes)
+    if not perfil:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+    return 200, "Permissões atualizadas", PerfilComPermissoesRead.model_validate(perfil)
+
+
+# operação -> (preparação fora da transação, execução dentro dela)
+_OPERACOES: dict[str, tuple[Callable[[OperacaoLote], Any], Callable[[AsyncSession, OperacaoLote, Any], Awaitable[Execucao]]]] = {
+    "usuario.criar": (_preparar_usuario_criar, _usuario_criar),
+    "usuario.buscar": (_sem_dados, _usuario_buscar),
+    "usuario.listar": (_sem_dados, _usuario_listar),
+    "usuario.consultar": (_com_dados(ConsultaUsuariosRequest), _usuario_consultar),
+    "usuario.atualizar": (_com_dados(UsuarioUpdate), _usuario_atualizar),
+    "usuario.remover": (_sem_dados, _usuario_remover),
+    "perfil.criar": (_com_dados(PerfilCreate), _perfil_criar),
+    "perfil.buscar": (_sem_dados, _perfil_buscar),
+    "perfil.listar": (_sem_dados, _perfil_listar),
+    "perfil.atualizar": (_com_dados(PerfilUpdate), _perfil_atualizar),
+    "perfil.atualizar_permissoes": (_com_dados(PerfilPermissoesUpdate), _perfil_atualizar_permissoes),
+}
+
+
+def _resultado_de_erro(op: OperacaoLote, exc: Exception) -> ResultadoOperacao:
+    codigo, resposta, _ = resposta_de_erro(exc)
+    if codigo >= 500:
+        log.error(f"Erro na operação {op.operacao} do lote: {exc!r}", module="Lote")
+    return ResultadoOperacao(**resposta.model_dump(), codigo=codigo)
+
+
+async def executar(dados: LoteRequest) -> list[ResultadoOperacao]:
+    """
+    Executa as operações do lote, em ordem, em uma única transação do
+    escritor agrupado, cada uma em um SAVEPOINT próprio.
+
+    No modo `tudo_ou_nada`, a primeira falha desfaz a transação inteira: a
+    operação que falhou traz o seu erro e as demais, código 424. No modo
+    `independente`, a falha desfaz só a operação, e as outras são gravadas.
+
+    Invalidações de cache, eventos e auditoria das operações só acontecem
+    depois do COMMIT, e só para as que foram gravadas.
+
+    Parâmetros:
+        dados (LoteRequest): Operações e modo de execução.
+
+    Retorna:
+        list[ResultadoOperacao]: Um resultado por operação, na mesma ordem,
+            no envelope de `ResponseModel` com o código HTTP equivalente.
+    """
+    total = len(dados.operacoes)
+    resultados: list[ResultadoOperacao | None] = [None] * total
+
+    def desfazer(falha: int) -> None:
+        for indice in range(total):
+            if indice != falha:
+                situacao = "desfeita" if indice < falha else "não executada"
+                resultados[indice] = ResultadoOperacao(
+                    status="error",
+                    mensagem=f"Operação {situacao}: a operação {falha} do lote falhou.",
+                    dados=None,
+                    codigo=424,
+                )
+
+    preparados: list[Any] = []
+    for op in dados.operacoes:
+        try:
+            preparados.append(_OPERACOES[op.operacao][0](op))
+        except Exception as exc:
+            # A falha é registrada na vez da operação, na mesma ordem
+            preparados.append(exc)
+
+    async def executar_operacoes(db: AsyncSession) -> None:
+        for indice, op in enumerate(dados.operacoes):
+            try:
+                async with escritor.etapa() as sessao:
+                    if isinstance(preparados[indice], Exception):
+                        raise preparados[indice]
+                    codigo, mensagem, conteudo = await _OPERACOES[op.operacao][1](sessao, op, preparados[indice])
+            except Exception as exc:
+                resultados[indice] = _resultado_de_erro(op, exc)
+                if dados.modo == "tudo_ou_nada":
+                    raise _LoteDesfeito(indice) from exc
+                continue
+            resultados[indice] = ResultadoOperacao(status="success", mensagem=mensagem, dados=conteudo, codigo=codigo)
+
+    invalida = next((i for i, p in enumerate(preparados) if isinstance(p, Exception)), None)
+    if dados.modo == "tudo_ou_nada" and invalida is not None:
+        # Nada seria gravado: nem abre a transação
+        resultados[invalida] = _resultado_de_erro(dados.operacoes[invalida], preparados[invalida])
+        desfazer(invalida)
+    else:
+        try:
+            await escritor.executar_em_transacao(executar_operacoes)
+        except _LoteDesfeito as falha:
+            desfazer(falha.indice)
+
+    metricas.incrementar("lote.requisicoes")
+    metricas.incrementar("lote.operacoes", len(dados.operacoes))
+    return resultados
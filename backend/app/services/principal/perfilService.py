@@ -3,20 +3,47 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.principal.perfil import PerfilCreate, PerfilUpdate
 from app.repositories.principal import perfilRepository
+from app.repositories.escritor import escritor
+from app.services.principal import eventoService, auditoriaService, usuarioService
 from app.entities.principal.perfilEntity import PerfilEntity
+from app.entities.principal.permissaoEntity import PermissaoEntity
+from app.exceptions.regra_negocio import RegraNegocioException
 from app.models.principal.perfilModel import perfilModel
 
 
-def _to_entity(modelo: perfilModel) -> PerfilEntity:
+def _to_entity(modelo: perfilModel, incluir_permissoes: bool = False) -> PerfilEntity:
+    permissoes = None
+    if incluir_permissoes:
+        permissoes = [
+            PermissaoEntity(id=pp.permissao.id, nome=pp.permissao.nome, descricao=pp.permissao.descricao)
+            for pp in modelo.permissoes
+        ]
     return PerfilEntity(
         id=modelo.id,
         nome=modelo.nome,
-        descricao=modelo.descricao
+        descricao=modelo.descricao,
+        permissoes=permissoes,
+        versao=modelo.versao
     )
 
 
+async def _validar_nome(nome: str, perfil_id: int | None = None) -> None:
+    # Os usuários referenciam o perfil pelo nome na API: ele não pode repetir
+    existente = await perfilRepository.mapa_perfis.id_por_nome(nome)
+    if existente is not None and existente != perfil_id:
+        raise RegraNegocioException(f"Já existe um perfil com o nome '{nome}'.")
+
+
 async def criar(db: AsyncSession, dados: PerfilCreate) -> PerfilEntity:
-    model = await perfilRepository.criar_perfil(db, dados)
+    await _validar_nome(dados.nome)
+    model = await escritor.executar(lambda sessao: perfilRepository.criar_perfil(sessao, dados))
+
+    async def propagar():
+        perfilRepository.mapa_perfis.marcar_alteracao()
+        eventoService.notificar()
+        await auditoriaService.registrar("perfil", model.id, "I", dados.model_dump())
+
+    await escritor.apos_confirmar(propagar)
     return _to_entity(model)
 
 
@@ -25,11 +52,41 @@ async def listar(db: AsyncSession) -> list[PerfilEntity]:
     return [_to_entity(p) for p in modelos]
 
 
+async def listar_com_permissoes(db: AsyncSession) -> list[PerfilEntity]:
+    modelos = await perfilRepository.listar_perfis_com_permissoes(db)
+    return [_to_entity(p, incluir_permissoes=True) for p in modelos]
+
+
+async def atualizar_permissoes(db: AsyncSession, perfil_id: int, ids_permissoes: list[int]) -> PerfilEntity | None:
+    ids = set(ids_permissoes)
+    if ids:
+        inexistentes = ids - await perfilRepository.buscar_ids_permissoes_existentes(db, list(ids))
+        if inexistentes:
+            raise RegraNegocioException(
+                f"Permissões inexistentes: {', '.join(str(i) for i in sorted(inexistentes))}."
+            )
+    model = await perfilRepository.substituir_permissoes(db, perfil_id, list(ids))
+    if not model:
+        return None
+
+    async def propagar():
+        eventoService.notificar()
+        await auditoriaService.registrar("perfil", perfil_id, "U", {"permissoes": sorted(ids)})
+
+    await escritor.apos_confirmar(propagar)
+    return _to_entity(model, incluir_permissoes=True)
+
+
 async def buscar_por_id(db: AsyncSession, perfil_id: int) -> PerfilEntity | None:
-    model = await perfilRepository.buscar_perfil_por_id(db, perfil_id)
+    model = await perfilRepository.carregar_perfil_por_id(perfil_id)
     return _to_entity(model) if model else None
 
 
+async def buscar_por_ids(db: AsyncSession, ids: list[int]) -> list[PerfilEntity]:
+    modelos = await perfilRepository.carregar_perfis_por_ids(ids)
+    return [_to_entity(p) for p in modelos]
+
+
 async def buscar_com_filtros(
     db: AsyncSession,
     filtros: list[dict[str, object]] | list[list] | None = None,
@@ -41,10 +98,37 @@ async def buscar_com_filtros(
     return [_to_entity(p) for p in modelos]
 
 
-async def atualizar(db: AsyncSession, perfil_id: int, dados: PerfilUpdate) -> PerfilEntity | None:
-    model = await perfilRepository.atualizar_perfil(db, perfil_id, dados)
-    return _to_entity(model) if model else None
+async def atualizar(db: AsyncSession,
+                    perfil_id: int,
+                    dados: PerfilUpdate,
+                    versao_esperada: int | None = None) -> PerfilEntity | None:
+    if dados.nome is not None:
+        await _validar_nome(dados.nome, perfil_id)
+    model = await perfilRepository.atualizar_perfil(db, perfil_id, dados, versao_esperada)
+    if not model:
+        return None
+
+    async def propagar():
+        perfilRepository.mapa_perfis.marcar_alteracao()
+        if dados.nome is not None:
+            # Os usuários em cache trazem o nome antigo do perfil
+            await usuarioService.limpar_cache()
+        eventoService.notificar()
+        await auditoriaService.registrar("perfil", perfil_id, "U", dados.model_dump(exclude_unset=True))
+
+    await escritor.apos_confirmar(propagar)
+    return _to_entity(model)
 
 
 async def remover(db: AsyncSession, perfil_id: int) -> bool:
-    return await perfilRepository.deletar_perfil(db, perfil_id)
+    if await perfilRepository.perfil_em_uso(db, perfil_id):
+        raise RegraNegocioException("O perfil está atribuído a usuários e não pode ser removido.")
+    removido = await perfilRepository.deletar_perfil(db, perfil_id)
+    if removido:
+        async def propagar():
+            perfilRepository.mapa_perfis.marcar_alteracao()
+            eventoService.notificar()
+            await auditoriaService.registrar("perfil", perfil_id, "D")
+
+        await escritor.apos_confirmar(propagar)
+    return removido
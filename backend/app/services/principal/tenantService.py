@@ -0,0 +1,49 @@
+# app/services/principal/tenantService.py
+
+import os
+from datetime import datetime, timezone
+
+from app.database import SessionPadrao, criar_banco_tenant
+from app.repositories.principal import tenantRepository
+from app.utils.cache import AUSENTE, CacheLRU
+from app.utils.fastLog import log
+
+# Por quanto tempo (s) cada worker confia na consulta ao cadastro: um tenant
+# desativado deixa de ser aceito em até TENANT_CADASTRO_TTL segundos
+_cache_tenants = CacheLRU(
+    "cache.tenants",
+    max_itens=1024,
+    ttl=float(os.getenv("TENANT_CADASTRO_TTL", "30")),
+)
+
+
+async def tenant_ativo(tenant: str) -> bool:
+    """
+    Retorna True se o tenant estiver cadastrado e ativo no banco padrão.
+
+    Consultado a cada requisição com tenant; a resposta (positiva ou não)
+    fica em cache por TENANT_CADASTRO_TTL segundos.
+    """
+    ativo = _cache_tenants.obter(tenant)
+    if ativo is AUSENTE:
+        async with SessionPadrao() as db:
+            ativo = await tenantRepository.tenant_ativo(db, tenant)
+        _cache_tenants.definir(tenant, ativo)
+    return ativo
+
+
+async def provisionar(tenant: str) -> None:
+    """
+    Cria o banco do tenant e o cadastra como ativo.
+
+    É o único caminho que cria um banco de tenant: as requisições só
+    abrem bancos de tenants já provisionados.
+
+    Raises:
+        ValueError: Se o id do tenant não tiver um formato aceito.
+    """
+    await criar_banco_tenant(tenant)
+    async with SessionPadrao() as db:
+        await tenantRepository.registrar_tenant(db, tenant, datetime.now(timezone.utc).replace(tzinfo=None))
+    _cache_tenants.invalidar(tenant)
+    log.info(f"Tenant {tenant} provisionado", module="Tenant")
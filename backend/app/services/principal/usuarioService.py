@@ -1,20 +1,61 @@
+import os
 import re
+import json
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.principal.usuario import UsuarioCreate, UsuarioUpdate
-from app.repositories.principal import usuarioRepository
+from app.database import SessionLocal
+from app.schemas.principal.usuario import UsuarioCreate, UsuarioUpdate, UsuarioRead
+from app.schemas.principal.filtro import ConsultaUsuariosRequest
+from app.schemas.shared.response import ResponseModel
+from app.repositories.principal import usuarioRepository, alteracaoRepository, perfilRepository
+from app.repositories.escritor import escritor
+from app.repositories.sugestoes import normalizar
+from app.services.principal import eventoService, auditoriaService
 from app.entities.principal.usuarioEntity import UsuarioEntity
 from app.exceptions.regra_negocio import RegraNegocioException
 from app.auth.security import gerar_hash_senha
 from app.models.principal.usuarioModel import UsuarioModel
+from app.utils.coalescencia import Coalescedor
+from app.utils.negociacao import JSON, MSGPACK, msgpack
+from app.utils.cache import AUSENTE, CacheCompartilhado
+from app.utils import metricas
+from app.utils.fastLog import log
 
 
-def _to_entity(modelo: UsuarioModel
+# Consultas filtradas idênticas e simultâneas compartilham uma única execução;
+# CONSULTA_TTL_MS > 0 reaproveita o resultado por alguns milissegundos após concluir
+_coalescedor_consultas = Coalescedor(
+    "consulta_filtrada.usuarios",
+    ttl=float(os.getenv("CONSULTA_TTL_MS", "0")) / 1000,
+)
+_resposta_lista = TypeAdapter(ResponseModel[list[UsuarioRead]])
+
+# Responde a consulta filtrada pelo snapshot colunar em memória (requer NumPy).
+# Com SNAPSHOT_VERIFICAR=1, executa também o SQL e registra divergências.
+SNAPSHOT_HABILITADO = os.getenv("SNAPSHOT_USUARIOS", "0") == "1"
+SNAPSHOT_VERIFICAR = os.getenv("SNAPSHOT_VERIFICAR", "0") == "1"
+if SNAPSHOT_HABILITADO and not usuarioRepository.snapshot_usuarios.disponivel:
+    log.warning("SNAPSHOT_USUARIOS ativo, mas o NumPy não está instalado; usando o SQL.", module="Snapshot")
+
+# Cache de leitura dos usuários: ("id", id) -> entidade e ("login", login) -> id.
+# Invalidado explicitamente pelas escritas e, entre workers, pela versão compartilhada.
+_cache_usuarios = CacheCompartilhado(
+    "cache.usuarios",
+    max_itens=int(os.getenv("CACHE_USUARIOS_ITENS", "10000")),
+    ttl=float(os.getenv("CACHE_USUARIOS_TTL", "60")),
+    intervalo=float(os.getenv("CACHE_USUARIOS_VERIFICACAO", "1")),
+)
+
+
+def _to_entity(modelo: UsuarioModel,
+               nomes_perfis: dict[int, str]
                ) -> UsuarioEntity:
     """
     Converte o modelo ORM (UsuarioModel) em uma entidade de domínio (UsuarioEntity).
 
     Args:
         modelo (UsuarioModel): Instância do SQLAlchemy com os dados do banco.
+        nomes_perfis (dict[int, str]): Mapa id -> nome dos perfis.
 
     Returns:
         UsuarioEntity: Entidade de domínio contendo todos os dados do usuário.
@@ -23,15 +64,61 @@ def _to_entity(modelo: UsuarioModel
         id=modelo.id,
         nome=modelo.nome,
         login=modelo.login,
-        perfil=modelo.perfil,
+        perfil=nomes_perfis.get(modelo.perfil_id),
         email=modelo.email,
         senha=modelo.senha,
         ativo=modelo.ativo,
-        data_criacao=modelo.data_criacao
+        data_criacao=modelo.data_criacao,
+        versao=modelo.versao
     )
 
+
+async def _to_entities(modelos: list[UsuarioModel]) -> list[UsuarioEntity]:
+    """Converte vários modelos, com os nomes de perfil do mapa em memória."""
+    nomes_perfis = await perfilRepository.mapa_perfis.nomes({m.perfil_id for m in modelos})
+    return [_to_entity(m, nomes_perfis) for m in modelos]
+
+
+async def _id_do_perfil(nome: str) -> int:
+    perfil_id = await perfilRepository.mapa_perfis.id_por_nome(nome)
+    if perfil_id is None:
+        raise RegraNegocioException(f"Perfil '{nome}' não encontrado.")
+    return perfil_id
+
+
+async def _traduzir_perfil(filtros: list) -> list:
+    """
+    Troca os filtros por nome de perfil (`coluna` "perfil") por filtros em
+    `perfil_id`, resolvidos no mapa em memória: viram buscas pelo índice
+    (`=` para um perfil, `in` para vários) no SQL e no snapshot.
+    """
+    traduzidos = []
+    for f in filtros:
+        if isinstance(f, list):
+            traduzidos.append(await _traduzir_perfil(f))
+        elif f.get("coluna") == "perfil":
+            ids = await perfilRepository.mapa_perfis.ids_que_casam(f.get("filtro", "=").lower(), f.get("valor"))
+            traduzidos.append({
+                **f,
+                "coluna": "perfil_id",
+                "valor": ids[0] if len(ids) == 1 else ids,
+                "filtro": "=" if len(ids) == 1 else "in",
+            })
+        else:
+            traduzidos.append(f)
+    return traduzidos
+
+
+def _traduzir_ordenacao(ordenacao: list[str]) -> list[str]:
+    # Ordenar pelo nome do perfil ainda precisa do nome: subconsulta no SQL
+    return [
+        "perfil_nome" + item.strip()[len("perfil"):] if item.split()[:1] == ["perfil"] else item
+        for item in ordenacao
+    ]
+
 async def criar(db: AsyncSession, 
-                        dados: UsuarioCreate
+                        dados: UsuarioCreate,
+                        senha_hash: str | None = None
                         ) -> UsuarioEntity:
     """
     Cria um novo usuário no banco de dados.
@@ -39,6 +126,8 @@ async def criar(db: AsyncSession,
     Parâmetros:
         db (AsyncSession): Sessão assíncrona do banco de dados.
         dados (UsuarioCreate): Dados validados do novo usuário.
+        senha_hash (str | None): Hash de `dados.senha` já calculado (o lote o
+            calcula antes de abrir a transação); None para calcular aqui.
 
     Retorna:
         UsuarioEntity: Entidade de domínio representando o usuário criado.
@@ -48,11 +137,23 @@ async def criar(db: AsyncSession,
     if not re.match(r"^[a-zA-Z0-9]{3,}\.[a-zA-Z0-9]{3,}$", dados.login):
         raise RegraNegocioException("O login deve conter um ponto e pelo menos 6 caracteres.")
     
+    perfil_id = await _id_do_perfil(dados.perfil)
+
     # Gerar hash da senha antes de persistir
-    dados.senha = gerar_hash_senha(dados.senha)
+    dados.senha = senha_hash or gerar_hash_senha(dados.senha)
     
-    UsuarioModel = await usuarioRepository.criar_usuario(db, dados)
-    return _to_entity(UsuarioModel)
+    # Gravado pelo escritor agrupado, junto com as escritas concorrentes
+    UsuarioModel = await escritor.executar(lambda sessao: usuarioRepository.criar_usuario(sessao, dados, perfil_id))
+
+    async def propagar():
+        _cache_usuarios.invalidar(("id", UsuarioModel.id), ("login", UsuarioModel.login))
+        eventoService.notificar()
+        usuarioRepository.snapshot_usuarios.marcar_alteracao()
+        usuarioRepository.indice_sugestoes.gravar(UsuarioModel)
+        await auditoriaService.registrar("usuario", UsuarioModel.id, "I", dados.model_dump())
+
+    await escritor.apos_confirmar(propagar)
+    return _to_entity(UsuarioModel, {perfil_id: dados.perfil})
 
 
 async def buscar_pela_id(db: AsyncSession, 
@@ -67,8 +168,105 @@ async def buscar_pela_id(db: AsyncSession,
     Retorna:
         UsuarioEntity | None: Entidade do usuário ou None se não encontrado.
     """
-    model = await usuarioRepository.buscar_usuario_por_id(db, usuario_id)
-    return _to_entity(model) if model else None
+    await _cache_usuarios.validar()
+    entidade = _cache_usuarios.obter(("id", usuario_id))
+    if entidade is not AUSENTE:
+        return entidade
+
+    # Uma escrita que invalide o cache durante a carga impede que ela seja guardada
+    geracao = _cache_usuarios.geracao()
+    model = await usuarioRepository.carregar_usuario_por_id(usuario_id)
+    if not model:
+        return None
+    entidade, = await _to_entities([model])
+    _cache_usuarios.definir(("id", entidade.id), entidade, geracao)
+    return entidade
+
+
+async def buscar_por_login(db: AsyncSession,
+                           login: str) -> UsuarioEntity | None:
+    """
+    Busca um usuário pelo login, passando pelo cache de leitura.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        login (str): Login do usuário.
+
+    Retorna:
+        UsuarioEntity | None: Entidade do usuário ou None se não encontrado.
+    """
+    await _cache_usuarios.validar()
+    usuario_id = _cache_usuarios.obter(("login", login))
+    if usuario_id is not AUSENTE:
+        entidade = _cache_usuarios.obter(("id", usuario_id))
+        # O login pode ter mudado desde que o mapeamento foi guardado
+        if entidade is not AUSENTE and entidade.login == login:
+            return entidade
+
+    geracao = _cache_usuarios.geracao()
+    model = await usuarioRepository.buscar_usuario_por_login(db, login)
+    if not model:
+        return None
+    entidade, = await _to_entities([model])
+    _cache_usuarios.definir(("id", entidade.id), entidade, geracao)
+    _cache_usuarios.definir(("login", entidade.login), entidade.id, geracao)
+    return entidade
+
+
+async def buscar_por_ids(db: AsyncSession,
+                         ids: list[int]) -> list[UsuarioEntity]:
+    """
+    Busca vários usuários pelos IDs em uma única consulta.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        ids (list[int]): Identificadores dos usuários.
+
+    Retorna:
+        list[UsuarioEntity]: Usuários encontrados, na ordem dos ids informados.
+    """
+    usuarios_model = await usuarioRepository.carregar_usuarios_por_ids(ids)
+    return await _to_entities(usuarios_model)
+
+
+async def sugerir(termo: str, limite: int) -> list[UsuarioEntity]:
+    """
+    Sugestões para o autocompletar: usuários cujo nome, login ou email
+    começa pelo termo, sem distinção de acentos e maiúsculas.
+
+    Os ids vêm do índice em memória; os registros, do carregador em lote,
+    e são conferidos contra o termo completo (o índice guarda só o início
+    de cada valor e pode estar até SUGESTOES_DEFASAGEM segundos atrás das
+    escritas de outros workers). Enquanto faltarem sugestões, as páginas
+    seguintes do índice são lidas, até o fim das entradas com o prefixo.
+
+    Parâmetros:
+        termo (str): Início digitado pelo usuário.
+        limite (int): Quantidade máxima de sugestões.
+
+    Retorna:
+        list[UsuarioEntity]: Usuários em ordem alfabética do valor encontrado.
+    """
+    prefixo = normalizar(termo, None)
+    if not prefixo:
+        return []
+    pagina = limite * 2
+    encontrados: list[UsuarioModel] = []
+    vistos: set[int] = set()
+    deslocamento = 0
+    while len(encontrados) < limite:
+        ids = await usuarioRepository.sugerir_ids(termo, pagina, deslocamento)
+        deslocamento += len(ids)
+        # Entre uma página e outra o índice pode ter mudado: ignora repetidos
+        novos = [i for i in ids if i not in vistos]
+        vistos.update(novos)
+        for modelo in await usuarioRepository.carregar_usuarios_por_ids(novos):
+            if any(normalizar(v, None).startswith(prefixo) for v in (modelo.nome, modelo.login, modelo.email)):
+                encontrados.append(modelo)
+        if len(ids) < pagina:
+            # Fim das entradas com o prefixo
+            break
+    return await _to_entities(encontrados[:limite])
 
 
 async def listar(db: AsyncSession
@@ -83,7 +281,7 @@ async def listar(db: AsyncSession
         list[UsuarioEntity]: Lista de entidades de usuários.
     """
     usuarios_model = await usuarioRepository.listar_usuarios(db)
-    return [_to_entity(usuario) for usuario in usuarios_model]
+    return await _to_entities(usuarios_model)
 
 
 async def buscar_com_filtros(db: AsyncSession, 
@@ -91,6 +289,7 @@ async def buscar_com_filtros(db: AsyncSession,
                                       ordenacao: list[str] | None = None,
                                       colunas: list[str] | None = None,
                                       limite: int = 25,
+                                      incluir_arquivados: bool = False,
                                       ) -> list[UsuarioEntity]:
     """
     Busca usuários com filtros padronizados.
@@ -98,17 +297,126 @@ async def buscar_com_filtros(db: AsyncSession,
     Parâmetros:
         db (AsyncSession): Sessão assíncrona do banco de dados.
         usuario_id (int): Identificador do usuário.
+        incluir_arquivados (bool): Busca também entre os usuários arquivados.
 
     Retorna:
         UsuarioEntity | None: Entidade do usuário ou None se não encontrado.
     """
-    usuarios_model = await usuarioRepository.buscar_usuarios_com_filtros(db, filtros, ordenacao, colunas, limite)
-    return [_to_entity(usuario) for usuario in usuarios_model]
+    if filtros:
+        filtros = await _traduzir_perfil(filtros)
+    if ordenacao:
+        ordenacao = _traduzir_ordenacao(ordenacao)
+    if colunas:
+        colunas = ["perfil_id" if c == "perfil" else c for c in colunas]
+    usuarios_model = await usuarioRepository.buscar_usuarios_com_filtros(
+        db, filtros, ordenacao, colunas, limite, incluir_arquivados
+    )
+    return await _to_entities(usuarios_model)
+
+
+def _filtros_para_dict(filtros: list) -> list:
+    """Converte os `Filtro` (inclusive em sublistas) para os dicionários esperados pelo repositório."""
+    return [_filtros_para_dict(f) if isinstance(f, list) else f.model_dump() for f in filtros]
+
+
+async def consulta_filtrada_serializada(dados: ConsultaUsuariosRequest, formato: str = JSON) -> bytes:
+    """
+    Executa a consulta filtrada e devolve a resposta já serializada no
+    formato pedido (JSON ou MessagePack).
+
+    Requisições concorrentes com o mesmo corpo (normalizado) aguardam a mesma
+    consulta e recebem os mesmos bytes, sem repetir a consulta nem a
+    serialização. A execução usa uma sessão própria, independente da
+    requisição que a disparou.
+
+    Parâmetros:
+        dados (ConsultaUsuariosRequest): Filtros, ordenação, colunas, limite e
+            se inclui os arquivados (o snapshot tem só os ativos).
+        formato (str): `negociacao.JSON` ou `negociacao.MSGPACK`.
+
+    Retorna:
+        bytes: `ResponseModel[list[UsuarioRead]]` serializado no formato pedido.
+    """
+    # O formato entra na chave: cada um tem seus próprios bytes compartilhados
+    chave = formato + json.dumps(dados.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+
+    def serializar(usuarios: list[UsuarioEntity]) -> bytes:
+        resposta = _resposta_lista.validate_python(
+            {"status": "success", "mensagem": None, "dados": usuarios},
+            from_attributes=True,
+        )
+        if formato == MSGPACK:
+            return msgpack.packb(_resposta_lista.dump_python(resposta, mode="json"))
+        return _resposta_lista.dump_json(resposta)
+
+    async def executar() -> bytes:
+        filtros = _filtros_para_dict(dados.filtros) if dados.filtros else None
+        em_memoria = None
+        if SNAPSHOT_HABILITADO and not dados.incluir_arquivados:
+            modelos = await usuarioRepository.buscar_usuarios_com_filtros_em_memoria(
+                await _traduzir_perfil(filtros) if filtros else None,
+                _traduzir_ordenacao(dados.ordenacao) if dados.ordenacao else None,
+                dados.colunas, dados.limite
+            )
+            if modelos is not None:
+                em_memoria = serializar(await _to_entities(modelos))
+                if not SNAPSHOT_VERIFICAR:
+                    return em_memoria
+
+        async with SessionLocal() as db:
+            usuarios = await buscar_com_filtros(
+                db, filtros, dados.ordenacao, dados.colunas, dados.limite, dados.incluir_arquivados
+            )
+        resultado = serializar(usuarios)
+        if em_memoria is not None and em_memoria != resultado:
+            metricas.incrementar("snapshot.usuario.divergencias")
+            log.error(f"Snapshot divergiu do SQL para a consulta {chave}", module="Snapshot")
+        return resultado
+
+    return await _coalescedor_consultas.executar(chave, executar)
+
+
+async def listar_alteracoes(db: AsyncSession,
+                            desde: int,
+                            limite: int = 1000) -> dict:
+    """
+    Retorna os usuários inseridos, atualizados ou removidos após o cursor.
+
+    Várias alterações do mesmo usuário no lote são reduzidas à última: se
+    foi removido, entra em `removidos`; senão, seu estado atual em `alterados`.
+
+    Parâmetros:
+        db (AsyncSession): Sessão assíncrona do banco de dados.
+        desde (int): Cursor (`seq`) da última sincronização; 0 para o início.
+        limite (int): Máximo de alterações lidas do log neste lote.
+
+    Retorna:
+        dict: {"cursor", "mais", "alterados", "removidos"}.
+    """
+    alteracoes = await alteracaoRepository.listar_alteracoes_desde(db, "usuario", desde, limite)
+
+    ultima_operacao: dict[int, str] = {}
+    for alteracao in alteracoes:
+        ultima_operacao[alteracao.registro_id] = alteracao.operacao
+
+    removidos = [i for i, op in ultima_operacao.items() if op == alteracaoRepository.REMOCAO]
+    ids_alterados = [i for i, op in ultima_operacao.items() if op != alteracaoRepository.REMOCAO]
+    modelos = {m.id: m for m in await usuarioRepository.buscar_usuarios_por_ids(db, ids_alterados)}
+    # Removido depois do fim deste lote: a remoção virá no próximo
+    alterados = await _to_entities([modelos[i] for i in ids_alterados if i in modelos])
+
+    return {
+        "cursor": alteracoes[-1].seq if alteracoes else desde,
+        "mais": len(alteracoes) == limite,
+        "alterados": alterados,
+        "removidos": removidos,
+    }
 
 
 async def atualizar(db: AsyncSession, 
                             usuario_id: int, 
-                            dados: UsuarioUpdate) -> UsuarioEntity | None:
+                            dados: UsuarioUpdate,
+                            versao_esperada: int | None = None) -> UsuarioEntity | None:
     """
     Atualiza os dados de um usuário existente.
 
@@ -116,12 +424,32 @@ async def atualizar(db: AsyncSession,
         db (AsyncSession): Sessão assíncrona do banco de dados.
         usuario_id (int): ID do usuário a ser atualizado.
         dados (UsuarioUpdate): Dados atualizados validados.
+        versao_esperada (int | None): Versão lida pelo cliente (If-Match).
 
     Retorna:
         UsuarioEntity | None: Entidade atualizada ou None se não encontrado.
+
+    Levanta:
+        ConflitoVersaoException: Se o usuário foi alterado desde `versao_esperada`.
     """
-    usuarioModelo = await usuarioRepository.atualizar_usuario(db, usuario_id, dados)
-    return _to_entity(usuarioModelo) if usuarioModelo else None
+    perfil_id = await _id_do_perfil(dados.perfil) if dados.perfil is not None else None
+    usuarioModelo = await escritor.executar(
+        lambda sessao: usuarioRepository.atualizar_usuario(sessao, usuario_id, dados, versao_esperada, perfil_id)
+    )
+    if not usuarioModelo:
+        return None
+
+    async def propagar():
+        _cache_usuarios.invalidar(("id", usuario_id))
+        await _cache_usuarios.publicar_invalidacao()
+        eventoService.notificar()
+        usuarioRepository.snapshot_usuarios.marcar_alteracao()
+        usuarioRepository.indice_sugestoes.gravar(usuarioModelo)
+        await auditoriaService.registrar("usuario", usuario_id, "U", dados.model_dump(exclude_unset=True))
+
+    await escritor.apos_confirmar(propagar)
+    entidade, = await _to_entities([usuarioModelo])
+    return entidade
 
 
 async def remover(db: AsyncSession, usuario_id: int) -> bool:
@@ -135,4 +463,24 @@ async def remover(db: AsyncSession, usuario_id: int) -> bool:
     Retorna:
         bool: True se removido com sucesso, False caso contrário.
     """
-    return await usuarioRepository.deletar_usuario(db, usuario_id)
+    removido = await usuarioRepository.deletar_usuario(db, usuario_id)
+    if removido:
+        async def propagar():
+            _cache_usuarios.invalidar(("id", usuario_id))
+            await _cache_usuarios.publicar_invalidacao()
+            eventoService.notificar()
+            usuarioRepository.snapshot_usuarios.marcar_alteracao()
+            usuarioRepository.indice_sugestoes.remover(usuario_id)
+            await auditoriaService.registrar("usuario", usuario_id, "D")
+
+        await escritor.apos_confirmar(propagar)
+    return removido
+
+
+async def limpar_cache() -> None:
+    """
+    Esvazia o cache de usuários em todos os workers (ex.: um perfil mudou
+    de nome e as entidades em cache trazem o nome antigo).
+    """
+    _cache_usuarios.limpar()
+    await _cache_usuarios.publicar_invalidacao()
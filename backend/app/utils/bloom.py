@@ -0,0 +1,44 @@
+# app/utils/bloom.py
+
+import math
+import hashlib
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre um bytearray.
+
+    Responde "com certeza não contém" ou "talvez contenha"; nunca gera falso
+    negativo. As k posições de cada item saem de um único hash blake2b de 128
+    bits, dividido em duas metades combinadas por double hashing.
+    """
+
+    def __init__(self, capacidade: int, taxa_falso_positivo: float = 0.001):
+        capacidade = max(1, capacidade)
+        bits = math.ceil(-capacidade * math.log(taxa_falso_positivo) / (math.log(2) ** 2))
+        self.capacidade = capacidade
+        self.total_bits = max(8, bits)
+        self.hashes = max(1, round(self.total_bits / capacidade * math.log(2)))
+        self.quantidade = 0
+        self._bits = bytearray((self.total_bits + 7) // 8)
+
+    def _posicoes(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.total_bits
+
+    def adicionar(self, item: str) -> None:
+        for pos in self._posicoes(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.quantidade += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posicoes(item))
+
+    @property
+    def saturado(self) -> bool:
+        """True quando já recebeu mais itens do que a capacidade dimensionada."""
+        return self.quantidade > self.capacidade
@@ -0,0 +1,107 @@
+# app/utils/cache.py
+
+import time
+from collections import OrderedDict
+from typing import Any
+
+from app.database import SessionPadrao, tenant_atual
+from app.repositories.principal import cacheVersaoRepository
+from app.utils import metricas
+
+# Valor retornado por `obter` quando a chave não está no cache
+AUSENTE = object()
+
+
+class CacheLRU:
+    """
+    Cache em memória limitado por quantidade de itens (LRU) e por tempo (TTL).
+
+    As chaves são separadas por tenant (o da requisição atual), então a mesma
+    chave em tenants diferentes aponta para itens diferentes.
+
+    Quem carrega um valor para guardá-lo pega antes a `geracao()` e a
+    repassa a `definir`: se houve uma invalidação enquanto o valor era lido
+    do banco, ele pode estar desatualizado e não é guardado.
+
+    Métricas (prefixo `nome`): contadores `.acertos`, `.faltas` e `.descartados`.
+    """
+
+    def __init__(self, nome: str, max_itens: int, ttl: float):
+        self.nome = nome
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        # Incrementada a cada invalidação ou limpeza
+        self._geracao = 0
+
+    def obter(self, chave: Any) -> Any:
+        """Retorna o valor da chave, ou `AUSENTE` se não existir ou tiver expirado."""
+        chave = (tenant_atual.get(), chave)
+        item = self._itens.get(chave)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                del self._itens[chave]
+            metricas.incrementar(f"{self.nome}.faltas")
+            return AUSENTE
+        self._itens.move_to_end(chave)
+        metricas.incrementar(f"{self.nome}.acertos")
+        return item[1]
+
+    def geracao(self) -> int:
+        """Marca a ser obtida antes de carregar um valor e repassada a `definir`."""
+        return self._geracao
+
+    def definir(self, chave: Any, valor: Any, geracao: int | None = None) -> None:
+        if geracao is not None and geracao != self._geracao:
+            # Invalidado durante a carga: o valor pode ser anterior à escrita
+            metricas.incrementar(f"{self.nome}.descartados")
+            return
+        chave = (tenant_atual.get(), chave)
+        self._itens[chave] = (time.monotonic() + self.ttl, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def invalidar(self, *chaves: Any) -> None:
+        self._geracao += 1
+        tenant = tenant_atual.get()
+        for chave in chaves:
+            self._itens.pop((tenant, chave), None)
+
+    def limpar(self) -> None:
+        self._geracao += 1
+        self._itens.clear()
+
+
+class CacheCompartilhado(CacheLRU):
+    """
+    CacheLRU local a cada worker, invalidado entre workers por uma versão
+    compartilhada na tabela `cache_versao`.
+
+    Quem altera os dados chama `publicar_invalidacao`, que incrementa a versão.
+    Antes de ler, `validar` compara a versão do banco com a conhecida (no
+    máximo uma vez a cada `intervalo` segundos) e limpa o cache se mudou.
+    A defasagem máxima entre workers é, portanto, `intervalo`. A versão fica
+    no banco padrão e vale para todos os tenants.
+    """
+
+    def __init__(self, nome: str, max_itens: int, ttl: float, intervalo: float):
+        super().__init__(nome, max_itens, ttl)
+        self.intervalo = intervalo
+        self._versao: int | None = None
+        self._proxima_verificacao = 0.0
+
+    async def validar(self) -> None:
+        agora = time.monotonic()
+        if agora < self._proxima_verificacao:
+            return
+        self._proxima_verificacao = agora + self.intervalo
+        async with SessionPadrao() as db:
+            versao = await cacheVersaoRepository.obter_versao(db, self.nome)
+        if versao != self._versao:
+            self.limpar()
+            self._versao = versao
+
+    async def publicar_invalidacao(self) -> None:
+        async with SessionPadrao() as db:
+            await cacheVersaoRepository.incrementar_versao(db, self.nome)
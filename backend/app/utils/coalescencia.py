@@ -0,0 +1,118 @@
+# app/utils/coalescencia.py
+
+import time
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.database import OrcamentoConsulta, orcamento_consulta, tenant_atual
+from app.utils import metricas
+
+
+class _Participantes:
+    """
+    Chamadores de uma execução compartilhada. A execução roda com um
+    orçamento de consulta próprio (o prazo de quem a disparou), cancelado
+    só quando todos os chamadores com orçamento tiverem desconectado.
+    """
+
+    def __init__(self, orcamento: OrcamentoConsulta | None):
+        self.orcamento = orcamento.desvinculado() if orcamento is not None else None
+        self._ativos = 0
+
+    def entrar(self, orcamento: OrcamentoConsulta | None) -> None:
+        if self.orcamento is None:
+            return
+        self._ativos += 1
+        if orcamento is not None:
+            orcamento.ao_cancelar(self._sair)
+
+    def _sair(self) -> None:
+        self._ativos -= 1
+        if self._ativos == 0:
+            self.orcamento.cancelar()
+
+
+async def _com_orcamento(orcamento: OrcamentoConsulta | None, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+    orcamento_consulta.set(orcamento)
+    return await fabrica()
+
+
+class Coalescedor:
+    """
+    Single-flight: chamadas concorrentes com a mesma chave aguardam uma única
+    execução em andamento e recebem o mesmo resultado (ou a mesma exceção).
+
+    A execução roda em uma task própria, protegida por `asyncio.shield`: se o
+    primeiro chamador for cancelado (cliente desconectou), os demais seguem
+    aguardando normalmente; as consultas dela só são interrompidas quando
+    todos os chamadores tiverem desconectado. Opcionalmente, o resultado é
+    reaproveitado por `ttl` segundos após a conclusão. Chamadas de tenants
+    diferentes nunca são combinadas.
+
+    Métricas (prefixo `nome`): `.total`, `.compartilhadas` e o medidor `.taxa`
+    (fração das chamadas atendidas sem executar a consulta).
+    """
+
+    def __init__(self, nome: str, ttl: float = 0.0):
+        self.nome = nome
+        self.ttl = ttl
+        self._em_andamento: dict[str, asyncio.Future] = {}
+        self._participantes: dict[str, _Participantes] = {}
+        self._concluidos: dict[str, tuple[float, Any]] = {}
+        self._total = 0
+        self._compartilhadas = 0
+
+    def _contar(self, compartilhada: bool) -> None:
+        self._total += 1
+        metricas.incrementar(f"{self.nome}.total")
+        if compartilhada:
+            self._compartilhadas += 1
+            metricas.incrementar(f"{self.nome}.compartilhadas")
+        metricas.definir(f"{self.nome}.taxa", self._compartilhadas / self._total)
+
+    async def executar(self, chave: str, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Executa `fabrica()` para a chave, ou se junta à execução já em andamento.
+
+        Args:
+            chave (str): Chave normalizada que identifica chamadas equivalentes.
+            fabrica (Callable): Função sem argumentos que retorna o awaitable a executar.
+
+        Returns:
+            Any: Resultado da execução compartilhada.
+        """
+        chave = f"{tenant_atual.get() or ''}:{chave}"
+        if self.ttl:
+            concluido = self._concluidos.get(chave)
+            if concluido and concluido[0] > time.monotonic():
+                self._contar(compartilhada=True)
+                return concluido[1]
+
+        orcamento = orcamento_consulta.get()
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is not None:
+            self._contar(compartilhada=True)
+            self._participantes[chave].entrar(orcamento)
+            return await asyncio.shield(tarefa)
+
+        self._contar(compartilhada=False)
+        participantes = _Participantes(orcamento)
+        participantes.entrar(orcamento)
+        tarefa = asyncio.ensure_future(_com_orcamento(participantes.orcamento, fabrica))
+        self._em_andamento[chave] = tarefa
+        self._participantes[chave] = participantes
+        tarefa.add_done_callback(lambda t: self._concluir(chave, t))
+        return await asyncio.shield(tarefa)
+
+    def _concluir(self, chave: str, tarefa: asyncio.Future) -> None:
+        self._em_andamento.pop(chave, None)
+        self._participantes.pop(chave, None)
+        if tarefa.cancelled() or tarefa.exception() is not None:
+            return
+        if self.ttl:
+            agora = time.monotonic()
+            # Descarta os expirados antes de guardar o novo resultado
+            for k in [k for k, (expira, _) in self._concluidos.items() if expira <= agora]:
+                del self._concluidos[k]
+            self._concluidos[chave] = (agora + self.ttl, tarefa.result())
@@ -0,0 +1,29 @@
+# app/utils/etag.py
+
+from fastapi import Header, HTTPException
+
+
+def gerar_etag(versao: int) -> str:
+    """ETag fraco que representa a versão do registro, ex.: W/"3"."""
+    return f'W/"{versao}"'
+
+
+def versao_if_match(if_match: str | None = Header(None)) -> int | None:
+    """
+    Dependência: lê a versão esperada do cabeçalho `If-Match`.
+
+    Aceita o ETag devolvido pela API (`W/"3"` ou `"3"`). Sem o cabeçalho, ou
+    com `*`, retorna None e a atualização não confere a versão.
+
+    Raises:
+        HTTPException: 400 se o cabeçalho não contiver uma versão válida.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    valor = if_match.strip()
+    if valor.startswith("W/"):
+        valor = valor[2:]
+    valor = valor.strip('"')
+    if not valor.isdigit():
+        raise HTTPException(status_code=400, detail="Cabeçalho If-Match inválido.")
+    return int(valor)
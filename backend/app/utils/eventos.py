@@ -0,0 +1,76 @@
+# app/utils/eventos.py
+
+import asyncio
+
+from app.utils import metricas
+
+
+class Assinatura:
+    """Fila de eventos de um assinante de um tenant, opcionalmente filtrada por entidade."""
+
+    def __init__(self, entidades: set[str] | None, tamanho_fila: int, tenant: str | None = None):
+        self.entidades = entidades
+        self.tenant = tenant
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=tamanho_fila)
+        self.encerrada = False
+
+    def aceita(self, evento: dict) -> bool:
+        if evento.get("tenant") != self.tenant:
+            return False
+        return self.entidades is None or evento["entidade"] in self.entidades
+
+    async def proximo(self, timeout: float) -> dict | None:
+        """
+        Aguarda o próximo evento por até `timeout` segundos.
+
+        Returns:
+            dict | None: O evento, ou None no timeout ou se a assinatura foi encerrada.
+        """
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Difusor:
+    """
+    Fan-out em processo: entrega cada evento publicado às assinaturas que o
+    aceitam, cada uma com sua fila limitada. Publicar nunca bloqueia: o
+    assinante cuja fila enche é considerado lento e é desconectado.
+    """
+
+    def __init__(self, tamanho_fila: int = 100):
+        self.tamanho_fila = tamanho_fila
+        self._assinaturas: set[Assinatura] = set()
+
+    def assinar(self, entidades: set[str] | None = None, tenant: str | None = None) -> Assinatura:
+        assinatura = Assinatura(entidades, self.tamanho_fila, tenant)
+        self._assinaturas.add(assinatura)
+        metricas.definir("eventos.assinantes", len(self._assinaturas))
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura) -> None:
+        self._assinaturas.discard(assinatura)
+        metricas.definir("eventos.assinantes", len(self._assinaturas))
+
+    def tenants(self) -> set[str | None]:
+        """Tenants com ao menos uma assinatura ativa."""
+        return {a.tenant for a in self._assinaturas}
+
+    def publicar(self, evento: dict) -> None:
+        for assinatura in list(self._assinaturas):
+            if not assinatura.aceita(evento):
+                continue
+            try:
+                assinatura.fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                self._desconectar_lento(assinatura)
+
+    def _desconectar_lento(self, assinatura: Assinatura) -> None:
+        assinatura.encerrada = True
+        self.cancelar(assinatura)
+        # Esvazia a fila para que o consumidor acorde e perceba o encerramento
+        while not assinatura.fila.empty():
+            assinatura.fila.get_nowait()
+        assinatura.fila.put_nowait(None)
+        metricas.incrementar("eventos.assinantes_descartados")
@@ -4,12 +4,18 @@ import os
 import sys
 import logging
 from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import TimedRotatingFileHandler, WatchedFileHandler
 
 import structlog
 from structlog.stdlib import ProcessorFormatter
 from structlog.processors import JSONRenderer, TimeStamper
 
+# Pasta onde ficam os arquivos de log (e demais artefatos de diagnóstico)
+LOG_DIR = "logs"
+
+# PID do processo que executou a última configuração de logging
+_pid_configurado: int | None = None
+
 
 def console_renderer(_logger, _name, event_dict):
     """
@@ -24,7 +30,7 @@ def console_renderer(_logger, _name, event_dict):
 
 
 def setup_logging(
-    log_dir: str = "logs",
+    log_dir: str = LOG_DIR,
     log_name: str = "app",
     log_level: int = logging.INFO,
 ):
@@ -59,12 +65,19 @@ def setup_logging(
         processor=JSONRenderer(indent=None, sort_keys=False, ensure_ascii=False),
         foreign_pre_chain=pre_chain,
     )
-    fh = TimedRotatingFileHandler(
-        filename=os.path.join(log_dir, f"{log_name}.log"),
-        when="midnight",
-        backupCount=30,
-        encoding="utf-8",
-    )
+    arquivo = os.path.join(log_dir, f"{log_name}.log")
+    if int(os.getenv("APP_WORKERS", "1")) > 1:
+        # Com vários workers, cada processo rotacionaria o mesmo arquivo por
+        # conta própria. Todos apenas acrescentam linhas e a rotação fica a
+        # cargo de ferramenta externa (logrotate); o handler reabre o arquivo.
+        fh = WatchedFileHandler(filename=arquivo, encoding="utf-8")
+    else:
+        fh = TimedRotatingFileHandler(
+            filename=arquivo,
+            when="midnight",
+            backupCount=30,
+            encoding="utf-8",
+        )
     fh.setLevel(log_level)
     fh.setFormatter(json_fmt)
     root.addHandler(fh)
@@ -107,6 +120,21 @@ def setup_logging(
         ],
     )
 
+    global _pid_configurado
+    _pid_configurado = os.getpid()
+
+
+def inicializar_processo():
+    """
+    Reconfigura o logging se o processo atual não for o que o configurou.
+
+    Em servidores que fazem fork após importar a aplicação, o filho herda
+    handlers com descritores de arquivo do pai; deve ser chamado no startup
+    de cada worker.
+    """
+    if _pid_configurado != os.getpid():
+        setup_logging()
+
 
 # Executa a configuração ao importar
 setup_logging()
@@ -0,0 +1,66 @@
+# app/utils/metricas.py
+
+import threading
+
+
+class _Resumo:
+    __slots__ = ("quantidade", "soma", "maximo")
+
+    def __init__(self):
+        self.quantidade = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+
+_contadores: dict[str, int] = {}
+_medidores: dict[str, float] = {}
+_resumos: dict[str, _Resumo] = {}
+# Eventos de pool do SQLAlchemy podem vir de outras threads
+_lock = threading.Lock()
+
+
+def incrementar(nome: str, valor: int = 1) -> None:
+    """Soma `valor` ao contador `nome`."""
+    with _lock:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+
+def definir(nome: str, valor: float) -> None:
+    """Define o valor atual do medidor `nome` (ex.: uma taxa ou um tamanho)."""
+    with _lock:
+        _medidores[nome] = valor
+
+
+def observar(nome: str, valor: float) -> None:
+    """Registra uma observação (ex.: duração em ms) no resumo `nome`."""
+    with _lock:
+        resumo = _resumos.get(nome)
+        if resumo is None:
+            resumo = _resumos[nome] = _Resumo()
+        resumo.quantidade += 1
+        resumo.soma += valor
+        if valor > resumo.maximo:
+            resumo.maximo = valor
+
+
+def consultar() -> dict:
+    """
+    Retorna um retrato das métricas do worker atual.
+
+    Returns:
+        dict: {"contadores": {nome: valor}, "medidores": {nome: valor},
+            "resumos": {nome: {quantidade, media, maximo}}}
+    """
+    with _lock:
+        return {
+            "contadores": dict(_contadores),
+            "medidores": dict(_medidores),
+            "resumos": {
+                nome: {
+                    "quantidade": r.quantidade,
+                    "media": r.soma / r.quantidade if r.quantidade else 0.0,
+                    "maximo": r.maximo,
+                }
+                for nome, r in _resumos.items()
+            },
+        }
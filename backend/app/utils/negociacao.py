@@ -0,0 +1,128 @@
+# app/utils/negociacao.py
+
+from collections.abc import Callable, Coroutine
+from contextvars import ContextVar
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import msgpack
+except ImportError:  # dependência opcional: sem ela, as respostas são sempre JSON
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# Tipos aceitos para MessagePack (o `x-` ainda é o mais usado pelos clientes)
+_TIPOS_MSGPACK = {MSGPACK, "application/x-msgpack"}
+# Faixas do Accept que o JSON atende
+_TIPOS_JSON = {JSON, "application/*", "*/*"}
+
+# Formato da resposta da requisição atual, definido pela RotaNegociada
+formato_resposta: ContextVar[str] = ContextVar("formato_resposta", default=JSON)
+
+
+def formato_aceito(accept: str | None) -> str:
+    """
+    Escolhe entre JSON e MessagePack pelo cabeçalho `Accept`: vence o de
+    maior `q`; no empate, o que aparece primeiro. Sem o cabeçalho, sem
+    menção a MessagePack ou sem a biblioteca instalada, JSON.
+    """
+    if not accept or msgpack is None:
+        return JSON
+    melhor, melhor_q = JSON, 0.0
+    for item in accept.split(","):
+        tipo, *parametros = (parte.strip() for parte in item.split(";"))
+        tipo = tipo.lower()
+        q = 1.0
+        for parametro in parametros:
+            nome, _, valor = parametro.partition("=")
+            if nome.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if tipo in _TIPOS_MSGPACK:
+            formato = MSGPACK
+        elif tipo in _TIPOS_JSON:
+            formato = JSON
+        else:
+            continue
+        if q > melhor_q:
+            melhor, melhor_q = formato, q
+    return melhor
+
+
+def _corpo_msgpack(request: Request) -> bool:
+    tipo = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return tipo in _TIPOS_MSGPACK
+
+
+class _RequisicaoMsgpack(Request):
+    """Requisição com corpo MessagePack que o FastAPI lê como se fosse JSON."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body())
+        return self._json
+
+
+def _como_json(request: Request) -> Request:
+    cabecalhos = [(k, v) for k, v in request.scope["headers"] if k != b"content-type"]
+    cabecalhos.append((b"content-type", JSON.encode()))
+    return _RequisicaoMsgpack({**request.scope, "headers": cabecalhos}, request.receive)
+
+
+class RespostaNegociada(JSONResponse):
+    """
+    JSONResponse que, quando a requisição pediu MessagePack, codifica o mesmo
+    conteúdo (já convertido pelo FastAPI para tipos JSON) com `msgpack`.
+    """
+
+    def __init__(self, content: Any, *args, **kwargs):
+        self._msgpack = formato_resposta.get() == MSGPACK
+        if self._msgpack:
+            self.media_type = MSGPACK
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self._msgpack:
+            return msgpack.packb(content)
+        return super().render(content)
+
+
+class RotaNegociada(APIRoute):
+    """
+    Rota com negociação de formato: `Accept: application/msgpack` troca o
+    corpo da resposta por MessagePack (a mesma estrutura de `ResponseModel`)
+    e `Content-Type: application/msgpack` é aceito nos corpos de requisição.
+
+    Uso: `APIRouter(..., route_class=RotaNegociada)`. Rotas que devolvem uma
+    `Response` pronta consultam `formato_resposta` para escolher o formato.
+    Respostas de erro dos handlers globais continuam em JSON.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        if isinstance(self.response_class, DefaultPlaceholder):
+            self.response_class = RespostaNegociada
+        original = super().get_route_handler()
+
+        async def handler(request: Request) -> Response:
+            if _corpo_msgpack(request):
+                if msgpack is None:
+                    raise HTTPException(status_code=415, detail="MessagePack não suportado neste servidor.")
+                request = _como_json(request)
+            token = formato_resposta.set(formato_aceito(request.headers.get("accept")))
+            try:
+                resposta = await original(request)
+            finally:
+                formato_resposta.reset(token)
+            resposta.headers.add_vary_header("Accept")
+            return resposta
+
+        return handler
@@ -0,0 +1,123 @@
+# bench_escritor.py
+"""
+Mede a vazão de escritas concorrentes no SQLite com e sem o escritor
+agrupado (group commit): cada tarefa cria um usuário e atualiza outro, como
+`criar_usuario` e `atualizar_usuario` fariam, sem o bcrypt (o hash é
+calculado uma vez só).
+
+- individual: cada operação abre a sua sessão e faz o seu COMMIT (um fsync
+  e uma disputa pelo lock de escrita por requisição);
+- agrupado: as operações passam por `escritor.executar`.
+
+O banco é criado em um diretório temporário dentro de `diretorio` (padrão:
+o atual), então a medida reflete o fsync do disco onde ele está.
+
+Uso: python bench_escritor.py [operações] [concorrência] [diretorio]
+"""
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+
+OPERACOES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CONCORRENCIA = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+DIRETORIO = tempfile.mkdtemp(prefix="bench_escritor_", dir=sys.argv[3] if len(sys.argv) > 3 else ".")
+
+# O banco padrão é `./usuarios.db`: roda dentro do diretório temporário
+ORIGEM = os.getcwd()
+os.chdir(DIRETORIO)
+
+from sqlalchemy import text
+
+from app.auth.security import gerar_hash_senha
+from app.database import engine, criar_esquema, SessionPadrao
+from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
+from app.models.principal.perfilModel import perfilModel
+from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.alteracaoModel import AlteracaoModel
+from app.repositories.escritor import escritor, JANELA_MS, TAMANHO_LOTE
+from app.repositories.principal import perfilRepository, usuarioRepository
+from app.schemas.principal.perfil import PerfilCreate
+from app.schemas.principal.usuario import UsuarioCreate, UsuarioUpdate
+from app.utils import metricas
+
+SENHA_HASH = gerar_hash_senha("Senha@1234")
+
+
+def _novo_usuario(prefixo: str, i: int) -> UsuarioCreate:
+    dados = UsuarioCreate(
+        nome=f"Usuário de Teste {i}", login=f"{prefixo}.{i}",
+        email=f"{prefixo}{i}@exemplo.com.br", senha="Senha@1234",
+        perfil="Operador",
+    )
+    dados.senha = SENHA_HASH
+    return dados
+
+
+async def _preparar() -> int:
+    await criar_esquema(engine)
+    async with SessionPadrao() as db:
+        perfil = await perfilRepository.criar_perfil(db, PerfilCreate(nome="Operador", descricao="Operador"))
+        perfil_id = perfil.id
+        for i in range(CONCORRENCIA):
+            await usuarioRepository.criar_usuario(db, _novo_usuario("base", i), perfil_id)
+    return perfil_id
+
+
+async def _rodar(nome: str, escrever, perfil_id: int) -> None:
+    fila = iter(range(OPERACOES))
+    erros: dict[str, int] = {}
+
+    async def trabalhador(t: int) -> None:
+        for i in fila:
+            try:
+                if i % 2:
+                    await escrever(lambda db: usuarioRepository.criar_usuario(db, _novo_usuario(nome, i), perfil_id))
+                else:
+                    await escrever(lambda db: usuarioRepository.atualizar_usuario(
+                        db, 1 + i % CONCORRENCIA, UsuarioUpdate(nome=f"Atualizado {nome} {i}")))
+            except Exception as exc:
+                tipo = str(exc).split("\n")[0][:60]
+                erros[tipo] = erros.get(tipo, 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador(t) for t in range(CONCORRENCIA)))
+    duracao = time.perf_counter() - inicio
+    print(f"{nome:<12}{OPERACOES / duracao:>12.0f}{duracao:>10.2f}{sum(erros.values()):>8}")
+    for tipo, quantidade in erros.items():
+        print(f"{'':<12}{quantidade} x {tipo}")
+
+
+async def _individual(operacao):
+    async with SessionPadrao() as db:
+        return await operacao(db)
+
+
+async def main() -> None:
+    perfil_id = await _preparar()
+    async with engine.connect() as conn:
+        journal = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        sincronia = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+    print(f"{OPERACOES} operações, {CONCORRENCIA} tarefas, journal_mode={journal}, synchronous={sincronia}")
+    print(f"ESCRITA_JANELA_MS={JANELA_MS:g}, ESCRITA_LOTE={TAMANHO_LOTE}, banco em {DIRETORIO}\n")
+    print(f"{'modo':<12}{'ops/s':>12}{'s':>10}{'erros':>8}")
+
+    await _rodar("individual", _individual, perfil_id)
+    await _rodar("agrupado", escritor.executar, perfil_id)
+    await escritor.encerrar()
+    await engine.dispose()
+
+    lotes = metricas.consultar()["resumos"]["escrita.tamanho_lote"]
+    print(f"\nlotes: {lotes['quantidade']}, tamanho médio {lotes['media']:.1f}, máximo {lotes['maximo']:.0f}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        os.chdir(ORIGEM)
+        shutil.rmtree(DIRETORIO, ignore_errors=True)
@@ -0,0 +1,85 @@
+# bench_msgpack.py
+"""
+Compara JSON e MessagePack na resposta da listagem de usuários
+(`ResponseModel[list[UsuarioRead]]`): tamanho do corpo e tempo de
+codificação e decodificação.
+
+Uso: python bench_msgpack.py [quantidade de usuários] [repetições]
+"""
+import sys
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import msgpack
+from pydantic import TypeAdapter
+
+from app.schemas.principal.usuario import UsuarioRead
+from app.schemas.shared.response import ResponseModel
+
+_resposta_lista = TypeAdapter(ResponseModel[list[UsuarioRead]])
+
+
+def montar_resposta(quantidade: int) -> ResponseModel[list[UsuarioRead]]:
+    inicio = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    usuarios = [
+        UsuarioRead(
+            id=i,
+            nome=f"Usuário de Teste {i}",
+            login=f"usuario{i}",
+            perfil=("Administrador", "Operador", "Consulta")[i % 3],
+            email=f"usuario{i}@exemplo.com.br",
+            ativo=i % 5 != 0,
+            data_criacao=inicio + timedelta(minutes=i),
+            versao=1 + i % 4,
+        )
+        for i in range(1, quantidade + 1)
+    ]
+    return ResponseModel(status="success", mensagem=None, dados=usuarios)
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Menor tempo (ms) entre as repetições."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor * 1000
+
+
+def main(quantidade: int, repeticoes: int) -> None:
+    resposta = montar_resposta(quantidade)
+    # O que o FastAPI entrega à classe de resposta: tipos JSON puros
+    conteudo = _resposta_lista.dump_python(resposta, mode="json")
+
+    corpo_pydantic = _resposta_lista.dump_json(resposta)
+    corpo_json = json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode()
+    corpo_msgpack = msgpack.packb(conteudo)
+
+    linhas = [
+        ("JSON (pydantic dump_json)", corpo_pydantic,
+         lambda: _resposta_lista.dump_json(resposta), lambda: json.loads(corpo_pydantic)),
+        ("JSON (json.dumps)", corpo_json,
+         lambda: json.dumps(conteudo, ensure_ascii=False, separators=(",", ":")).encode(),
+         lambda: json.loads(corpo_json)),
+        ("MessagePack (dump_python + packb)", corpo_msgpack,
+         lambda: msgpack.packb(_resposta_lista.dump_python(resposta, mode="json")),
+         lambda: msgpack.unpackb(corpo_msgpack)),
+        ("MessagePack (packb)", corpo_msgpack,
+         lambda: msgpack.packb(conteudo), lambda: msgpack.unpackb(corpo_msgpack)),
+    ]
+
+    print(f"{quantidade} usuários, melhor de {repeticoes} repetições\n")
+    print(f"{'formato':<36}{'bytes':>10}{'% JSON':>9}{'codificar ms':>15}{'decodificar ms':>17}")
+    for nome, corpo, codificar, decodificar in linhas:
+        print(
+            f"{nome:<36}{len(corpo):>10}{100 * len(corpo) / len(corpo_pydantic):>8.1f}%"
+            f"{medir(codificar, repeticoes):>15.2f}{medir(decodificar, repeticoes):>17.2f}"
+        )
+
+
+if __name__ == "__main__":
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    main(quantidade, repeticoes)
@@ -1,15 +1,21 @@
 # test_create.py
-from app.database import Base, engine
+from app.database import engine, criar_esquema
 from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
 from app.models.principal.perfilModel import perfilModel
 from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
 from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.tokenRevogadoModel import TokenRevogadoModel
+from app.models.principal.cacheVersaoModel import CacheVersaoModel
+from app.models.principal.alteracaoModel import AlteracaoModel
+from app.models.principal.auditoriaModel import AuditoriaModel
+from app.models.principal.idempotenciaModel import IdempotenciaModel
+from app.models.principal.tenantModel import TenantModel
 
 import asyncio
 
 async def testar_criacao():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await criar_esquema(engine)
 
 asyncio.run(testar_criacao())
 
@@ -0,0 +1,38 @@
+# create_tenant.py
+# Provisiona tenants: cria o banco de cada um e o cadastra como ativo.
+#   python create_tenant.py <tenant> [<tenant> ...]
+#   python create_tenant.py --existentes   (cadastra os bancos já em TENANTS_DIR)
+import sys
+import asyncio
+
+from app.database import engine, criar_esquema, bancos_existentes
+from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
+from app.models.principal.perfilModel import perfilModel
+from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.tokenRevogadoModel import TokenRevogadoModel
+from app.models.principal.cacheVersaoModel import CacheVersaoModel
+from app.models.principal.alteracaoModel import AlteracaoModel
+from app.models.principal.auditoriaModel import AuditoriaModel
+from app.models.principal.idempotenciaModel import IdempotenciaModel
+from app.models.principal.tenantModel import TenantModel
+from app.services.principal import tenantService
+
+
+async def provisionar(tenants: list[str]) -> None:
+    # O cadastro fica no banco padrão
+    await criar_esquema(engine)
+    for tenant in tenants:
+        await tenantService.provisionar(tenant)
+        print(f"Tenant {tenant} provisionado")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    if argumentos == ["--existentes"]:
+        argumentos = [t for t in bancos_existentes() if t is not None]
+    if not argumentos:
+        sys.exit("Uso: python create_tenant.py <tenant> [<tenant> ...] | --existentes")
+    asyncio.run(provisionar(argumentos))
@@ -1,3 +1,4 @@
+import asyncio
 import traceback
 from fastapi import FastAPI, HTTPException
 from contextlib import asynccontextmanager
@@ -6,39 +7,125 @@ from fastapi.exceptions import RequestValidationError
 from starlette.requests import Request
 from sqlalchemy.exc import IntegrityError
 from fastapi.middleware.cors import CORSMiddleware
-import re
 
 # Schemas e handlers
-from app.schemas.shared.response import ResponseModel
+from app.exceptions.respostas import resposta_de_erro
 from app.exceptions.regra_negocio import RegraNegocioException
+from app.exceptions.conflito_versao import ConflitoVersaoException
+from app.exceptions.tempo_consulta import TempoConsultaExcedidoException
+from app.utils.fastLog import inicializar_processo
+from app.middlewares.perfilador import PerfiladorMiddleware
+from app.middlewares.concorrencia import LimitadorConcorrenciaMiddleware
+from app.middlewares.tenant import TenantMiddleware
+from app.middlewares.idempotencia import IdempotenciaMiddleware
+from app.middlewares.prazo import PrazoConsultaMiddleware
 
 # Banco de dados
-from app.database import Base, engine
+from app.database import engine, fechar_tenants, fechar_tenants_ociosos
 from app.models.principal.usuarioModel import UsuarioModel  # apenas para registrar o modelo
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
 from app.models.principal.perfilModel import perfilModel
 from app.models.principal.permissaoModel import permissaoModel
 from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.tokenRevogadoModel import TokenRevogadoModel
+from app.models.principal.cacheVersaoModel import CacheVersaoModel
+from app.models.principal.alteracaoModel import AlteracaoModel
+from app.models.principal.auditoriaModel import AuditoriaModel
+from app.models.principal.idempotenciaModel import IdempotenciaModel
+from app.models.principal.tenantModel import TenantModel
+
+# Tarefas de fundo
+from app.auth.revogacao import lista_revogacao
+from app.services.principal import eventoService, auditoriaService, idempotenciaService, backupService, arquivamentoService
+from app.repositories.escritor import escritor
+from app.repositories.principal.usuarioRepository import indice_sugestoes
 
 
 # Rotas
 from app.routes.principal.usuarios import router as usuario_router
 from app.routes.principal.perfis import router as perfil_router
+from app.routes.principal.metricas import router as metricas_router
+from app.routes.principal.eventos import router as eventos_router
+from app.routes.principal.auditoria import router as auditoria_router
+from app.routes.principal.backups import router as backups_router
+from app.routes.principal.lote import router as lote_router
 
 #log.info("Iniciando aplicação")
 
 # -------------------------------------------------------------------
-# Ciclo de vida da aplicação (lifespan): criar e dropar tabelas etc.
+# Ciclo de vida da aplicação (lifespan): tarefas de fundo de cada worker
 # -------------------------------------------------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        print("Tabelas criadas!")
+    # Estado por worker: logging reaberto no processo atual e pool do engine
+    # descartado sem fechar conexões que possam ter sido herdadas de um fork.
+    # O esquema já foi criado, uma vez só, pelo run.py (ou create_tables.py).
+    inicializar_processo()
+    await engine.dispose(close=False)
+
+    # Carrega a lista de revogação e a mantém sincronizada com os outros workers
+    await lista_revogacao.compactar()
+    tarefas = [asyncio.create_task(lista_revogacao.manter_sincronizada())]
+
+    # Publica para os assinantes SSE as alterações gravadas por qualquer worker
+    tarefas.append(asyncio.create_task(eventoService.acompanhar_alteracoes()))
+
+    # Fecha os bancos de tenants sem uso
+    tarefas.append(asyncio.create_task(fechar_tenants_ociosos()))
+
+    # Remove as chaves de idempotência vencidas
+    tarefas.append(asyncio.create_task(idempotenciaService.limpar_expiradas()))
+
+    # Backups online agendados do banco padrão e dos tenants
+    tarefas.append(asyncio.create_task(backupService.agendar_backups()))
+
+    # Move os usuários inativos antigos para a tabela de arquivo
+    tarefas.append(asyncio.create_task(arquivamentoService.agendar_arquivamento()))
+
+    # Índice do autocompletar de usuários do banco padrão, montado em segundo
+    # plano (as buscas que chegarem antes aguardam; tenants: na primeira busca)
+    tarefas.append(asyncio.create_task(indice_sugestoes.preparar()))
+
+    # Grava em lote os eventos de auditoria enfileirados pelos services
+    gravacao_auditoria = asyncio.create_task(auditoriaService.processar_fila())
+
     yield
-    # aqui poderia fechar conexões, limpar cache, etc.
+
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+
+    # Grava as escritas enfileiradas e esvazia a fila de auditoria antes de encerrar
+    await escritor.encerrar()
+    await auditoriaService.encerrar()
+    await gravacao_auditoria
+    await fechar_tenants()
 
 app = FastAPI(lifespan=lifespan)
 
+# -------------------------------------------------------------------
+# Orçamento de tempo das consultas por rota e cancelamento na desconexão
+# (o mais interno: as gravações do middleware de idempotência ficam fora)
+# -------------------------------------------------------------------
+app.add_middleware(PrazoConsultaMiddleware)
+
+# -------------------------------------------------------------------
+# Idempotency-Key nos POST de criação (dentro do tenant: a tabela de
+# chaves fica no banco de cada tenant)
+# -------------------------------------------------------------------
+app.add_middleware(IdempotenciaMiddleware)
+
+# -------------------------------------------------------------------
+# Tenant: escolhe o banco da requisição (claim `tenant` do JWT ou X-Tenant)
+# -------------------------------------------------------------------
+app.add_middleware(TenantMiddleware)
+
+# -------------------------------------------------------------------
+# Descarte de carga: limite de concorrência adaptativo por prioridade
+# (registrado antes do CORS para que os 503 também levem os cabeçalhos CORS)
+# -------------------------------------------------------------------
+app.add_middleware(LimitadorConcorrenciaMiddleware)
+
 # -------------------------------------------------------------------
 # CORS
 # -------------------------------------------------------------------
@@ -51,10 +138,20 @@ app.add_middleware(
 )
 print("CORS configurado!")
 
+# -------------------------------------------------------------------
+# Perfilador sob demanda (cabeçalho assinado ou amostragem 1 a cada N)
+# -------------------------------------------------------------------
+app.add_middleware(PerfiladorMiddleware)
+
 # -------------------------------------------------------------------
 # Handlers globais de exceções
 # -------------------------------------------------------------------
 
+def _resposta_json(exc: Exception) -> JSONResponse:
+    status_code, resposta, headers = resposta_de_erro(exc)
+    return JSONResponse(status_code=status_code, content=resposta.model_dump(), headers=headers)
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """
@@ -66,25 +163,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
       "tipo": "<tipo_de_erro>"
     }
     """
-    erros_formatados = []
-    for err in exc.errors():
-        loc = err.get("loc", [])
-        # remove "body" e une o restante por ponto
-        campo = ".".join(str(x) for x in loc[1:]) if len(loc) > 1 else loc[-1]
-        erros_formatados.append({
-            "campo": campo,
-            "mensagem": err.get("msg"),
-            "tipo": err.get("type")
-        })
-
-    return JSONResponse(
-        status_code=422,
-        content=ResponseModel(
-            status="error",
-            mensagem="Houve um problema na validação dos campos, verifique os dados enviados e tente novamente.",
-            dados=erros_formatados
-        ).model_dump()
-    )
+    return _resposta_json(exc)
 
 
 @app.exception_handler(IntegrityError)
@@ -96,37 +175,7 @@ async def db_integrity_error_handler(request: Request, exc: IntegrityError):
       { "campo": "<nome_do_campo>", "mensagem": "<msg>", "tipo": "<tipo>" }
     ]
     """
-    msg_original = str(exc.orig)
-    erros_formatados = []
-
-    # Detecta UNIQUE constraint
-    unique_match = re.search(
-        r"UNIQUE constraint failed: [\w\.]+\.([\w]+)",
-        msg_original
-    )
-    if unique_match:
-        campo = unique_match.group(1)
-        erros_formatados.append({
-            "campo": campo,
-            "mensagem": f"Já existe um registro com esse {campo}.",
-            "tipo": "unique"
-        })
-    else:
-        # fallback genérico
-        erros_formatados.append({
-            "campo": None,
-            "mensagem": msg_original,
-            "tipo": "integrity_error"
-        })
-
-    return JSONResponse(
-        status_code=400,
-        content=ResponseModel(
-            status="error",
-            mensagem="Erro de integridade do banco.",
-            dados=erros_formatados
-        ).model_dump()
-    )
+    return _resposta_json(exc)
 
 
 @app.exception_handler(RegraNegocioException)
@@ -134,28 +183,30 @@ async def regra_negocio_exception_handler(request: Request, exc: RegraNegocioExc
     """
     Erros de regra de negócio esperados (ex: formatação de login, business logic).
     """
-    return JSONResponse(
-        status_code=200,
-        content=ResponseModel(
-            status="error",
-            mensagem=exc.mensagem,
-            dados=None
-        ).model_dump()
-    )
+    return _resposta_json(exc)
+
+@app.exception_handler(ConflitoVersaoException)
+async def conflito_versao_exception_handler(request: Request, exc: ConflitoVersaoException):
+    """
+    Atualização recusada porque o registro mudou desde a versão informada em
+    `If-Match`. O `ETag` da resposta traz a versão atual.
+    """
+    return _resposta_json(exc)
+
+@app.exception_handler(TempoConsultaExcedidoException)
+async def tempo_consulta_exception_handler(request: Request, exc: TempoConsultaExcedidoException):
+    """
+    Consulta interrompida por exceder o orçamento de tempo da rota (ou porque
+    o cliente desconectou, caso em que a resposta não chega a ser lida).
+    """
+    return _resposta_json(exc)
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """
     Tratamento padronizado para HTTPException levantadas manualmente nos endpoints.
     """
-    return JSONResponse(
-        status_code=exc.status_code,
-        content=ResponseModel(
-            status="error",
-            mensagem=exc.detail,
-            dados=None
-        ).model_dump()
-    )
+    return _resposta_json(exc)
 
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception):
@@ -164,20 +215,18 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
     """
     #log.error("Erro interno não tratado:\n" + "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)))
 
-    return JSONResponse(
-        status_code=500,
-        content=ResponseModel(
-            status="error",
-            mensagem="Erro interno no servidor.",
-            dados=None  # ou str(exc) em debug
-        ).model_dump()
-    )
+    return _resposta_json(exc)
 
 # -------------------------------------------------------------------
 # Registro das rotas (endpoints)
 # -------------------------------------------------------------------
 app.include_router(usuario_router)
 app.include_router(perfil_router)
+app.include_router(metricas_router)
+app.include_router(eventos_router)
+app.include_router(auditoria_router)
+app.include_router(backups_router)
+app.include_router(lote_router)
 print("Rotas registradas!")
 
 #log.info("Aplicação Iniciada!")
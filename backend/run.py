@@ -1,13 +1,113 @@
 # run.py
+import os
+import sys
+import asyncio
+import importlib.util
+
 import uvicorn
 
+# Modos de execução aceitos: "dev" (padrão, com hot-reload) e "prod" (multi-worker)
+MODO_PADRAO = os.getenv("APP_MODO", "dev")
+
+HOST = os.getenv("APP_HOST", "0.0.0.0")
+PORTA = int(os.getenv("APP_PORTA", "8194"))
+
+
+def _modulo_disponivel(nome: str) -> bool:
+    """Retorna True se o módulo puder ser importado neste ambiente."""
+    return importlib.util.find_spec(nome) is not None
+
+
+def _quantidade_workers() -> int:
+    """
+    Define a quantidade de workers do modo produção.
+
+    Usa APP_WORKERS quando informado; caso contrário, um worker por núcleo
+    disponível para o processo (respeitando afinidade de CPU no Linux).
+    """
+    configurado = os.getenv("APP_WORKERS")
+    if configurado:
+        return max(1, int(configurado))
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def configuracao_desenvolvimento() -> dict:
+    """Configuração de desenvolvimento: processo único com hot-reload."""
+    return {
+        "host": HOST,
+        "port": PORTA,
+        "log_config": None,   # desabilita o config built-in
+        "log_level": "info",  # mantém o level
+        "reload": True,       # hot-reload
+    }
+
+
+def configuracao_producao() -> dict:
+    """
+    Configuração de produção: prefork com N workers, uvloop/httptools quando
+    instalados, keep-alive e backlog ajustados e reciclagem de workers.
+
+    Variáveis de ambiente:
+        APP_WORKERS: quantidade de workers (padrão: núcleos disponíveis).
+        APP_KEEP_ALIVE: segundos de keep-alive das conexões ociosas (padrão: 15).
+        APP_BACKLOG: tamanho da fila de conexões pendentes do socket (padrão: 4096).
+        APP_MAX_REQUISICOES: requisições atendidas antes de reciclar o worker
+            (padrão: 50000; 0 desativa a reciclagem).
+    """
+    workers = _quantidade_workers()
+    max_requisicoes = int(os.getenv("APP_MAX_REQUISICOES", "50000"))
+
+    # Os workers são processos novos (spawn) e herdam o ambiente: é por aqui
+    # que cada um sabe que está rodando em modo multi-worker (ver fastLog).
+    os.environ["APP_WORKERS"] = str(workers)
+
+    return {
+        "host": HOST,
+        "port": PORTA,
+        "log_config": None,
+        "log_level": "info",
+        "workers": workers,
+        "loop": "uvloop" if _modulo_disponivel("uvloop") else "asyncio",
+        "http": "httptools" if _modulo_disponivel("httptools") else "h11",
+        "timeout_keep_alive": int(os.getenv("APP_KEEP_ALIVE", "15")),
+        "backlog": int(os.getenv("APP_BACKLOG", "4096")),
+        # Ao atingir o limite o worker encerra e o supervisor do Uvicorn
+        # sobe outro no lugar, contendo o crescimento de memória.
+        "limit_max_requests": max_requisicoes or None,
+        "proxy_headers": True,
+        "server_header": False,
+    }
+
+
+def preparar_banco() -> None:
+    """
+    Cria as tabelas e aplica as migrações do banco padrão uma única vez, no
+    processo principal, antes de subir os workers (que só abrem o banco).
+    """
+    import main  # registra todos os modelos no metadata
+    from app.database import engine, criar_esquema
+
+    async def _preparar() -> None:
+        await criar_esquema(engine)
+        await engine.dispose()
+
+    asyncio.run(_preparar())
+    print("Tabelas criadas!")
+
+
 if __name__ == "__main__":
+    modo = sys.argv[1] if len(sys.argv) > 1 else MODO_PADRAO
+
+    if modo == "prod":
+        config = configuracao_producao()
+    elif modo == "dev":
+        config = configuracao_desenvolvimento()
+    else:
+        sys.exit(f"Modo desconhecido: {modo} (use 'dev' ou 'prod')")
+
+    preparar_banco()
+
     # roda o Uvicorn SEM o config padrão, só com seus handlers
-    uvicorn.run(
-        "main:app", 
-        host="0.0.0.0", 
-        port=8194,
-        log_config=None,      # desabilita o config built-in
-        log_level="info",     # mantém o level
-        reload=True           # se quiser hot-reload
-    )
+    uvicorn.run("main:app", **config)
@@ -1,2 +1,3 @@
 #!/bin/bash
-uvicorn main:app --host 0.0.0.0 --port 8000 --reload
+# O esquema é criado antes de subir o servidor (o lifespan não o cria)
+python create_tables.py && uvicorn main:app --host 0.0.0.0 --port 8000 --reload
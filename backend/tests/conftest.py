@@ -0,0 +1,20 @@
+import os
+import shutil
+import tempfile
+
+# O banco padrão é `./usuarios.db`, resolvido para um caminho absoluto quando
+# `app.database` é importado: importá-lo aqui, de dentro de um diretório
+# temporário, faz os testes usarem um banco próprio. Os bancos de tenant
+# (TENANTS_DIR é lido na importação) ficam no mesmo diretório.
+_DIRETORIO = tempfile.mkdtemp(prefix="testes_backend_")
+os.environ["TENANTS_DIR"] = os.path.join(_DIRETORIO, "tenants")
+_ORIGEM = os.getcwd()
+os.chdir(_DIRETORIO)
+try:
+    import app.database  # noqa: F401
+finally:
+    os.chdir(_ORIGEM)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_DIRETORIO, ignore_errors=True)
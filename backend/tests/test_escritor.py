@@ -0,0 +1,186 @@
+"""
+Escritor agrupado (group commit): uma operação que falha não desfaz as
+outras do lote, e as ações de `apos_confirmar` só rodam depois do COMMIT
+(nunca para o que foi desfeito).
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal, criar_banco_tenant, fechar_tenants, preparar_tenant, tenant_atual
+from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
+from app.models.principal.perfilModel import perfilModel
+from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.alteracaoModel import AlteracaoModel
+from app.repositories.escritor import escritor
+from app.repositories.principal import perfilRepository
+from app.schemas.principal.perfil import PerfilCreate
+from app.utils import metricas
+
+# Banco próprio: os outros módulos usam o banco padrão com ids fixos
+TENANT = "teste_escritor"
+# Um resultado que nunca é entregue falha o teste em vez de travá-lo
+PRAZO_SEGUNDOS = 10
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(criar_banco_tenant(TENANT))
+    try:
+        yield loop
+    finally:
+        loop.run_until_complete(escritor.encerrar())
+        loop.run_until_complete(fechar_tenants())
+        loop.close()
+
+
+def _rodar(loop, corrotina):
+    async def no_tenant():
+        tenant_atual.set(TENANT)
+        await preparar_tenant(TENANT)
+        return await asyncio.wait_for(corrotina(), PRAZO_SEGUNDOS)
+    return loop.run_until_complete(no_tenant())
+
+
+def _criar(nome: str):
+    return lambda db: perfilRepository.criar_perfil(db, PerfilCreate(nome=nome, descricao="teste"))
+
+
+async def _falhar(db):
+    # NOT NULL violado no banco, depois das escritas das operações anteriores
+    db.add(perfilModel(nome=None, descricao="teste"))
+    await db.flush()
+
+
+async def _nomes(prefixo: str) -> list[str]:
+    async with SessionLocal() as db:
+        return list(await db.scalars(
+            select(perfilModel.nome).where(perfilModel.nome.like(f"{prefixo}%")).order_by(perfilModel.nome)
+        ))
+
+
+def _contador(nome: str) -> int:
+    return metricas.consultar()["contadores"].get(nome, 0)
+
+
+def test_falhas_no_lote_nao_desfazem_as_demais(loop):
+    refeitos = _contador("escrita.lotes_refeitos")
+    lotes = _contador("escrita.lotes")
+
+    async def cenario():
+        # A primeira falha desfaz o lote; a segunda acontece já na passada
+        # refeita, cada operação no seu SAVEPOINT
+        operacoes = [_criar(f"lote-{i}") for i in range(5)]
+        operacoes.insert(2, _falhar)
+        operacoes.insert(5, _falhar)
+        resultados = await asyncio.gather(
+            *(escritor.executar(op) for op in operacoes), return_exceptions=True
+        )
+        async with SessionLocal() as db:
+            # Refeitas, as anteriores à falha não são gravadas duas vezes
+            registros = await db.scalar(select(func.count()).select_from(AlteracaoModel).where(
+                AlteracaoModel.entidade == "perfil",
+                AlteracaoModel.registro_id.in_([r.id for r in resultados if isinstance(r, perfilModel)]),
+            ))
+        return resultados, await _nomes("lote-"), registros
+
+    resultados, nomes, registros = _rodar(loop, cenario)
+
+    assert isinstance(resultados[2], IntegrityError)
+    assert isinstance(resultados[5], IntegrityError)
+    criados = [r for i, r in enumerate(resultados) if i not in (2, 5)]
+    assert all(isinstance(r, perfilModel) for r in criados)
+    assert [r.nome for r in criados] == [f"lote-{i}" for i in range(5)]
+    assert nomes == [f"lote-{i}" for i in range(5)]
+    assert registros == 5
+    # Um só lote, desfeito e refeito uma vez
+    assert _contador("escrita.lotes") == lotes + 1
+    assert _contador("escrita.lotes_refeitos") == refeitos + 1
+
+
+def test_lote_sem_falha_nao_e_refeito(loop):
+    refeitos = _contador("escrita.lotes_refeitos")
+
+    async def cenario():
+        await asyncio.gather(*(escritor.executar(_criar(f"direto-{i}")) for i in range(3)))
+        return await _nomes("direto-")
+
+    assert _rodar(loop, cenario) == [f"direto-{i}" for i in range(3)]
+    assert _contador("escrita.lotes_refeitos") == refeitos
+
+
+def test_apos_confirmar_nao_roda_quando_desfeita(loop):
+    executadas = []
+
+    async def operacao(db):
+        await perfilRepository.criar_perfil(db, PerfilCreate(nome="desfeita", descricao="teste"))
+
+        async def acao():
+            executadas.append("desfeita")
+
+        await escritor.apos_confirmar(acao)
+        raise RuntimeError("falha depois da escrita")
+
+    async def cenario():
+        with pytest.raises(RuntimeError):
+            await escritor.executar_em_transacao(operacao)
+        return await _nomes("desfeita")
+
+    assert _rodar(loop, cenario) == []
+    assert executadas == []
+
+
+def test_apos_confirmar_roda_depois_do_commit(loop):
+    # Nome -> nomes já gravados quando a ação rodou
+    vistos: dict[str, list[str]] = {}
+
+    def registrar(nome: str):
+        async def acao():
+            vistos[nome] = await _nomes("confirmada")
+        return acao
+
+    async def operacao(db):
+        async with escritor.etapa() as sessao:
+            await perfilRepository.criar_perfil(sessao, PerfilCreate(nome="confirmada-1", descricao="teste"))
+            await escritor.apos_confirmar(registrar("confirmada-1"))
+        # Etapa que falha: só ela é desfeita, e a sua ação é descartada
+        with pytest.raises(RuntimeError):
+            async with escritor.etapa() as sessao:
+                await perfilRepository.criar_perfil(sessao, PerfilCreate(nome="confirmada-2", descricao="teste"))
+                await escritor.apos_confirmar(registrar("confirmada-2"))
+                raise RuntimeError("etapa desfeita")
+        assert vistos == {}
+
+    _rodar(loop, lambda: escritor.executar_em_transacao(operacao))
+
+    assert vistos == {"confirmada-1": ["confirmada-1"]}
+
+
+def test_transacao_refeita_executa_as_acoes_uma_vez(loop):
+    executadas = []
+
+    async def operacao(db):
+        await perfilRepository.criar_perfil(db, PerfilCreate(nome="refeita", descricao="teste"))
+
+        async def acao():
+            executadas.append("refeita")
+
+        await escritor.apos_confirmar(acao)
+
+    async def cenario():
+        # Mesmo lote: a transação roda, o lote é desfeito pela falha e ela é refeita
+        return await asyncio.gather(
+            escritor.executar_em_transacao(operacao), escritor.executar(_falhar), return_exceptions=True
+        )
+
+    resultados = _rodar(loop, cenario)
+
+    assert resultados[0] is None
+    assert isinstance(resultados[1], IntegrityError)
+    assert executadas == ["refeita"]
+    assert _rodar(loop, lambda: _nomes("refeita")) == ["refeita"]
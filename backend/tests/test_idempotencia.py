@@ -0,0 +1,222 @@
+"""
+IdempotenciaMiddleware: reserva da chave, espera da repetição concorrente,
+resposta repetida, liberação da chave quando a execução falha e escopo da
+chave por cliente.
+"""
+import json
+import uuid
+import asyncio
+
+import pytest
+
+from app.database import criar_banco_tenant, fechar_tenants, preparar_tenant, tenant_atual
+from app.middlewares.idempotencia import IdempotenciaMiddleware
+from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
+from app.models.principal.perfilModel import perfilModel
+from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.idempotenciaModel import IdempotenciaModel
+
+# Banco próprio: os outros módulos usam o banco padrão com ids fixos
+TENANT = "teste_idempotencia"
+# Uma resposta que nunca é enviada falha o teste em vez de travá-lo
+PRAZO_SEGUNDOS = 10
+
+
+class _Handler:
+    """Aplicação ASGI de teste: conta as execuções e pode segurar a resposta."""
+
+    def __init__(self, status: int = 200, falhas: int = 0):
+        self.status = status
+        # As `falhas` primeiras execuções levantam exceção
+        self.falhas = falhas
+        self.chamadas = 0
+        self.iniciou = asyncio.Event()
+        self.liberar: asyncio.Event | None = None
+
+    async def __call__(self, scope, receive, send):
+        self.chamadas += 1
+        numero = self.chamadas
+        corpo = (await receive())["body"]
+        self.iniciou.set()
+        if self.liberar is not None:
+            await self.liberar.wait()
+        if numero <= self.falhas:
+            raise RuntimeError("falha no handler")
+        resposta = json.dumps({"chamada": self.chamadas, "corpo": corpo.decode()}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": self.status,
+            "headers": [(b"content-type", b"application/json"), (b"x-chamada", str(self.chamadas).encode())],
+        })
+        await send({"type": "http.response.body", "body": resposta})
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(criar_banco_tenant(TENANT))
+    try:
+        yield loop
+    finally:
+        loop.run_until_complete(fechar_tenants())
+        loop.close()
+
+
+def _rodar(loop, corrotina):
+    async def no_tenant():
+        tenant_atual.set(TENANT)
+        await preparar_tenant(TENANT)
+        return await asyncio.wait_for(corrotina(), PRAZO_SEGUNDOS)
+    return loop.run_until_complete(no_tenant())
+
+
+async def _post(app, chave: str, corpo: bytes = b'{"nome": "teste"}', cliente=("10.0.0.1", 5000)):
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/perfis/",
+        "headers": [(b"content-type", b"application/json"), (b"idempotency-key", chave.encode())],
+        "client": cliente,
+    }
+    entregue = False
+
+    async def receive():
+        nonlocal entregue
+        if not entregue:
+            entregue = True
+            return {"type": "http.request", "body": corpo, "more_body": False}
+        await asyncio.Event().wait()
+
+    mensagens = []
+
+    async def send(mensagem):
+        mensagens.append(mensagem)
+
+    await app(scope, receive, send)
+    cabecalhos = dict(mensagens[0]["headers"])
+    return mensagens[0]["status"], cabecalhos, b"".join(m.get("body", b"") for m in mensagens[1:])
+
+
+def _chave() -> str:
+    return uuid.uuid4().hex
+
+
+def test_repeticao_concorrente_aguarda_e_repete(loop):
+    handler = _Handler()
+    app = IdempotenciaMiddleware(handler)
+    chave = _chave()
+
+    async def cenario():
+        handler.liberar = asyncio.Event()
+        primeira = asyncio.create_task(_post(app, chave))
+        await handler.iniciou.wait()
+        repetida = asyncio.create_task(_post(app, chave))
+        await asyncio.sleep(0.2)
+        # A repetição espera a primeira terminar, sem executar o handler
+        assert not repetida.done()
+        assert handler.chamadas == 1
+        handler.liberar.set()
+        return await primeira, await repetida
+
+    (status1, cabecalhos1, corpo1), (status2, cabecalhos2, corpo2) = _rodar(loop, cenario)
+
+    assert handler.chamadas == 1
+    assert (status1, corpo1) == (status2, corpo2) == (200, corpo1)
+    assert b"idempotent-replayed" not in cabecalhos1
+    assert cabecalhos2[b"idempotent-replayed"] == b"true"
+    assert cabecalhos2[b"x-chamada"] == b"1"
+
+
+def test_repeticao_posterior_repete_a_resposta_guardada(loop):
+    handler = _Handler(status=201)
+    app = IdempotenciaMiddleware(handler)
+    chave = _chave()
+
+    async def cenario():
+        return await _post(app, chave), await _post(app, chave)
+
+    primeira, repetida = _rodar(loop, cenario)
+
+    assert handler.chamadas == 1
+    assert repetida[0] == 201
+    assert repetida[2] == primeira[2]
+    assert repetida[1][b"idempotent-replayed"] == b"true"
+
+
+def test_chave_com_outro_corpo_e_recusada(loop):
+    handler = _Handler()
+    app = IdempotenciaMiddleware(handler)
+    chave = _chave()
+
+    async def cenario():
+        await _post(app, chave, b'{"nome": "um"}')
+        return await _post(app, chave, b'{"nome": "outro"}')
+
+    status, _, _ = _rodar(loop, cenario)
+
+    assert status == 422
+    assert handler.chamadas == 1
+
+
+def test_resposta_5xx_libera_a_chave(loop):
+    handler = _Handler(status=500)
+    app = IdempotenciaMiddleware(handler)
+    chave = _chave()
+
+    async def cenario():
+        primeira = await _post(app, chave)
+        handler.status = 200
+        return primeira, await _post(app, chave)
+
+    primeira, segunda = _rodar(loop, cenario)
+
+    assert primeira[0] == 500
+    assert segunda[0] == 200
+    assert b"idempotent-replayed" not in segunda[1]
+    assert handler.chamadas == 2
+
+
+def test_excecao_libera_a_chave_e_a_espera(loop):
+    handler = _Handler(falhas=1)
+    app = IdempotenciaMiddleware(handler)
+    chave = _chave()
+
+    async def cenario():
+        handler.liberar = asyncio.Event()
+        primeira = asyncio.create_task(_post(app, chave))
+        await handler.iniciou.wait()
+        repetida = asyncio.create_task(_post(app, chave))
+        await asyncio.sleep(0.1)
+        assert handler.chamadas == 1
+        # A repetição que aguardava assume a chave e executa
+        handler.liberar.set()
+        with pytest.raises(RuntimeError):
+            await primeira
+        return await repetida
+
+    status, cabecalhos, _ = _rodar(loop, cenario)
+
+    assert status == 200
+    assert b"idempotent-replayed" not in cabecalhos
+    assert handler.chamadas == 2
+
+
+def test_clientes_anonimos_nao_compartilham_a_chave(loop):
+    handler = _Handler()
+    app = IdempotenciaMiddleware(handler)
+    chave = _chave()
+
+    async def cenario():
+        return (
+            await _post(app, chave, cliente=("10.0.0.1", 5000)),
+            await _post(app, chave, cliente=("10.0.0.2", 5000)),
+        )
+
+    primeiro, segundo = _rodar(loop, cenario)
+
+    assert handler.chamadas == 2
+    assert b"idempotent-replayed" not in segundo[1]
+    assert primeiro[1][b"x-chamada"] == b"1"
+    assert segundo[1][b"x-chamada"] == b"2"
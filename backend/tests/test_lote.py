@@ -0,0 +1,117 @@
+"""
+Lote (`loteService.executar`): no modo `tudo_ou_nada` uma falha desfaz o
+lote inteiro, sem deixar linhas nem efeitos posteriores ao commit; no modo
+`independente` só a operação que falhou é desfeita.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database import SessionLocal, criar_banco_tenant, fechar_tenants, preparar_tenant, tenant_atual
+from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
+from app.models.principal.perfilModel import perfilModel
+from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.alteracaoModel import AlteracaoModel
+from app.repositories.escritor import escritor
+from app.schemas.principal.lote import LoteRequest
+from app.services.principal import auditoriaService, loteService
+
+# Banco próprio: os outros módulos usam o banco padrão com ids fixos
+TENANT = "teste_lote"
+# Um resultado que nunca é entregue falha o teste em vez de travá-lo
+PRAZO_SEGUNDOS = 10
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(criar_banco_tenant(TENANT))
+    try:
+        yield loop
+    finally:
+        loop.run_until_complete(escritor.encerrar())
+        loop.run_until_complete(fechar_tenants())
+        loop.close()
+
+
+def _rodar(loop, corrotina):
+    async def no_tenant():
+        tenant_atual.set(TENANT)
+        await preparar_tenant(TENANT)
+        return await asyncio.wait_for(corrotina(), PRAZO_SEGUNDOS)
+    return loop.run_until_complete(no_tenant())
+
+
+def _lote(modo: str, perfil: str, login: str) -> LoteRequest:
+    """Cria um perfil e um usuário nele, e repete o login (UNIQUE) na terceira operação."""
+    usuario = {
+        "nome": "Usuário do Lote", "login": login, "email": f"{login}@exemplo.com.br",
+        "senha": "Senha@1234", "perfil": perfil,
+    }
+    return LoteRequest(modo=modo, operacoes=[
+        {"operacao": "perfil.criar", "dados": {"nome": perfil, "descricao": "teste"}},
+        {"operacao": "usuario.criar", "dados": usuario},
+        {"operacao": "usuario.criar", "dados": {**usuario, "email": f"outro.{login}@exemplo.com.br"}},
+    ])
+
+
+async def _gravados(perfil: str, login: str) -> tuple[int, int, int]:
+    """Perfis com o nome, usuários com o login e alterações no log."""
+    async with SessionLocal() as db:
+        return (
+            await db.scalar(select(func.count()).select_from(perfilModel).where(perfilModel.nome == perfil)),
+            await db.scalar(select(func.count()).select_from(UsuarioModel).where(UsuarioModel.login == login)),
+            await db.scalar(select(func.count()).select_from(AlteracaoModel)),
+        )
+
+
+def test_tudo_ou_nada_nao_deixa_linhas_parciais(loop):
+    async def cenario():
+        alteracoes = (await _gravados("", ""))[2]
+        auditoria = auditoriaService._fila.qsize()
+        resultados = await loteService.executar(_lote("tudo_ou_nada", "Gerente", "ger.lote"))
+        return resultados, await _gravados("Gerente", "ger.lote"), alteracoes, auditoria
+
+    resultados, (perfis, usuarios, alteracoes), alteracoes_antes, auditoria_antes = _rodar(loop, cenario)
+
+    assert [r.codigo for r in resultados] == [424, 424, 400]
+    assert [r.status for r in resultados] == ["error"] * 3
+    assert "desfeita" in resultados[0].mensagem
+    # O perfil e o usuário gravados antes da falha foram desfeitos com ela
+    assert (perfis, usuarios) == (0, 0)
+    assert alteracoes == alteracoes_antes
+    # Nem as ações posteriores ao commit (auditoria, cache, eventos) rodaram
+    assert auditoriaService._fila.qsize() == auditoria_antes
+
+
+def test_tudo_ou_nada_com_dados_invalidos_nao_executa(loop):
+    lote = LoteRequest(operacoes=[
+        {"operacao": "perfil.criar", "dados": {"descricao": "sem nome"}},
+        {"operacao": "perfil.criar", "dados": {"nome": "Revisor", "descricao": "teste"}},
+    ])
+
+    async def cenario():
+        return await loteService.executar(lote), await _gravados("Revisor", "")
+
+    resultados, (perfis, _, _) = _rodar(loop, cenario)
+
+    assert [r.codigo for r in resultados] == [422, 424]
+    assert "não executada" in resultados[1].mensagem
+    assert perfis == 0
+
+
+def test_independente_desfaz_so_a_operacao_que_falhou(loop):
+    async def cenario():
+        auditoria = auditoriaService._fila.qsize()
+        resultados = await loteService.executar(_lote("independente", "Supervisor", "sup.lote"))
+        return resultados, await _gravados("Supervisor", "sup.lote"), auditoria
+
+    resultados, (perfis, usuarios, _), auditoria_antes = _rodar(loop, cenario)
+
+    assert [r.codigo for r in resultados] == [200, 200, 400]
+    assert (perfis, usuarios) == (1, 1)
+    # Uma auditoria por operação gravada, depois do commit
+    assert auditoriaService._fila.qsize() == auditoria_antes + 2
@@ -0,0 +1,314 @@
+"""
+Paridade entre o snapshot colunar (`snapshot_usuarios.consultar`) e o SQL
+(`generic.consulta_filtrada`): para árvores de filtros aleatórias, com
+grupos aninhados e "ou", os dois devem devolver as mesmas linhas na mesma
+ordem; o que o snapshot não reproduz com exatidão deve ser recusado (None).
+"""
+import os
+import random
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import engine, criar_esquema, SessionPadrao
+from app.models.principal.usuarioModel import UsuarioModel
+from app.models.principal.usuarioArquivoModel import UsuarioArquivoModel
+from app.models.principal.perfilModel import perfilModel
+from app.models.principal.permissaoModel import permissaoModel
+from app.models.principal.perfilpermissaoModel import perfilpermissaoModel
+from app.models.principal.alteracaoModel import AlteracaoModel
+from app.repositories.generic import consulta_filtrada
+from app.repositories.principal.usuarioRepository import snapshot_usuarios
+
+SEMENTE = int(os.getenv("PARIDADE_SEMENTE", "20240601"))
+CASOS = int(os.getenv("PARIDADE_CASOS", "400"))
+
+# Nomes com acentos, maiúsculas/minúsculas fora do ASCII, curingas do LIKE
+# (`%` e `_`) como texto e repetições (empates na ordenação)
+NOMES = [
+    "Ana Souza", "ana souza", "ANA SOUZA", "Álvaro Lima", "álvaro lima",
+    "João Conceição", "JOÃO CONCEIÇÃO", "Müller Straße", "Zoë Ørsted",
+    "Desconto 50% off", "Desconto 50_ off", "a_b c%d", "100%", "_inicio",
+    "Ñandú", "Ωmega", "Émile Zola", "emile zola", "123", "99 Problemas",
+]
+PERFIS = [1, 2, 3]
+COLUNAS_TEXTO = ["nome", "login", "email"]
+COLUNAS_INTEIRO = ["id", "versao", "perfil_id"]
+OPERADORES_COMPARACAO = ["=", "!=", ">", "<", ">=", "<="]
+ORDENAVEIS = ["nome", "login", "email", "ativo", "versao", "perfil_id", "data_criacao", "id"]
+
+
+def _linhas(aleatorio: random.Random) -> list[dict]:
+    inicio = datetime(2024, 1, 1, 8, 0, 0)
+    linhas = []
+    for i in range(1, 181):
+        nome = aleatorio.choice(NOMES)
+        linhas.append({
+            "id": i,
+            "nome": nome,
+            "login": f"{nome.split()[0].lower()}.{i:03d}",
+            "senha": "hash",
+            "email": f"u{i}@Exemplo.com" if i % 7 else f"U{i}@exemplo.COM",
+            "ativo": aleatorio.random() < 0.7,
+            "perfil_id": aleatorio.choice(PERFIS),
+            # Poucos instantes distintos (empates) e alguns NULL
+            "data_criacao": None if i % 23 == 0 else inicio + timedelta(hours=aleatorio.randrange(12)),
+            "versao": aleatorio.randrange(1, 5),
+        })
+    return linhas
+
+
+@pytest.fixture(scope="module")
+def ambiente():
+    """Banco padrão (no diretório temporário do conftest) com os usuários de teste."""
+    loop = asyncio.new_event_loop()
+    linhas = _linhas(random.Random(SEMENTE))
+
+    async def preparar():
+        await criar_esquema(engine)
+        async with SessionPadrao() as db:
+            await db.execute(insert(perfilModel), [
+                {"id": p, "nome": f"perfil {p}", "descricao": "teste"} for p in PERFIS
+            ])
+            await db.execute(insert(UsuarioModel), linhas)
+            # No insert, o None daria lugar ao default da coluna
+            await db.execute(
+                update(UsuarioModel)
+                .where(UsuarioModel.id.in_([l["id"] for l in linhas if l["data_criacao"] is None]))
+                .values(data_criacao=None)
+            )
+            await db.commit()
+
+    loop.run_until_complete(preparar())
+    try:
+        yield loop, linhas
+    finally:
+        loop.run_until_complete(engine.dispose())
+        loop.close()
+
+
+def _consultar(loop, filtros, ordenacao=None, colunas=None, limite=1000):
+    async def executar():
+        async with SessionPadrao() as db:
+            sql = await consulta_filtrada(db, UsuarioModel, filtros, ordenacao, colunas, limite)
+        memoria = await snapshot_usuarios.consultar(filtros, ordenacao, colunas, limite)
+        return sql, memoria
+    return loop.run_until_complete(executar())
+
+
+def _tuplas(usuarios) -> list[tuple]:
+    return [
+        (u.id, u.nome, u.login, u.email, u.ativo, u.perfil_id, u.data_criacao, u.versao)
+        for u in usuarios
+    ]
+
+
+def _assert_paridade(loop, filtros, ordenacao=None, limite=1000):
+    sql, memoria = _consultar(loop, filtros, ordenacao, None, limite)
+    assert memoria is not None, f"snapshot recusou: {filtros!r} {ordenacao!r}"
+    assert _tuplas(memoria) == _tuplas(sql), f"divergência: {filtros!r} {ordenacao!r} {limite}"
+
+
+# ----------------------------------------------------------------------
+# Geração aleatória de filtros suportados
+# ----------------------------------------------------------------------
+def _trecho(aleatorio: random.Random, linhas: list[dict], coluna: str) -> str:
+    """Pedaço de um valor existente, às vezes com a caixa trocada ou curingas."""
+    valor = str(aleatorio.choice(linhas)[coluna])
+    inicio = aleatorio.randrange(len(valor))
+    trecho = valor[inicio:inicio + aleatorio.randrange(1, 5)]
+    if aleatorio.random() < 0.3:
+        trecho = trecho.swapcase()
+    if aleatorio.random() < 0.2:
+        trecho = aleatorio.choice(["%", "_", "50%", "_ ", "a_b", "ç", "Ç", "Ä", "ä"])
+    return trecho
+
+
+def _filtro(aleatorio: random.Random, linhas: list[dict]) -> dict:
+    tipo = aleatorio.choice(["texto", "texto", "inteiro", "booleano"])
+    if tipo == "texto":
+        coluna = aleatorio.choice(COLUNAS_TEXTO)
+        operador = aleatorio.choice(OPERADORES_COMPARACAO + ["like", "ilike", "in"])
+        if operador in ("like", "ilike"):
+            valor = _trecho(aleatorio, linhas, coluna)
+        elif operador == "in":
+            # Listas com tipos misturados: inteiros comparados como texto
+            valor = [aleatorio.choice(linhas)[coluna] for _ in range(aleatorio.randrange(0, 4))]
+            valor += aleatorio.sample([123, 99, "inexistente", "ÇÃO"], aleatorio.randrange(0, 3))
+        elif aleatorio.random() < 0.5:
+            valor = aleatorio.choice(linhas)[coluna]
+        else:
+            valor = aleatorio.choice(["A", "a", "Á", "m", "Z", "z", "ÿ", "_", "%", "100", 123, "u5"])
+    elif tipo == "inteiro":
+        coluna = aleatorio.choice(COLUNAS_INTEIRO)
+        operador = aleatorio.choice(OPERADORES_COMPARACAO + ["in", "like"])
+        if operador == "in":
+            # Um bool no início faria o SQLAlchemy tipar a lista como booleana
+            valor = [aleatorio.choice([1, 2, 3, 4, 50, 2.0]) for _ in range(aleatorio.randrange(0, 4))]
+            valor += [True] * (aleatorio.random() < 0.3)
+        elif operador == "like":
+            valor = str(aleatorio.randrange(10))
+        else:
+            valor = aleatorio.choice([0, 1, 2, 3, 4, 5, 90, 180, 2.5, -1])
+    else:
+        coluna = "ativo"
+        operador = aleatorio.choice(["=", "!=", "in"])
+        if operador == "in":
+            valor = aleatorio.sample([True, False, 0, 1], aleatorio.randrange(0, 3))
+        else:
+            valor = aleatorio.choice([True, False, 0, 1])
+    filtro = {"coluna": coluna, "valor": valor, "filtro": operador, "ou": aleatorio.random() < 0.35}
+    if aleatorio.random() < 0.1:
+        filtro["filtro"] = filtro["filtro"].upper()
+    if aleatorio.random() < 0.1:
+        del filtro["ou"]
+    return filtro
+
+
+def _arvore(aleatorio: random.Random, linhas: list[dict], profundidade: int = 0) -> list:
+    grupo = []
+    for _ in range(aleatorio.randrange(0 if profundidade else 1, 4)):
+        if profundidade < 3 and aleatorio.random() < 0.3:
+            grupo.append(_arvore(aleatorio, linhas, profundidade + 1))
+        else:
+            grupo.append(_filtro(aleatorio, linhas))
+    return grupo
+
+
+def _ordenacao(aleatorio: random.Random) -> list[str] | None:
+    if aleatorio.random() < 0.2:
+        return None
+    itens = []
+    for coluna in aleatorio.sample(ORDENAVEIS, aleatorio.randrange(1, 4)):
+        direcao = aleatorio.choice(["", " ASC", " DESC", " desc", " asc"])
+        itens.append(coluna + direcao)
+    return itens
+
+
+# ----------------------------------------------------------------------
+# Casos
+# ----------------------------------------------------------------------
+def test_arvores_aleatorias(ambiente):
+    loop, linhas = ambiente
+    aleatorio = random.Random(SEMENTE)
+    for _ in range(CASOS):
+        limite = aleatorio.choice([1000, 1000, 25, 5, 1, 0, -1])
+        _assert_paridade(loop, _arvore(aleatorio, linhas), _ordenacao(aleatorio), limite)
+
+
+@pytest.mark.parametrize("operador", OPERADORES_COMPARACAO)
+@pytest.mark.parametrize("valor", ["Ana Souza", "ana", "Álvaro", "Ωmega", "_inicio", "100%", "", 123])
+def test_operadores_texto(ambiente, operador, valor):
+    loop, _ = ambiente
+    _assert_paridade(loop, [{"coluna": "nome", "valor": valor, "filtro": operador}], ["nome", "id DESC"])
+
+
+@pytest.mark.parametrize("operador, valor", [
+    *((operador, valor) for operador in OPERADORES_COMPARACAO for valor in (0, 2, 3, 2.5)),
+    # True/False só com = e != (os demais operadores dão erro no SQL)
+    *((operador, valor) for operador in ("=", "!=") for valor in (True, False)),
+])
+def test_operadores_inteiro(ambiente, operador, valor):
+    loop, _ = ambiente
+    for coluna in COLUNAS_INTEIRO + ["ativo"]:
+        if coluna == "ativo" and valor not in (0, 1):
+            continue
+        _assert_paridade(loop, [{"coluna": coluna, "valor": valor, "filtro": operador}], [f"{coluna} DESC"])
+
+
+@pytest.mark.parametrize("operador", ["like", "ilike"])
+@pytest.mark.parametrize("valor", [
+    "ana", "ANA", "álvaro", "ÁLVARO", "ção", "ÇÃO", "straße", "STRASSE", "ø",
+    "50%", "50_", "%", "_", "a_b", "c%d", "%off", "_inicio", "exemplo.com", "",
+])
+def test_like_nao_ascii_e_curingas(ambiente, operador, valor):
+    loop, _ = ambiente
+    for coluna in COLUNAS_TEXTO:
+        _assert_paridade(loop, [{"coluna": coluna, "valor": valor, "filtro": operador}])
+
+
+@pytest.mark.parametrize("valor", [
+    ["Ana Souza", 123, "ÇÃO"],
+    [123, "123"],
+    ["100%", "_inicio", "a_b c%d"],
+    [True, 0],
+    [],
+])
+def test_in_tipos_misturados_texto(ambiente, valor):
+    loop, _ = ambiente
+    _assert_paridade(loop, [{"coluna": "nome", "valor": valor, "filtro": "in"}])
+
+
+@pytest.mark.parametrize("valor", [[1, 2.0, True], [3, False], [True, 1.0, 0], [False], (4,), [2.5], []])
+def test_in_tipos_misturados_inteiro(ambiente, valor):
+    loop, _ = ambiente
+    _assert_paridade(loop, [{"coluna": "versao", "valor": valor, "filtro": "in"}])
+    _assert_paridade(loop, [{"coluna": "ativo", "valor": [v for v in valor if v in (0, 1)], "filtro": "in"}])
+
+
+@pytest.mark.parametrize("ordenacao", [
+    ["nome"], ["nome DESC"], ["versao DESC", "nome"], ["ativo DESC", "versao", "nome DESC"],
+    ["data_criacao"], ["data_criacao DESC"], ["perfil_id DESC", "data_criacao DESC"],
+    ["id DESC"], ["inexistente", "nome DESC"],
+])
+def test_empates_e_ordem_descendente(ambiente, ordenacao):
+    loop, _ = ambiente
+    for limite in (1000, 7):
+        _assert_paridade(loop, [], ordenacao, limite)
+
+
+def test_ou_ignora_os_e_do_mesmo_grupo(ambiente):
+    loop, _ = ambiente
+    filtros = [
+        {"coluna": "versao", "valor": 1, "filtro": "="},
+        {"coluna": "ativo", "valor": True, "filtro": "=", "ou": True},
+        [
+            {"coluna": "nome", "valor": "ana", "filtro": "ilike"},
+            [{"coluna": "perfil_id", "valor": 2, "filtro": "=", "ou": True}],
+        ],
+    ]
+    _assert_paridade(loop, filtros, ["nome DESC"])
+
+
+@pytest.mark.parametrize("filtros, ordenacao, colunas", [
+    # Datas, NULL como valor e colunas fora da tabela (column_property)
+    ([{"coluna": "data_criacao", "valor": "2024-01-01", "filtro": ">"}], None, None),
+    ([{"coluna": "nome", "valor": None, "filtro": "="}], None, None),
+    ([{"coluna": "perfil_nome", "valor": "perfil 1", "filtro": "="}], None, None),
+    ([], ["perfil_nome"], None),
+    # Tipos que o SQLite converteria de outro jeito
+    ([{"coluna": "nome", "valor": 1.5, "filtro": "="}], None, None),
+    ([{"coluna": "versao", "valor": "2", "filtro": "="}], None, None),
+    ([{"coluna": "ativo", "valor": 2, "filtro": "="}], None, None),
+    ([{"coluna": "ativo", "valor": "1", "filtro": "like"}], None, None),
+    ([{"coluna": "nome", "valor": ["Ana Souza", None], "filtro": "in"}], None, None),
+    # `colunas` muda o carregamento dos modelos
+    ([], None, ["nome", "login"]),
+])
+def test_recusadas(ambiente, filtros, ordenacao, colunas):
+    loop, _ = ambiente
+    sql, memoria = _consultar(loop, filtros, ordenacao, colunas)
+    assert memoria is None
+    assert isinstance(sql, list)
+
+
+@pytest.mark.parametrize("filtro", [
+    {"coluna": "nome", "valor": "Ana", "filtro": "regex"},
+    {"coluna": "versao", "valor": 1, "filtro": "in"},
+    {"coluna": "versao", "valor": True, "filtro": ">"},
+    {"coluna": "versao", "valor": [True, 3], "filtro": "in"},
+    {"coluna": "nome", "valor": [False, "Ana Souza"], "filtro": "in"},
+])
+def test_recusadas_com_erro_no_sql(ambiente, filtro):
+    loop, _ = ambiente
+    with pytest.raises((ValueError, SQLAlchemyError)):
+        _consultar(loop, [filtro])
+    memoria = loop.run_until_complete(snapshot_usuarios.consultar([filtro], None, None, 10))
+    assert memoria is None
+